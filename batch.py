@@ -0,0 +1,117 @@
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import pysharp
+import errors
+from interpreter import Interpreter
+from cse import CommonSubexpressions
+from number import Number
+from context import Context
+from source import Source
+from position import Position
+
+# chunks per worker, enough to even out uneven chunks without paying for many round trips
+CHUNKS_PER_WORKER = 8
+MAX_CHUNK_SIZE = 4096
+
+class BatchError:
+    __slots__ = ("kind", "details", "filename", "text", "start", "end", "contexts")
+
+    # an error reduced to plain data that pickles small, without the context's symbol table
+    def __init__(self, error):
+        source = error.pos_start.source
+        self.kind = type(error).__name__
+        self.details = error.details
+        self.filename = source.filename
+        self.text = source.text()
+        self.start = error.pos_start.index - source.start
+        self.end = error.pos_end.index - source.start
+        self.contexts = []
+        context = getattr(error, "context", None)
+        while context:
+            self.contexts.append(context.display_name)
+            context = context.parent
+
+    def to_error(self):
+        source = Source(self.filename, self.text)
+        pos_start, pos_end = Position(self.start, source), Position(self.end, source)
+        error_class = getattr(errors, self.kind)
+        if error_class is not errors.RuntimeError:
+            return error_class(pos_start, pos_end, self.details)
+
+        context = None
+        for display_name in reversed(self.contexts):
+            context = Context(display_name, context, pos_start if context else None)
+        return error_class(pos_start, pos_end, self.details, context)
+
+    def to_string(self) -> str:
+        return self.to_error().to_string()
+
+def snapshot(symbol_table) -> dict:
+    return {name: value.value for name, value in symbol_table.symbols.items()}
+
+def initialize_worker(symbols: dict):
+    # a private global table per worker; evaluate_chunk resets it before every expression
+    symbol_table = pysharp.SymbolTable()
+    for name, value in symbols.items():
+        symbol_table.set(name, Number(value))
+    pysharp.global_symbol_table = symbol_table
+
+def evaluate_chunk(texts: list, filename: str, backend: str, limits=None) -> list:
+    symbol_table = pysharp.get_global_symbol_table()
+    initial = list(symbol_table.values)
+    results = []
+
+    # the chunk is parsed up front so identical subexpressions are shared across its expressions, and
+    # the interpreter remembers their values from one expression to the next until a variable changes
+    programs = [pysharp.parse(filename, text, limits=limits) for text in texts]
+    CommonSubexpressions().share([node for node, error in programs if not error])
+    interpreter = Interpreter()
+
+    for node, error in programs:
+        if not error:
+            try:
+                result = pysharp.execute(node, backend, interpreter, limits=limits)
+                error = result.error
+            except Exception as exception:
+                # an expression the evaluator itself fails on only fails its own row, not the whole batch
+                error = errors.RuntimeError(node.pos_start, node.pos_end, f"{type(exception).__name__}: {exception}", Context("<program>"))
+        if error:
+            results.append((None, BatchError(error)))
+        else:
+            results.append((None if result.value is None else result.value.value, None))
+
+        # every expression starts from the initial table, whichever chunk or worker it lands in.
+        # slots stay allocated since cached programs are resolved to them
+        values = symbol_table.values
+        if values[:len(initial)] != initial or any(value is not None for value in values[len(initial):]):
+            values[:len(initial)] = initial
+            values[len(initial):] = [None] * (len(values) - len(initial))
+            interpreter.forget()
+    return results
+
+def chunked(texts, size: int):
+    iterator = iter(texts)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+def evaluate_batch(texts, workers: int = None, chunk_size: int = None, filename: str = "<batch>", backend: str = "fast", limits=None) -> list:
+    texts = texts if isinstance(texts, list) else list(texts)
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, min(MAX_CHUNK_SIZE, len(texts) // (workers * CHUNKS_PER_WORKER)))
+    symbols = snapshot(pysharp.get_global_symbol_table())
+
+    if workers == 1:
+        table = pysharp.global_symbol_table
+        try:
+            initialize_worker(symbols)
+            return evaluate_chunk(texts, filename, backend, limits)
+        finally:
+            pysharp.global_symbol_table = table
+
+    results = []
+    with ProcessPoolExecutor(workers, initializer=initialize_worker, initargs=(symbols,)) as executor:
+        chunks = chunked(texts, chunk_size)
+        for chunk_results in executor.map(evaluate_chunk, chunks, itertools.repeat(filename), itertools.repeat(backend), itertools.repeat(limits)):
+            results.extend(chunk_results)
+    return results
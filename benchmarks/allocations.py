@@ -0,0 +1,67 @@
+import sys
+import time
+from lexer import Lexer
+from parser import Parser
+from number import Number
+from errors import RuntimeResult
+from interpreter import Interpreter, SymbolTable
+from context import Context
+from benchmarks.memory import count_nodes
+
+PROGRAM = "(let z = (x * 2 + y / 3 - 1.5) ^ 2) > x and not (y == 0) or -z < 10"
+
+def make_context():
+    context = Context("<bench>")
+    context.symbol_table = SymbolTable()
+    context.symbol_table.set("x", Number(3).set_context(context))
+    context.symbol_table.set("y", Number(4.5).set_context(context))
+    return context
+
+def count_instances(cls, counts):
+    original_init = cls.__init__
+
+    def counting_init(self, *args, **kwargs):
+        counts[cls.__name__] += 1
+        original_init(self, *args, **kwargs)
+
+    cls.__init__ = counting_init
+    return original_init
+
+def measure(mode: str, runs: int):
+    lexer = Lexer("<bench>", PROGRAM)
+    tokens, error = lexer.make_tokens()
+    ast = Parser(tokens, lexer.source).parse()
+    if error or ast.error:
+        raise SystemExit((error or ast.error).to_string())
+
+    interpreter = Interpreter()
+    evaluate = interpreter.visit if mode == "visit" else interpreter.evaluate
+    context = make_context()
+
+    counts = {"Number": 0, "RuntimeResult": 0}
+    originals = {cls: count_instances(cls, counts) for cls in (Number, RuntimeResult)}
+    try:
+        for _ in range(runs):
+            evaluate(ast.node, context)
+    finally:
+        for cls, original_init in originals.items():
+            cls.__init__ = original_init
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        evaluate(ast.node, context)
+    elapsed = time.perf_counter() - start
+
+    nodes = count_nodes(ast.node) * runs
+    return {name: count / nodes for name, count in counts.items()}, elapsed / nodes
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"program: {PROGRAM}")
+    for mode in ("visit", "evaluate"):
+        per_node, seconds_per_node = measure(mode, runs)
+        allocations = ", ".join(f"{count:.2f} {name}" for name, count in per_node.items())
+        print(f"{mode:>8}: {allocations} per node, {seconds_per_node * 1e9:.0f} ns per node")
+
+if __name__ == "__main__":
+    main()
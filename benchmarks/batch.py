@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+import random
+import pysharp
+from batch import evaluate_batch
+
+def generate_expressions(count: int) -> list:
+    random.seed(0)
+    operators = ["+", "-", "*", "/", "^", "<", "and"]
+    return [
+        f"(let a = {random.randint(1, 99)}) {random.choice(operators)} ({random.randint(1, 9)} + a * {i % 7}) - (if a > 50 then a else -a)"
+        for i in range(count)
+    ]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    texts = generate_expressions(count)
+
+    start = time.perf_counter()
+    for text in texts:
+        pysharp.main("<batch>", text, backend="fast")
+    sequential = time.perf_counter() - start
+    print(f"pysharp.main loop: {sequential:7.2f} s, {count / sequential:9.0f} expressions/s")
+
+    workers = 1
+    cores = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    while True:
+        start = time.perf_counter()
+        evaluate_batch(texts, workers)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>3} worker(s):      {elapsed:7.2f} s, {count / elapsed:9.0f} expressions/s, {sequential / elapsed:5.2f}x")
+        if workers >= cores: break
+        workers = min(workers * 2, cores)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import sys
+import time
+import pysharp
+from number import Number
+from interpreter import SymbolTable
+from context import Context
+from codegen import compile_program
+
+# evaluated again and again with other bindings, where compiling once pays off
+EXPRESSIONS = [
+    "x * 2 + y / 3 - 1.5",
+    "(let z = (x * 2 + y / 3 - 1.5) ^ 2) > x and not (y == 0) or -z < 10",
+    "if x > 50 then x - y elif x < y then (x + y) * (x - y) else x / (y + 1)",
+    "x != 0 and (100 / x) > 2 or ((let w = y * y + x * x) > 1000 and w / 2 < 9000)",
+]
+
+def make_context(x, y):
+    context = Context("<bench>")
+    context.symbol_table = SymbolTable()
+    context.symbol_table.set("x", Number(x))
+    context.symbol_table.set("y", Number(y))
+    return context
+
+def measure_backend(node, backend: str, rows: list) -> float:
+    contexts = [make_context(x, y) for x, y in rows]
+    start = time.perf_counter()
+    for context in contexts:
+        # a fresh interpreter per binding, the values it remembers belong to one set of variables
+        result = pysharp.execute(node, backend, None, context)
+        if result.error: raise SystemExit(result.error.to_string())
+    return time.perf_counter() - start
+
+def measure_callable(node, rows: list) -> float:
+    program = compile_program(node)
+    bindings = [{"x": x, "y": y} for x, y in rows]
+    start = time.perf_counter()
+    for row in bindings:
+        program(row)
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = [(i % 97 - 20, i % 13 + 0.5) for i in range(count)]
+    print(f"{count} evaluations per expression")
+    for text in EXPRESSIONS:
+        node, error = pysharp.parse("<bench>", text)
+        if error: raise SystemExit(error.to_string())
+
+        start = time.perf_counter()
+        compile_program(node)
+        compiling = time.perf_counter() - start
+
+        print(text)
+        timings = {backend: measure_backend(node, backend, rows) for backend in ("interpreter", "fast", "vm", "codegen")}
+        timings["compiled callable"] = measure_callable(node, rows)
+        for name, elapsed in timings.items():
+            print(f"  {name:>17}: {elapsed / count * 1e9:8.0f} ns per evaluation, {timings['interpreter'] / elapsed:5.1f}x")
+        print(f"  {'compile':>17}: {compiling * 1e6:8.0f} us once")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import sys
+import time
+import random
+import pysharp
+from number import Number
+from nodes import children
+from interpreter import Interpreter, SymbolTable
+from context import Context
+from cse import CommonSubexpressions
+
+VARIABLES = "abcdef"
+
+# generated formulas: a handful of terms over a few variables, repeated throughout each formula and the batch
+def generate_terms(count: int) -> list:
+    terms = []
+    for _ in range(count):
+        a, b, c = random.sample(VARIABLES, 3)
+        terms.append(random.choice([f"({a} * {b} + {c})", f"({a} - {b}) ^ 2", f"(if {a} > {b} then {a} / ({c} + 1) else {b} * {c})"]))
+    return terms
+
+def generate_formula(terms: list, size: int) -> str:
+    text = random.choice(terms)
+    for _ in range(size - 1):
+        text = f"({text} {random.choice(['+', '-', '*'])} {random.choice(terms)})"
+    return text
+
+def make_context() -> Context:
+    context = Context("<cse>")
+    context.symbol_table = SymbolTable()
+    for index, name in enumerate(VARIABLES):
+        context.symbol_table.set(name, Number(index + 1.5))
+    return context
+
+def set_shared(nodes: list, marks: list):
+    for node, shared in zip(nodes, marks):
+        node.shared = shared
+
+def operations(node) -> list:
+    found, stack = [], [node]
+    while stack:
+        item = stack.pop()
+        if hasattr(item, "shared"):
+            found.append(item)
+        stack.extend(children(item))
+    return found
+
+def measure(roots: list, backend: str, repeat: int, keep: bool) -> float:
+    context = make_context()
+    best = None
+    for _ in range(repeat):
+        interpreter = Interpreter()
+        start = time.perf_counter()
+        for root in roots:
+            if backend == "fast":
+                result = interpreter.evaluate(root, context)
+            else:
+                result = interpreter.visit(root, context)
+            if result.error: raise SystemExit(result.error.to_string())
+            if not keep:
+                interpreter.forget()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    repeat = 9
+    random.seed(21)
+    terms = generate_terms(6)
+    texts = [generate_formula(terms, size) for _ in range(count)]
+    roots = []
+    for text in texts:
+        node, error = pysharp.parse_program("<cse>", text, optimize=False)
+        if error: raise SystemExit(error.to_string())
+        roots.append(node)
+    nodes = [node for root in roots for node in operations(root)]
+    print(f"{count} generated formulas of {size} terms each")
+
+    set_shared(nodes, [None] * len(nodes))
+    timings = {backend: measure(roots, backend, repeat, False) for backend in ("interpreter", "fast")}
+
+    within = CommonSubexpressions()
+    for root in roots:
+        within.share([root])
+    print(f"within each formula: {within.deduplicated} of {within.nodes} nodes deduplicated, {within.shared} shared subexpressions")
+    for backend, unshared in timings.items():
+        elapsed = measure(roots, backend, repeat, False)
+        print(f"  {backend:>11}: {unshared * 1e3:8.2f} ms unshared, {elapsed * 1e3:8.2f} ms shared, {unshared / elapsed:5.2f}x")
+
+    across = CommonSubexpressions()
+    across.share(roots)
+    print(f"across the batch: {across.deduplicated} of {across.nodes} nodes deduplicated, {across.shared} shared subexpressions")
+    for backend, unshared in timings.items():
+        elapsed = measure(roots, backend, repeat, True)
+        print(f"  {backend:>11}: {unshared * 1e3:8.2f} ms unshared, {elapsed * 1e3:8.2f} ms shared, {unshared / elapsed:5.2f}x")
+
+    start = time.perf_counter()
+    CommonSubexpressions().share(roots)
+    print(f"sharing the batch takes {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import sys
+import time
+import pysharp
+from number import Number
+from nodes import BinaryOperatorNode, UnaryOperatorNode, children
+from interpreter import Interpreter, SymbolTable
+from context import Context
+
+# operator-heavy expressions, built as balanced trees so their depth stays small
+def balanced(terms: list, operators: list) -> str:
+    while len(terms) > 1:
+        terms = [f"({terms[i]} {operators[i % len(operators)]} {terms[i + 1]})" if i + 1 < len(terms) else terms[i] for i in range(0, len(terms), 2)]
+    return terms[0]
+
+EXPRESSIONS = {
+    "arithmetic": balanced([f"x * {i} - y / {i + 1} ^ 2" for i in range(64)], ["+", "-"]),
+    "comparisons": balanced([f"(x >= {i}) + (y != {i}) * (x <= y)" for i in range(64)], ["+", "-"]),
+    "unary": balanced([f"-(x * {i}) + -y - (not x == y)" for i in range(64)], ["+", "*"]),
+}
+ROUNDS = 7
+
+def make_context() -> Context:
+    context = Context("<dispatch>")
+    context.symbol_table = SymbolTable()
+    context.symbol_table.set("x", Number(7))
+    context.symbol_table.set("y", Number(2.5))
+    return context
+
+def operations(node) -> list:
+    found, stack = [], [node]
+    while stack:
+        item = stack.pop()
+        if type(item) is BinaryOperatorNode or type(item) is UnaryOperatorNode:
+            found.append(item)
+        stack.extend(children(item))
+    return found
+
+def measure(node, nodes: list, repeat: int, cached: bool) -> float:
+    context = make_context()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if not cached:
+            # every operation is looked up in the dispatch tables again
+            for item in nodes:
+                item.cache = None
+        result = Interpreter().visit(node, context)
+        if result.error: raise SystemExit(result.error.to_string())
+    return time.perf_counter() - start
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{repeat} evaluations per expression on the interpreter, best of {ROUNDS} rounds")
+    for name, text in EXPRESSIONS.items():
+        node, error = pysharp.parse_program("<dispatch>", text, optimize=False)
+        if error: raise SystemExit(error.to_string())
+        nodes = operations(node)
+
+        # alternated so a slower stretch of the machine hits both alike
+        uncached, cached = [], []
+        for _ in range(ROUNDS):
+            uncached.append(measure(node, nodes, repeat, False))
+            cached.append(measure(node, nodes, repeat, True))
+        per_operation = repeat * len(nodes)
+        print(f"  {name:>11}: {len(nodes)} operations, {min(uncached) / per_operation * 1e9:6.0f} ns each looked up, "
+              f"{min(cached) / per_operation * 1e9:6.0f} ns each cached, {min(uncached) / min(cached):5.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import sys
+import time
+import numpy as np
+import pysharp
+from number import Number
+from interpreter import SymbolTable
+from context import Context
+from vectorized import evaluate_columns
+
+# guard expressions: the right operand is expensive, and would fail, whenever the left one decides
+GUARDS = [
+    "x != 0 and (100 / x) > 2",
+    "x == 0 or (y ^ 3 - y ^ 2 + 100 / x) > 50",
+    "x > 5 and (if y > 2 then (x * y) ^ 2 / x else 100 / x - y) < 1000",
+    "(x == 0 or x < 3) or ((x - 1) ^ 4 / x + (y + 1) ^ 3 / x) > 1",
+]
+
+def make_context(x, y):
+    context = Context("<guards>")
+    context.symbol_table = SymbolTable()
+    context.symbol_table.parent = pysharp.get_global_symbol_table()
+    context.symbol_table.set("x", Number(x))
+    context.symbol_table.set("y", Number(y))
+    return context
+
+def bindings(rows: int):
+    # half of the rows are decided by the guard
+    return [(0 if i % 2 else i % 9 + 1, i % 5) for i in range(rows)]
+
+def measure(text: str, backend: str, rows: list) -> float:
+    node, error = pysharp.parse("<guards>", text)
+    if error: raise SystemExit(error.to_string())
+    contexts = [make_context(x, y) for x, y in rows]
+
+    start = time.perf_counter()
+    for context in contexts:
+        result = pysharp.execute(node, backend, None, context)
+        if result.error: raise SystemExit(result.error.to_string())
+    return time.perf_counter() - start
+
+def measure_columns(text: str, rows: list) -> float:
+    node, error = pysharp.parse("<guards>", text)
+    if error: raise SystemExit(error.to_string())
+    columns = {"x": np.array([x for x, _ in rows]), "y": np.array([y for _, y in rows])}
+
+    start = time.perf_counter()
+    _, error = evaluate_columns(node, columns, make_context(0, 0))
+    if error: raise SystemExit(error.to_string())
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = bindings(count)
+    print(f"{count} bindings per expression, every other one decided by the guard")
+    for text in GUARDS:
+        print(text)
+        for backend in ("interpreter", "fast", "vm", "codegen"):
+            elapsed = measure(text, backend, rows)
+            print(f"  {backend:>11}: {elapsed * 1e3:8.2f} ms, {elapsed / count * 1e9:7.0f} ns per evaluation")
+        elapsed = measure_columns(text, rows)
+        print(f"  {'vectorized':>11}: {elapsed * 1e3:8.2f} ms, {elapsed / count * 1e9:7.0f} ns per evaluation")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import re
+import sys
+import time
+import random
+from lexer import Lexer
+from parser import Parser
+from nodes import children
+from incremental import IncrementalParser
+
+ATOMS = ["0", "12", "3.5", "x", "y_2", "true"]
+OPERATORS = ["+", "-", "*", "/", "^", "==", "<=", "and", "or"]
+SNIPPETS = ["1", "x", " ", "+", "(", ")", "let z = ", "if ", " then ", " else ", "3.", "=", "!", "$", "ab", "0 * "]
+
+def generate_expression(depth: int) -> str:
+    choice = random.random()
+    if depth <= 0 or choice < 0.2:
+        return random.choice(ATOMS)
+    elif choice < 0.6:
+        return f"{generate_expression(depth - 1)} {random.choice(OPERATORS)} {generate_expression(depth - 1)}"
+    elif choice < 0.75:
+        return f"({generate_expression(depth - 1)})"
+    elif choice < 0.82:
+        return f"-{generate_expression(depth - 1)}"
+    elif choice < 0.9:
+        return f"(let v = {generate_expression(depth - 1)})"
+    return f"(if {generate_expression(depth - 1)} then {generate_expression(depth - 1)} else {generate_expression(depth - 1)})"
+
+def random_edit(text: str):
+    # most edits keep the program valid, so most of them go down the incremental path
+    operators = list(re.finditer(r"==|<=|\band\b|\bor\b|[-+*/^]", text))
+    if operators and random.random() < 0.2:
+        operator = random.choice(operators)
+        return operator.start(), len(operator[0]), random.choice(OPERATORS)
+    atoms = [match for match in re.finditer(r"[0-9.]+|[a-z_0-9]+", text) if match[0] not in ("if", "then", "else", "let", "and", "or")]
+    if atoms and random.random() < 0.5:
+        atom = random.choice(atoms)
+        replacement = random.choice(ATOMS + [f"({random.choice(ATOMS)} + 1)", f"{random.choice(ATOMS)} * 2"])
+        return atom.start(), len(atom[0]), replacement
+    offset = random.randint(0, len(text))
+    deleted = min(random.choice([0, 0, 1, 1, 2, 5]), len(text) - offset)
+    return offset, deleted, random.choice(["", random.choice(SNIPPETS), random.choice(ATOMS)])
+
+def dump(node) -> list:
+    result = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        token = getattr(node, "token", None) or getattr(node, "operator_token", None) or getattr(node, "var_name_token", None)
+        result.append((type(node).__name__, token and (token.type, token.value), node.pos_start.index, node.pos_end.index))
+        stack.extend(reversed(children(node)))
+    return result
+
+def full_parse(text: str):
+    lexer = Lexer("<edit>", text)
+    tokens, error = lexer.make_tokens()
+    if error: return None, error
+    ast = Parser(tokens, lexer.source).parse()
+    return ast.node, ast.error
+
+def same(incremental_result, full_result) -> bool:
+    (node, error), (full_node, full_error) = incremental_result, full_result
+    if error or full_error:
+        return bool(error) == bool(full_error) and error.to_string() == full_error.to_string()
+    return dump(node) == dump(full_node)
+
+# every edit is checked against a from-scratch parse of the edited text
+def verify(documents: int, edits: int) -> int:
+    failures = 0
+    for document in range(documents):
+        text = generate_expression(6)
+        parser = IncrementalParser("<edit>", text)
+        for _ in range(edits):
+            offset, deleted, inserted = random_edit(parser.text)
+            before = parser.text
+            result = parser.edit(offset, deleted, inserted)
+            if not same(result, full_parse(parser.text)):
+                failures += 1
+                if failures <= 5:
+                    print(f"mismatch after edit {(offset, deleted, inserted)} of {before!r}")
+                # start the document again from a clean parse
+                parser = IncrementalParser("<edit>", parser.text)
+            elif result[1]:
+                # undo edits that break the program, so the document keeps being edited incrementally
+                result = parser.edit(offset, len(inserted), before[offset:offset + deleted])
+                if not same(result, full_parse(parser.text)):
+                    failures += 1
+    return failures
+
+# typing and deleting a character inside one term of a long program
+def measure(template: str, terms: int, keystrokes: int):
+    text = " + ".join(template.format(i=i) for i in range(terms))
+    offset = text.index(template.format(i=terms // 2)) + template.index("{i}")
+    parser = IncrementalParser("<edit>", text)
+
+    start = time.perf_counter()
+    reparsed = 0
+    for keystroke in range(keystrokes):
+        parser.edit(offset, 0, "7") if keystroke % 2 == 0 else parser.edit(offset, 1, "")
+        reparsed += parser.reparsed
+    incremental = (time.perf_counter() - start) / keystrokes
+
+    start = time.perf_counter()
+    for _ in range(keystrokes // 10 or 1):
+        full_parse(parser.text)
+    full = (time.perf_counter() - start) / (keystrokes // 10 or 1)
+    return len(parser.tokens), reparsed / keystrokes, incremental, full
+
+def main():
+    random.seed(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    failures = verify(300, 40)
+    print(f"verify:  {300 * 40} edits, {failures} differ from a full reparse")
+
+    for template in ("(x * {i} - {i} ^ 2)", "x * {i}"):
+        tokens, reparsed, incremental, full = measure(template, 5000, 200)
+        print(f"{template!r}:")
+        print(f"  edit:  {tokens} tokens, {reparsed:.1f} tokens reparsed per keystroke")
+        print(f"  time:  {incremental * 1e3:.3f} ms incremental, {full * 1e3:.3f} ms full lex and parse")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import sys
+import time
+import pysharp
+from number import Number
+from interpreter import SymbolTable
+from context import Context
+from limits import Limits
+
+# normal expressions, far from any limit
+EXPRESSIONS = [
+    "x * 2 + y / 3 - 1.5",
+    "(let z = (x * 2 + y / 3 - 1.5) ^ 2) > x and not (y == 0) or -z < 10",
+    "if x > 50 then x - y elif x < y then (x + y) * (x - y) else x / (y + 1)",
+    " + ".join(f"x * {i} - y ^ 2" for i in range(40)),
+]
+LIMITS = Limits(max_steps=100000, max_bits=1 << 20, timeout=5.0)
+ROUNDS = 5
+
+def make_context(x, y, limits: Limits):
+    context = Context("<bench>")
+    context.symbol_table = SymbolTable()
+    context.symbol_table.set("x", Number(x))
+    context.symbol_table.set("y", Number(y))
+    context.limits = limits
+    return context
+
+def measure(node, backend: str, rows: list, limits: Limits) -> float:
+    contexts = [make_context(x, y, limits) for x, y in rows]
+    start = time.perf_counter()
+    for context in contexts:
+        result = pysharp.execute(node, backend, None, context)
+        if result.error: raise SystemExit(result.error.to_string())
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rows = [(i % 97 - 20, i % 13 + 0.5) for i in range(count)]
+    print(f"{count} evaluations per expression, best of {ROUNDS} rounds")
+    for text in EXPRESSIONS:
+        node, error = pysharp.parse("<bench>", text)
+        if error: raise SystemExit(error.to_string())
+
+        print(text if len(text) < 80 else text[:76] + " ...")
+        for backend in ("interpreter", "fast", "vm"):
+            # alternated so a slower stretch of the machine hits both alike
+            unlimited, limited = [], []
+            for _ in range(ROUNDS):
+                unlimited.append(measure(node, backend, rows, None))
+                limited.append(measure(node, backend, rows, LIMITS))
+            overhead = min(limited) / min(unlimited) - 1
+            print(f"  {backend:>11}: {min(unlimited) / count * 1e9:8.0f} ns unlimited, {min(limited) / count * 1e9:8.0f} ns limited, {overhead:+6.1%}")
+
+if __name__ == "__main__":
+    main()
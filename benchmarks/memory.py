@@ -0,0 +1,65 @@
+import sys
+import tracemalloc
+from lexer import Lexer
+from parser import Parser
+from nodes import children
+
+def generate_program(terms: int) -> str:
+    return " + ".join(f"(x{i} * {i}.5 - {i} ^ 2)" for i in range(terms))
+
+def count_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        count += 1
+        stack.extend(children(stack.pop()))
+    return count
+
+def measure(terms: int):
+    text = generate_program(terms)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    lexer = Lexer("<bench>", text)
+    tokens, error = lexer.make_tokens()
+    token_bytes = tracemalloc.get_traced_memory()[0] - base
+
+    base = tracemalloc.get_traced_memory()[0]
+    ast = Parser(tokens, lexer.source).parse()
+    node_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    if error or ast.error:
+        raise SystemExit((error or ast.error).to_string())
+    return len(text), len(tokens), token_bytes, count_nodes(ast.node), node_bytes
+
+# peak memory of lexing and parsing, with the tokens in a list or streamed to the parser
+def measure_peak(terms: int, streamed: bool) -> int:
+    text = generate_program(terms)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    lexer = Lexer("<bench>", text)
+    if streamed:
+        ast = Parser(lexer.generate_tokens(), lexer.source).parse()
+    else:
+        tokens, error = lexer.make_tokens()
+        ast = Parser(tokens, lexer.source).parse()
+        del tokens
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    if ast.error: raise SystemExit(ast.error.to_string())
+    return peak
+
+def main():
+    terms = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    source_size, token_count, token_bytes, node_count, node_bytes = measure(terms)
+    print(f"source:  {source_size} bytes")
+    print(f"tokens:  {token_count:>8} tokens, {token_bytes / token_count:7.1f} bytes/token")
+    print(f"ast:     {node_count:>8} nodes,  {node_bytes / node_count:7.1f} bytes/node")
+    print(f"total:   {(token_bytes + node_bytes) / source_size:7.1f} bytes per source byte")
+    listed, streamed = measure_peak(terms, False), measure_peak(terms, True)
+    print(f"peak:    {listed / source_size:7.1f} bytes per source byte with a token list, {streamed / source_size:7.1f} streamed")
+
+if __name__ == "__main__":
+    main()
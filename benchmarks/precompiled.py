@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import random
+import tempfile
+import pysharp
+import precompiled
+from source import open_source
+
+def generate_script(size: int) -> str:
+    random.seed(0)
+    operators = ["+", "-", "*", "/", "^", "<", ">=", "==", "and", "or"]
+    lines = []
+    length = 0
+    i = 0
+    while length < size:
+        a, b = random.randint(1, 999), random.uniform(0, 100)
+        line = random.choice([
+            f"let v{i % 500} = {a} {random.choice(operators)} {b:.3f} * (x{i % 7} - {a % 13})",
+            f"if v{i % 500} > {a} then -(v{i % 500} {random.choice(operators)} {a}) elif not v{i % 500} then {b:.2f} else {a} ^ 2",
+            f"(let w = v{i % 500} {random.choice(operators)} {a}) + w * w - (w / {a % 17 + 1})",
+        ])
+        lines.append(line)
+        length += len(line) + 1
+        i += 1
+    return "\n".join(lines) + "\n"
+
+def consume(programs) -> int:
+    count = 0
+    for node, error in programs:
+        count += 1
+    return count
+
+def main():
+    size = int(float(sys.argv[1]) * (1 << 20)) if len(sys.argv) > 1 else 10 << 20
+    # deep left-leaning trees are rebuilt recursively nowhere, but the statements are long
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.pys")
+    with open(path, "w") as file:
+        file.write(generate_script(size))
+    cache_path = precompiled.cache_path(path)
+
+    try:
+        source = open_source(path)
+        start = time.perf_counter()
+        statements = consume(pysharp.parse_statements(pysharp.split_lines(source)))
+        parsing = time.perf_counter() - start
+
+        start = time.perf_counter()
+        consume(pysharp.load_statements(path, source))
+        writing = time.perf_counter() - start
+
+        start = time.perf_counter()
+        consume(pysharp.load_statements(path, source))
+        loading = time.perf_counter() - start
+
+        print(f"script: {os.path.getsize(path) / (1 << 20):.1f} MB, {statements} statements, cache {os.path.getsize(cache_path) / (1 << 20):.1f} MB")
+        print(f"parse:           {parsing:7.3f} s")
+        print(f"parse and write: {writing:7.3f} s")
+        print(f"load:            {loading:7.3f} s, {loading / parsing:.0%} of a parse")
+    finally:
+        for name in (path, cache_path):
+            if os.path.exists(name):
+                os.remove(name)
+        os.rmdir(directory)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import sys
+import time
+import random
+import pysharp
+from number import Number
+from interpreter import SymbolTable
+from context import Context
+from reactive import Sheet
+
+GROUPS = 50
+
+# a sheet of bindings in groups that each hang off one input, every binding reading two earlier variables of its group
+def generate_statements(count: int, inputs: list) -> list:
+    groups, statements = [[name] for name in inputs], []
+    for index in range(count):
+        names = groups[index % len(groups)]
+        left, right = random.sample(names[-10:], 2) if len(names) > 1 else names * 2
+        name = f"v{index}"
+        statements.append(f"let {name} = {left} {random.choice(['+', '-', '*'])} {right} / 7")
+        names.append(name)
+    return statements
+
+def rerun(nodes: list, inputs: dict):
+    context = Context("<program>")
+    context.symbol_table = SymbolTable()
+    for name, value in inputs.items():
+        context.symbol_table.set(name, Number(value))
+    for node in nodes:
+        result = pysharp.execute(node, "fast", None, context)
+        if result.error: raise SystemExit(result.error.to_string())
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    changes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    random.seed(25)
+    inputs = {f"input{index}": index + 1.5 for index in range(GROUPS)}
+    statements = generate_statements(count, list(inputs))
+
+    sheet = Sheet()
+    for name, value in inputs.items():
+        sheet.set(name, value)
+    for text in statements:
+        cell = sheet.run(text)
+        if cell.error: raise SystemExit(cell.error.to_string())
+    nodes = [pysharp.parse_program("<program>", text)[0] for text in statements]
+    print(f"{count} bindings over {GROUPS} inputs, {changes} changes to one input at a time")
+
+    runs = sheet.runs
+    start = time.perf_counter()
+    for change in range(changes):
+        name = f"input{change % GROUPS}"
+        inputs[name] += 1
+        sheet.set(name, inputs[name])
+    reactive = time.perf_counter() - start
+    recomputed = (sheet.runs - runs) / changes
+
+    start = time.perf_counter()
+    for change in range(changes):
+        rerun(nodes, inputs)
+    full = time.perf_counter() - start
+
+    print(f"  every statement: {full / changes * 1e3:8.2f} ms per change, {count} statements")
+    print(f"  dependents only: {reactive / changes * 1e3:8.2f} ms per change, {recomputed:.0f} statements on average, {full / reactive:5.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+# each connection keeps its own variables, so the programs lean on what earlier requests defined
+PROGRAMS = [
+    "let x = {i}",
+    "x * 2 + {i} ^ 2",
+    "if x > 50 then x - 1 else x + 1",
+    "(let y = x * 3 + true) / 2",
+    "y + x - {i}",
+]
+
+async def connect(address: str):
+    if address.startswith("unix:"):
+        return await asyncio.open_unix_connection(address[len("unix:"):])
+    host, _, port = address.rpartition(":")
+    return await asyncio.open_connection(host, int(port))
+
+async def client(address: str, requests: int, latencies: list, failures: list):
+    reader, writer = await connect(address)
+    for i in range(requests):
+        code = PROGRAMS[i % len(PROGRAMS)].format(i=i)
+        start = time.perf_counter()
+        writer.write((json.dumps({"id": i, "code": code}) + "\n").encode())
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if response.get("id") != i or "error" in response:
+            failures.append(response)
+    writer.close()
+    await writer.wait_closed()
+
+async def load(address: str, connections: int, requests: int):
+    latencies, failures = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(address, requests, latencies, failures) for _ in range(connections)))
+    return latencies, failures, time.perf_counter() - start
+
+async def start_server(concurrency: int):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "main.py", "--serve", "127.0.0.1:0", "--concurrency", str(concurrency),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    line = (await process.stdout.readline()).decode()
+    if not line.startswith("listening on "):
+        process.kill()
+        raise SystemExit(f"server did not start: {line!r}")
+    return process, line[len("listening on "):].split(",")[0].strip()
+
+def percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run(options):
+    process = None
+    address = options.address
+    if not address:
+        process, address = await start_server(options.concurrency)
+    try:
+        latencies, failures, elapsed = await load(address, options.connections, options.requests)
+    finally:
+        if process:
+            process.terminate()
+            await process.wait()
+
+    latencies.sort()
+    print(f"{options.connections} connections x {options.requests} requests against {address}")
+    print(f"p50:      {percentile(latencies, 0.5) * 1e3:8.3f} ms")
+    print(f"p99:      {percentile(latencies, 0.99) * 1e3:8.3f} ms")
+    print(f"rps:      {len(latencies) / elapsed:8.0f}")
+    print(f"failures: {len(failures):8}")
+    for failure in failures[:5]:
+        print(f"  {failure}")
+    return failures
+
+def main():
+    arguments = argparse.ArgumentParser(description="load test for the evaluation server")
+    arguments.add_argument("--address", help="host:port or unix:PATH of a running server, otherwise one is started")
+    arguments.add_argument("--connections", type=int, default=32)
+    arguments.add_argument("--requests", type=int, default=500, help="requests sent by every connection")
+    arguments.add_argument("--concurrency", type=int, default=8, help="evaluation threads of the started server")
+    options = arguments.parse_args()
+    if asyncio.run(run(options)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
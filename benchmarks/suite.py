@@ -0,0 +1,183 @@
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import pysharp
+from lexer import Lexer
+from parser import Parser
+from number import Number
+from interpreter import Interpreter, SymbolTable
+from context import Context
+
+BASELINE = "benchmarks/baseline.json"
+FORMAT_VERSION = 2
+
+# left-deep chains are walked recursively by the Interpreter
+sys.setrecursionlimit(100000)
+
+def arithmetic_chain(size: int) -> str:
+    operators = ["+", "-", "*", "/"]
+    return " + ".join(f"{i % 97 + 1} {operators[i % 4]} {i % 13 + 1}" for i in range(size))
+
+def deep_parentheses(size: int) -> str:
+    return "(1 + " * size + "1" + ")" * size
+
+def many_lets(size: int) -> str:
+    return " + ".join(["(let v0 = 1)"] + [f"(let v{i} = v{i - 1} + {i})" for i in range(1, size)])
+
+def nested_ifs(size: int) -> str:
+    text = "0"
+    for i in range(size):
+        text = f"(if x == {i} then {i} elif x < {i} then {text} else {i + 1})"
+    return text
+
+def long_names(size: int) -> str:
+    name = "variable_with_a_rather_long_name_"
+    number = "1234567890" * 4
+    return " + ".join(f"(let {name}{i} = {number}.{number} * {i}) - {name}{i}" for i in range(size))
+
+PROGRAMS = {
+    "arithmetic": (arithmetic_chain, 2000),
+    "parentheses": (deep_parentheses, 1000),
+    "lets": (many_lets, 1000),
+    "ifs": (nested_ifs, 300),
+    "names": (long_names, 500),
+}
+
+# a fixed pure Python workload timed next to the benchmarks: they are compared relative to it, so a
+# machine that is slower than when the baseline was recorded does not look like a regression
+def calibration():
+    total = 0
+    for i in range(200000):
+        total += i * i % 7
+    return total
+
+def make_context():
+    context = Context("<bench>")
+    context.symbol_table = SymbolTable()
+    context.symbol_table.set("x", Number(3).set_context(context))
+    return context
+
+def time_phase(function, repeat: int) -> dict:
+    # like timeit: one warm-up run, and no collections landing inside a timed run
+    function()
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+def measure(name: str, text: str, repeat: int) -> dict:
+    lexer = Lexer("<bench>", text)
+    tokens, error = lexer.make_tokens()
+    if error: raise SystemExit(error.to_string())
+    ast = Parser(tokens, lexer.source).parse()
+    if ast.error: raise SystemExit(ast.error.to_string())
+
+    def end_to_end():
+        # every run has to lex, parse and optimize again instead of hitting the program cache
+        pysharp.program_cache.clear()
+        result, error = pysharp.main("<bench>", text)
+        if error: raise SystemExit(error.to_string())
+
+    return {
+        f"{name}/lex": time_phase(lambda: Lexer("<bench>", text).make_tokens(), repeat),
+        f"{name}/parse": time_phase(lambda: Parser(tokens, lexer.source).parse(), repeat),
+        f"{name}/interpret": time_phase(lambda: Interpreter().visit(ast.node, make_context()), repeat),
+        f"{name}/main": time_phase(end_to_end, repeat),
+    }
+
+def run(scale: float, repeat: int, rounds: int) -> dict:
+    pysharp.get_global_symbol_table().set("x", Number(3))
+    programs = {name: generate(max(1, int(size * scale))) for name, (generate, size) in PROGRAMS.items()}
+
+    # whole rounds one after the other, so a slow spell of the machine spreads over every benchmark
+    timings = []
+    for _ in range(rounds):
+        round_timings = {"calibration": time_phase(calibration, repeat)}
+        for name, text in programs.items():
+            round_timings.update(measure(name, text, repeat))
+        timings.append(round_timings)
+
+    results = {}
+    for key in timings[0]:
+        relative = [round_timings[key]["min"] / round_timings["calibration"]["min"] for round_timings in timings]
+        results[key] = {
+            "min": min(round_timings[key]["min"] for round_timings in timings),
+            "median": statistics.median(round_timings[key]["median"] for round_timings in timings),
+            "relative": min(relative),
+            # how far apart the rounds were, the noise this measurement has to be read with
+            "spread": max(relative) / min(relative) - 1,
+        }
+    return {
+        "format": FORMAT_VERSION,
+        "python": platform.python_version(),
+        "scale": scale,
+        "results": results,
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for key, timing in results["results"].items():
+        reference = baseline["results"].get(key)
+        if reference is None or key == "calibration": continue
+        ratio = timing["relative"] / reference["relative"]
+        # a slowdown only counts beyond the noise both measurements showed between their rounds
+        allowed = 1 + threshold + reference["spread"] + timing["spread"]
+        status = "REGRESSION" if ratio > allowed else "ok"
+        print(f"{key:<24} {reference['min'] * 1e3:10.3f} ms -> {timing['min'] * 1e3:10.3f} ms  {ratio:6.2f}x (allowed {allowed:4.2f}x)  {status}")
+        if status != "ok":
+            regressions.append(key)
+    return regressions
+
+def main():
+    arguments = argparse.ArgumentParser(description="pysharp lexer, parser and interpreter benchmarks")
+    arguments.add_argument("--output", help="write the results as JSON to this file")
+    arguments.add_argument("--baseline", default=BASELINE, help=f"baseline to compare against (default {BASELINE})")
+    arguments.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before failing, 0.10 = 10%%")
+    arguments.add_argument("--repeat", type=int, default=5, help="timed runs of every benchmark in a round")
+    arguments.add_argument("--rounds", type=int, default=3, help="rounds over all benchmarks, their spread is the allowed noise")
+    arguments.add_argument("--scale", type=float, default=1.0, help="multiplies the size of every generated program")
+    arguments.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with these results")
+    options = arguments.parse_args()
+
+    results = run(options.scale, options.repeat, max(2, options.rounds))
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if options.save_baseline:
+        with open(options.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"baseline written to {options.baseline}")
+        return
+
+    try:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = None
+
+    if baseline is None or baseline.get("format") != FORMAT_VERSION or baseline.get("scale") != options.scale:
+        for key, timing in results["results"].items():
+            print(f"{key:<24} {timing['min'] * 1e3:10.3f} ms")
+        return
+
+    regressions = compare(results, baseline, options.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {options.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
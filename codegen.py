@@ -0,0 +1,287 @@
+import ast
+import builtins
+from number import Number
+from errors import RuntimeResult, RuntimeError, RuntimeErrorRaised
+from nodes import NumberNode, BinaryOperatorNode, UnaryOperatorNode, VariableAccessNode, VariableAssignmentNode, IfNode
+from program_cache import ProgramCache
+from constants import *
+
+COMPARISON_OPERATORS = {
+    TOKEN_EQUALS_EQUALS: ast.Eq,
+    TOKEN_NOT_EQUALS: ast.NotEq,
+    TOKEN_LESS_THAN: ast.Lt,
+    TOKEN_GREATER_THAN: ast.Gt,
+    TOKEN_LESS_EQUALS: ast.LtE,
+    TOKEN_GREATER_EQUALS: ast.GtE,
+}
+ARITHMETIC_OPERATORS = {
+    TOKEN_PLUS: ast.Add,
+    TOKEN_MINUS: ast.Sub,
+    TOKEN_MULTIPLY: ast.Mult,
+    TOKEN_POWER: ast.Pow,
+}
+FUNCTION_NAME = "program"
+# pysharp variables become Python locals with this prefix, so they clash with neither keywords nor the helpers
+VARIABLE_PREFIX = "v_"
+
+class Failure(builtins.Exception):
+    def __init__(self, origin: int, details: str):
+        super().__init__(details)
+        self.origin = origin
+        self.details = details
+
+def divide(left, right, origin: int):
+    if right == 0:
+        raise Failure(origin, "Disivion by zero is illegal")
+    return left / right
+
+def undefined(origin: int, name: str):
+    raise Failure(origin, f"Trying to access variable {name} which is undefined")
+
+# where a value came from, which is where the Interpreter positions it: through lets and into the
+# taken branch of ifs. None when that depends on the branch taken, and has to be tracked while running
+def static_origin(node):
+    while type(node) is VariableAssignmentNode:
+        node = node.value_node
+    return None if type(node) is IfNode else node
+
+class CompiledProgram:
+    def __init__(self, function, nodes: list, names: list, assigned: list):
+        self.function = function
+        # the nodes the generated code refers to by index, for error and result positions
+        self.nodes = nodes
+        self.names = names
+        self.assigned = assigned
+
+    # bindings maps variable names to plain values, the variables the program assigns are written back to it
+    def __call__(self, bindings: dict, context=None):
+        return self.run(bindings, context)[0]
+
+    # the value and the node it came from
+    def run(self, bindings: dict, context=None):
+        try:
+            value, origin = self.function(bindings)
+        except Failure as failure:
+            node = self.nodes[failure.origin]
+            raise RuntimeErrorRaised(RuntimeError(node.pos_start, node.pos_end, failure.details, context))
+        return value, self.nodes[origin]
+
+class CodeGenerator:
+    def __init__(self):
+        self.nodes = []
+        self.node_indices = {}
+        self.names = {}
+        self.assigned = {}
+        self.tracking = 0
+
+    def generate(self, node, filename: str = "<program>") -> CompiledProgram:
+        origin = static_origin(node)
+        track = None if origin is not None else self.new_tracking()
+        expression = self.expression(node, track)
+        result = ast.Tuple([expression, ast.Constant(self.index(origin)) if track is None else self.load(track)], ast.Load())
+
+        # def program(bindings):
+        #     v_x = bindings.get("x") ...
+        #     try: return (value, origin)
+        #     finally: bindings["y"] = v_y ... for the variables it may assign, None when undefined
+        body = [
+            ast.Assign([self.store(VARIABLE_PREFIX + name)], self.call(ast.Attribute(self.load("bindings"), "get", ast.Load()), ast.Constant(name)))
+            for name in self.names
+        ]
+        write_back = [
+            ast.Assign([ast.Subscript(self.load("bindings"), ast.Constant(name), ast.Store())], self.load(VARIABLE_PREFIX + name))
+            for name in self.assigned
+        ]
+        body.append(ast.Try([ast.Return(result)], [], [], write_back) if write_back else ast.Return(result))
+
+        arguments = ast.arguments([], [ast.arg("bindings")], None, [], [], None, [])
+        function = ast.FunctionDef(FUNCTION_NAME, arguments, body, [], None)
+        module = ast.fix_missing_locations(ast.Module([function], []))
+
+        namespace = {"_divide": divide, "_undefined": undefined}
+        exec(compile(module, filename, "exec"), namespace)
+        return CompiledProgram(namespace[FUNCTION_NAME], self.nodes, list(self.names), list(self.assigned))
+
+    def index(self, node) -> int:
+        index = self.node_indices.get(node)
+        if index is None:
+            index = self.node_indices[node] = len(self.nodes)
+            self.nodes.append(node)
+        return index
+
+    def new_tracking(self) -> str:
+        self.tracking += 1
+        return f"_origin{self.tracking}"
+
+    def load(self, name: str):
+        return ast.Name(name, ast.Load())
+
+    def store(self, name: str):
+        return ast.Name(name, ast.Store())
+
+    def call(self, function, *arguments):
+        return ast.Call(function, list(arguments), [])
+
+    # (track := origin, value)[1]: records the node a value came from before evaluating it
+    def tracked(self, track: str, origin, value):
+        return ast.Subscript(ast.Tuple([ast.NamedExpr(self.store(track), ast.Constant(self.index(origin))), value], ast.Load()), ast.Constant(1), ast.Load())
+
+    def expression(self, node, track: str = None):
+        results = []
+        # (node, name of the variable tracking its origin, children done, data kept for when they are)
+        work = [(node, track, False, None)]
+
+        # post-order walk with an explicit stack so deeply nested input cannot overflow the Python stack
+        while work:
+            node, track, children_done, data = work.pop()
+            node_type = type(node)
+
+            if node_type is NumberNode:
+                results.append(ast.Constant(node.token.value))
+            elif node_type is VariableAccessNode:
+                name = node.var_name_token.value
+                self.names.setdefault(name)
+                variable = self.load(VARIABLE_PREFIX + name)
+                # v_x if v_x is not None else _undefined(origin, "x")
+                check = ast.Compare(variable, [ast.IsNot()], [ast.Constant(None)])
+                results.append(ast.IfExp(check, self.load(VARIABLE_PREFIX + name), self.call(self.load("_undefined"), ast.Constant(self.index(node)), ast.Constant(name))))
+            elif not children_done:
+                if node_type is BinaryOperatorNode:
+                    right_track = None
+                    if node.operator_token.type == TOKEN_DIVIDE and static_origin(node.right_node) is None:
+                        right_track = self.new_tracking()
+                    work.append((node, track, True, right_track))
+                    work += [(node.right_node, right_track, False, None), (node.left_node, None, False, None)]
+                elif node_type is UnaryOperatorNode:
+                    work += [(node, track, True, None), (node.node, None, False, None)]
+                elif node_type is VariableAssignmentNode:
+                    work += [(node, track, True, None), (node.value_node, track, False, None)]
+                elif node_type is IfNode:
+                    work.append((node, track, True, None))
+                    if node.else_case:
+                        work.append((node.else_case, self.branch_track(node.else_case, track), False, None))
+                    for condition, expr in reversed(node.cases):
+                        work += [(expr, self.branch_track(expr, track), False, None), (condition, None, False, None)]
+                else:
+                    raise Exception(f"No code generation for {node_type.__name__}")
+            elif node_type is BinaryOperatorNode:
+                right = results.pop()
+                left = results.pop()
+                results.append(self.binary(node, left, right, data))
+            elif node_type is UnaryOperatorNode:
+                results.append(self.unary(node, results.pop()))
+            elif node_type is VariableAssignmentNode:
+                name = node.var_name_token.value
+                self.names.setdefault(name)
+                self.assigned.setdefault(name)
+                results.append(ast.NamedExpr(self.store(VARIABLE_PREFIX + name), results.pop()))
+            else:
+                results.append(self.conditional(node, track, results))
+
+        return results.pop()
+
+    # a branch of a tracked if tracks its own origin only when that again depends on a branch
+    def branch_track(self, expr, track: str):
+        return track if track is not None and static_origin(expr) is None else None
+
+    def binary(self, node, left, right, right_track: str):
+        operator_token = node.operator_token
+        operator_type = operator_token.type
+
+        if operator_type == TOKEN_DIVIDE:
+            # the error is positioned where the Interpreter positions the right operand's value
+            origin = self.load(right_track) if right_track else ast.Constant(self.index(static_origin(node.right_node)))
+            return self.call(self.load("_divide"), left, right, origin)
+        elif operator_type in ARITHMETIC_OPERATORS:
+            return ast.BinOp(left, ARITHMETIC_OPERATORS[operator_type](), right)
+        elif operator_type in COMPARISON_OPERATORS:
+            # comparisons are 0 or 1
+            comparison = ast.Compare(left, [COMPARISON_OPERATORS[operator_type]()], [right])
+            return ast.IfExp(comparison, ast.Constant(1), ast.Constant(0))
+
+        # int(left and right): Python's and/or short-circuit like pysharp's
+        operator = ast.And() if operator_token.value == "and" else ast.Or()
+        return self.call(self.load("int"), ast.BoolOp(operator, [left, right]))
+
+    def unary(self, node, operand):
+        if node.operator_token.type == TOKEN_MINUS:
+            return ast.BinOp(operand, ast.Mult(), ast.Constant(-1))
+        elif node.operator_token.matches(TOKEN_KEYWORD, "not"):
+            return ast.IfExp(ast.Compare(operand, [ast.Eq()], [ast.Constant(0)]), ast.Constant(1), ast.Constant(0))
+        return operand
+
+    def conditional(self, node, track: str, results: list):
+        # the branch values are on top of the conditions, in the order the work stack produced them
+        count = 2 * len(node.cases) + (1 if node.else_case else 0)
+        values = results[len(results) - count:]
+        del results[len(results) - count:]
+
+        if node.else_case:
+            expression = self.branch(node.else_case, track, values[-1])
+        elif track is not None:
+            # no branch taken: nothing, positioned at the if itself
+            expression = self.tracked(track, node, ast.Constant(None))
+        else:
+            expression = ast.Constant(None)
+
+        for index in reversed(range(len(node.cases))):
+            condition, value = values[2 * index], values[2 * index + 1]
+            expression = ast.IfExp(condition, self.branch(node.cases[index][1], track, value), expression)
+        return expression
+
+    def branch(self, expr, track: str, value):
+        if track is None or static_origin(expr) is None:
+            return value
+        return self.tracked(track, static_origin(expr), value)
+
+# programs compiled for nodes the program cache keeps, by node identity
+compiled_programs = ProgramCache()
+
+def compile_program(node, filename: str = "<program>") -> CompiledProgram:
+    return CodeGenerator().generate(node, filename)
+
+def compiled(node):
+    program = compiled_programs.get(node)
+    if program is None:
+        try:
+            program = compile_program(node)
+        except RecursionError:
+            # too deeply nested for compile(), it runs on the virtual machine instead
+            program = False
+        compiled_programs.put(node, program)
+    return program
+
+def evaluate(node, context):
+    # the virtual machine does not recurse, so it takes what is nested too deeply for either of the others
+    program = compiled(node)
+    if program is False:
+        from compiler import Compiler
+        from vm import VirtualMachine
+        return VirtualMachine().run(Compiler().compile(node), context)
+    # generated code is not metered, so limited evaluations run on the allocation-free evaluator
+    if context.limits is not None:
+        from interpreter import Interpreter
+        return Interpreter().evaluate(node, context)
+
+    res = RuntimeResult()
+    symbol_table = context.symbol_table
+    bindings = {}
+    for name in program.names:
+        number = symbol_table.get(name)
+        bindings[name] = None if number is None else number.value
+    initial = dict(bindings)
+
+    try:
+        value, origin = program.run(bindings, context)
+    except RuntimeErrorRaised as raised:
+        return res.failure(raised.error)
+    finally:
+        # what the program assigned before it finished or failed stays assigned, as with the Interpreter
+        for name in program.assigned:
+            assigned = bindings[name]
+            if assigned is not initial[name]:
+                symbol_table.set(name, None if assigned is None else Number(assigned).set_context(context))
+
+    if value is None:
+        return res.success(None)
+    return res.success(Number(value).set_context(context).set_pos(origin.pos_start, origin.pos_end))
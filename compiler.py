@@ -0,0 +1,72 @@
+from number import Number, BINARY_OPERATIONS, operator_key
+from constants import *
+
+class Label:
+    __slots__ = ("target",)
+
+    def __init__(self):
+        self.target = None
+
+class Compiler:
+    def compile(self, node):
+        instructions = []
+        work = [node]
+
+        # the tree is walked with an explicit work stack so deeply nested input cannot overflow the Python stack
+        while work:
+            item = work.pop()
+            if isinstance(item, tuple):
+                instructions.append(item)
+            elif isinstance(item, Label):
+                item.target = len(instructions)
+            else:
+                method_name = f"compile_{type(item).__name__}"
+                method = getattr(self, method_name, self.no_compile_method)
+                work.extend(reversed(method(item)))
+
+        return [
+            (opcode, argument.target if isinstance(argument, Label) else argument, node)
+            for opcode, argument, node in instructions
+        ]
+
+    def no_compile_method(self, node):
+        raise Exception(f"No compile_{type(node).__name__} method defined")
+
+    def compile_NumberNode(self, node):
+        return [(OPCODE_LOAD_CONST, node.token.value, node)]
+
+    def compile_BinaryOperatorNode(self, node):
+        operator_token = node.operator_token
+        # the vm only ever has Numbers on its stack
+        operation = BINARY_OPERATIONS[(operator_key(operator_token), Number, Number)]
+        if operator_token.type == TOKEN_KEYWORD:
+            # the left operand stays on the stack for the operation unless it decides the result on its own
+            end = Label()
+            jump = OPCODE_JUMP_IF_TRUE_OR_KEEP if operator_token.value == "or" else OPCODE_JUMP_IF_FALSE_OR_KEEP
+            return [node.left_node, (jump, end, node), node.right_node, (OPCODE_BINARY, operation, node), end]
+        return [node.left_node, node.right_node, (OPCODE_BINARY, operation, node)]
+
+    def compile_UnaryOperatorNode(self, node):
+        if node.operator_token.type == TOKEN_MINUS:
+            return [node.node, (OPCODE_NEGATE, None, node)]
+        elif node.operator_token.matches(TOKEN_KEYWORD, "not"):
+            return [node.node, (OPCODE_NOT, None, node)]
+        return [node.node, (OPCODE_POSITIVE, None, node)]
+
+    def compile_VariableAccessNode(self, node):
+        return [(OPCODE_LOAD_VARIABLE, node.var_name_token.value, node)]
+
+    def compile_VariableAssignmentNode(self, node):
+        return [node.value_node, (OPCODE_STORE_VARIABLE, node.var_name_token.value, node)]
+
+    def compile_IfNode(self, node):
+        sequence = []
+        end = Label()
+
+        for condition, expr in node.cases:
+            next_case = Label()
+            sequence += [condition, (OPCODE_JUMP_IF_FALSE, next_case, condition), expr, (OPCODE_JUMP, end, expr), next_case]
+
+        sequence.append(node.else_case or (OPCODE_LOAD_NONE, None, node))
+        sequence.append(end)
+        return sequence
@@ -42,3 +42,17 @@ KEYWORDS = [
 DIGITS = string.digits
 LETTERS = string.ascii_letters
 LETTERS_DIGITS = LETTERS + DIGITS
+
+# OPCODES
+OPCODE_LOAD_CONST       = "LOAD_CONST"
+OPCODE_LOAD_NONE        = "LOAD_NONE"
+OPCODE_LOAD_VARIABLE    = "LOAD_VARIABLE"
+OPCODE_STORE_VARIABLE   = "STORE_VARIABLE"
+OPCODE_BINARY           = "BINARY"
+OPCODE_POSITIVE         = "POSITIVE"
+OPCODE_NEGATE           = "NEGATE"
+OPCODE_NOT              = "NOT"
+OPCODE_JUMP             = "JUMP"
+OPCODE_JUMP_IF_FALSE    = "JUMP_IF_FALSE"
+OPCODE_JUMP_IF_FALSE_OR_KEEP = "JUMP_IF_FALSE_OR_KEEP"
+OPCODE_JUMP_IF_TRUE_OR_KEEP  = "JUMP_IF_TRUE_OR_KEEP"
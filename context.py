@@ -4,4 +4,9 @@ class Context:
         self.display_name = display_name
         self.parent = parent
         self.parent_entry_pos = parent_entry_pos
-        self.symbol_table = None
\ No newline at end of file
+        self.symbol_table = None
+        # the Limits evaluations in this context run under, and what is left of them for the current one
+        self.limits = None
+        self.deadline = None
+        self.steps = None
+        self.steps_left = None
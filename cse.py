@@ -0,0 +1,98 @@
+import math
+from nodes import NumberNode, BinaryOperatorNode, UnaryOperatorNode, VariableAccessNode, VariableAssignmentNode, IfNode, children
+
+# parent recorded for a structure seen under different parents, or at the top of a tree
+MIXED = -1
+
+class CommonSubexpressions:
+    def __init__(self):
+        self.nodes = 0
+        # nodes whose structure was already seen, which hash-consing would have stored once
+        self.deduplicated = 0
+        # structures evaluated once per run instead of once per copy
+        self.shared = 0
+
+    # identical pure subtrees (no let inside) across all the trees are hash-consed into one structure,
+    # and every copy of a repeated operation points to the first as its representative. copies keep their
+    # own nodes so values and errors are still positioned where they are, in whichever tree they are
+    def share(self, roots):
+        # structure -> id, where children are identified by their ids. ids are given in post-order,
+        # so a parent's id is always larger than its children's
+        ids = {}
+        representatives, counts, parents = [], [], []
+        # ids of the structures with a let inside, which are never the same as another
+        impure = set()
+        operations = []
+
+        for root in roots:
+            results = []
+            # (node, its children once they were pushed)
+            work = [(root, None)]
+
+            # post-order walk with an explicit stack so deeply nested input cannot overflow the Python stack
+            while work:
+                node, node_children = work.pop()
+
+                if node_children is None:
+                    node_children = children(node)
+                    if node_children:
+                        work.append((node, node_children))
+                        work.extend([(child, None) for child in reversed(node_children)])
+                        continue
+
+                child_ids = results[len(results) - len(node_children):]
+                del results[len(results) - len(node_children):]
+
+                key = None if child_ids and not impure.isdisjoint(child_ids) else self.key(node, child_ids)
+                identity = None if key is None else ids.get(key)
+                if identity is None:
+                    identity = len(representatives)
+                    representatives.append(node)
+                    counts.append(1)
+                    parents.append(None)
+                    if key is None:
+                        impure.add(identity)
+                    else:
+                        ids[key] = identity
+                else:
+                    counts[identity] += 1
+                    self.deduplicated += 1
+                self.nodes += 1
+
+                for child in child_ids:
+                    parents[child] = identity if parents[child] in (None, identity) else MIXED
+                if type(node) is BinaryOperatorNode or type(node) is UnaryOperatorNode:
+                    operations.append((node, identity))
+                results.append(identity)
+
+            parents[results[0]] = MIXED
+
+        # a repeated structure is only worth remembering when it is not always inside the same remembered one:
+        # the 12 copies of a*b in 12 copies of (a*b+c) are evaluated once with them
+        shared = [False] * len(representatives)
+        covered = [False] * len(representatives)
+        for identity in reversed(range(len(representatives))):
+            parent = parents[identity]
+            covered[identity] = parent != MIXED and (shared[parent] or covered[parent]) and counts[identity] == counts[parent]
+            shared[identity] = identity not in impure and counts[identity] > 1 and not covered[identity] and type(representatives[identity]) in (BinaryOperatorNode, UnaryOperatorNode)
+        self.shared += sum(shared)
+
+        for node, identity in operations:
+            node.shared = representatives[identity] if shared[identity] else None
+
+    def key(self, node, child_ids: list):
+        node_type = type(node)
+        if node_type is VariableAssignmentNode:
+            return None
+        elif node_type is NumberNode:
+            value = node.token.value
+            # 1 and 1.0, 0.0 and -0.0 are equal in Python but not in what pysharp prints
+            return (NumberNode, type(value), value, math.copysign(1, value) if type(value) is float else 1)
+        elif node_type is VariableAccessNode:
+            return (VariableAccessNode, node.var_name_token.value)
+        elif node_type is IfNode:
+            return (IfNode, node.else_case is not None, *child_ids)
+        return (node_type, node.operator_token.type, node.operator_token.value, *child_ids)
+
+    def stats(self) -> dict:
+        return {"nodes": self.nodes, "deduplicated": self.deduplicated, "shared": self.shared}
@@ -1,3 +1,4 @@
+import builtins
 from string_arrows import string_arrows
 
 class Exception:
@@ -10,7 +11,7 @@ class Exception:
     def to_string(self) -> str:
         result = f"{self.error_name}: {self.details}\n"
         result += f"File {self.pos_start.filename}, line {self.pos_start.line + 1}"
-        result += "\n\n" + string_arrows(self.pos_start.content, self.pos_start, self.pos_end)
+        result += "\n\n" + string_arrows(self.pos_start.source, self.pos_start, self.pos_end)
         return result
     
 class IllegalCharacterException(Exception):
@@ -33,7 +34,7 @@ class RuntimeError(Exception):
     def to_string(self):
         result = self.generate_traceback()
         result += f"{self.error_name}: {self.details}\n"
-        result += "\n" + string_arrows(self.pos_start.content, self.pos_start, self.pos_end)
+        result += "\n" + string_arrows(self.pos_start.source, self.pos_start, self.pos_end)
         return result
         
     def generate_traceback(self):
@@ -63,4 +64,14 @@ class RuntimeResult:
     
     def failure(self, error):
         self.error = error
-        return self
\ No newline at end of file
+        return self
+
+class RuntimeErrorRaised(builtins.Exception):
+    def __init__(self, error):
+        super().__init__(error.details)
+        self.error = error
+
+class LexerErrorRaised(builtins.Exception):
+    def __init__(self, error):
+        super().__init__(error.details)
+        self.error = error
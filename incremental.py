@@ -0,0 +1,285 @@
+from bisect import bisect_left
+from lexer import Lexer, TOKEN_PATTERN
+from parser import TokenParser, BINARY_OPERATORS
+from pys_token import Token
+from position import Position
+from source import Source
+from nodes import BinaryOperatorNode, UnaryOperatorNode, VariableAssignmentNode, IfNode, children
+from constants import *
+
+class IncrementalParser:
+    def __init__(self, filename: str, text: str):
+        self.filename = filename
+        self.source = Source(filename, text)
+        self.tokens = None
+        self.node = None
+        self.error = None
+        # how many tokens the last edit had to parse again
+        self.reparsed = 0
+        self.relex()
+        self.reparse()
+
+    @property
+    def text(self):
+        return self.source.buffer
+
+    # replaces `deleted` characters at `offset` with `inserted`. Tokens and nodes outside the edited
+    # region are kept (the Position objects after it are shifted in place), so the previous tree is
+    # consumed by this call and must not be used afterwards
+    def edit(self, offset: int, deleted: int, inserted: str):
+        source = self.source
+        old_text = source.buffer
+        if offset < 0 or deleted < 0 or offset + deleted > len(old_text):
+            raise ValueError(f"edit at {offset} deleting {deleted} characters is outside the text")
+
+        source.buffer = old_text[:offset] + inserted + old_text[offset + deleted:]
+        source.end = len(source.buffer)
+        source.line_starts = None
+
+        if self.error or not self.tokens:
+            self.relex()
+            return self.reparse()
+
+        old_tokens = self.tokens
+        delta = len(inserted) - deleted
+        relexed = self.relex_window(old_tokens, offset, offset + deleted, delta)
+        if relexed is None:
+            self.relex()
+            return self.reparse()
+
+        first, resync, window = self.trim(old_tokens, *relexed, delta)
+        tokens = old_tokens[:first] + window + old_tokens[resync:]
+
+        found = self.find_primary(old_tokens, first, resync, window) or self.find_region(old_tokens, tokens, first, resync, len(window))
+        operator_path = None if found else self.find_operator(old_tokens, first, resync, window)
+        self.shift(old_tokens, resync, delta)
+        self.tokens = tokens
+
+        if not window and first == resync:
+            # only whitespace changed
+            self.reparsed = 0
+            return self.node, None
+        if operator_path is not None:
+            old = operator_path[-1]
+            self.reparsed = 1
+            self.node = self.replace(operator_path, BinaryOperatorNode(old.left_node, window[0], old.right_node))
+            return self.node, None
+        if found is None:
+            return self.reparse()
+
+        path, start, end = found
+        region = tokens[start:end]
+        closer = tokens[end]
+        ast = TokenParser(region + [Token(TOKEN_EOF, None, closer.pos_start, closer.pos_end)]).parse()
+        if ast.error:
+            # let the full parse report the error exactly as it would without an edit
+            return self.reparse()
+
+        self.reparsed = len(region)
+        self.node = self.replace(path, ast.node)
+        return self.node, None
+
+    def relex(self):
+        tokens, error = Lexer(self.filename, None, self.source).make_tokens()
+        self.tokens, self.error = (to_tokens(tokens, self.source), None) if not error else (None, error)
+
+    def reparse(self):
+        if self.error and self.tokens is None:
+            self.node = None
+            return None, self.error
+        ast = TokenParser(self.tokens).parse()
+        self.reparsed = len(self.tokens)
+        self.node, self.error = ast.node, ast.error
+        return self.node, self.error
+
+    # lexes the new text from the first token the edit can touch until the token stream is back in
+    # step with the old one: the lexer keeps no state between tokens, so once a new token starts
+    # where a shifted old one did, every token after it is unchanged
+    def relex_window(self, old_tokens, edit_start, edit_end, delta):
+        eof = len(old_tokens) - 1
+        first = bisect_left(old_tokens, edit_start, 0, eof, key=token_end)
+        resync = bisect_left(old_tokens, edit_end, first, eof, key=token_start)
+        # whatever lies between the previous token and the edit is whitespace, so lexing can start there
+        window_start = min(old_tokens[first].pos_start.index, edit_start)
+        buffer = self.source.buffer
+
+        while resync < eof:
+            window, error = Lexer(self.filename, None, self.source).make_tokens(window_start, old_tokens[resync].pos_start.index + delta)
+            if error: return None
+            window = to_tokens(window, self.source)
+            window.pop()
+
+            if not window:
+                return first, resync, window
+            # the window end cut the last token short if the full text continues it
+            last = window[-1]
+            match = TOKEN_PATTERN.match(buffer, last.pos_start.index)
+            if match.end(match.lastgroup) == last.pos_end.index:
+                return first, resync, window
+            resync = bisect_left(old_tokens, match.end(match.lastgroup) - delta, resync + 1, eof, key=token_start)
+
+        window, error = Lexer(self.filename, None, self.source).make_tokens(window_start)
+        if error: return None
+        return first, len(old_tokens), to_tokens(window, self.source)
+
+    # tokens at either end of the window that were lexed again unchanged keep their old objects,
+    # which the old nodes refer to, so the replaced range is only what the edit really changed
+    def trim(self, old_tokens, first, resync, window, delta):
+        start, end = 0, len(window)
+        while start < end and first < resync and same_token(old_tokens[first], window[start], 0):
+            first += 1
+            start += 1
+        while start < end and first < resync and same_token(old_tokens[resync - 1], window[end - 1], delta):
+            resync -= 1
+            end -= 1
+        # touching tokens share a Position: the one ending the kept token must not be shifted with the next
+        if first == resync and delta and 0 < first < len(old_tokens) and old_tokens[first - 1].pos_end is old_tokens[first].pos_start:
+            if end < len(window):
+                resync += 1
+                end += 1
+            else:
+                first -= 1
+                start -= 1
+        return first, resync, window[start:end]
+
+    # an atom or a parenthesized group can stand wherever another one does, so one replaced by the
+    # other leaves the rest of the tree as it was, parentheses around it or not
+    def find_primary(self, old_tokens, first, resync, window):
+        old = old_tokens[first:resync]
+        if not self.is_primary(old) or not self.is_primary(window):
+            return None
+        inner = old if len(old) == 1 else old[1:-1]
+        path = self.find_path(inner[0], inner[-1])
+        return None if path is None else (path, first, first + len(window))
+
+    def is_primary(self, tokens):
+        if len(tokens) == 1:
+            return tokens[0].type in (TOKEN_INT, TOKEN_FLOAT, TOKEN_IDENTIFIER)
+        return len(tokens) > 2 and tokens[0].type == TOKEN_LEFT_PARENTHESIS and self.unmatched(tokens, 1, 1, TOKEN_RIGHT_PARENTHESIS, TOKEN_LEFT_PARENTHESIS) == len(tokens) - 1
+
+    # a binary operator swapped for one that binds the same way only changes its own node
+    def find_operator(self, old_tokens, first, resync, window):
+        if resync - first != 1 or len(window) != 1:
+            return None
+        old_token = old_tokens[first]
+        operator = binary_operator(old_token)
+        if operator is None or operator != binary_operator(window[0]):
+            return None
+
+        path = [self.node]
+        target = old_token.pos_start.index
+        while True:
+            node = path[-1]
+            if isinstance(node, BinaryOperatorNode) and node.operator_token is old_token:
+                return path
+            candidates = [child for child in children(node) if child.pos_start.index <= target]
+            if not candidates:
+                # a unary '+' or '-'
+                return None
+            path.append(candidates[-1])
+
+    # the innermost parenthesized group around the relexed tokens whose contents are exactly one
+    # node of the old tree: inside parentheses the parser reads a whole expression and stops at ')',
+    # so parsing the group on its own gives the node a full parse would
+    def find_region(self, old_tokens, tokens, first, resync, window_size):
+        if resync == len(old_tokens):
+            return None
+        # if the edit opens or closes a group, parentheses outside it may pair up differently now
+        if self.balance(old_tokens[first:resync]) != self.balance(tokens[first:first + window_size]):
+            return None
+        shift = window_size - (resync - first)
+        start, end = first - 1, first + window_size
+
+        while True:
+            start = self.unmatched(tokens, start, -1, TOKEN_LEFT_PARENTHESIS, TOKEN_RIGHT_PARENTHESIS)
+            end = self.unmatched(tokens, end, 1, TOKEN_RIGHT_PARENTHESIS, TOKEN_LEFT_PARENTHESIS)
+            if start is None or end is None:
+                return None
+
+            old_start, old_end = start + 1, end - 1 - shift
+            if old_start <= old_end:
+                path = self.find_path(old_tokens[old_start], old_tokens[old_end])
+                if path is not None:
+                    return path, start + 1, end
+            start -= 1
+            end += 1
+
+    def balance(self, tokens):
+        return sum(1 if token.type == TOKEN_LEFT_PARENTHESIS else -1 if token.type == TOKEN_RIGHT_PARENTHESIS else 0 for token in tokens)
+
+    def unmatched(self, tokens, index, step, wanted, nested):
+        depth = 0
+        while 0 <= index < len(tokens):
+            token_type = tokens[index].type
+            if token_type == wanted:
+                if depth == 0:
+                    return index
+                depth -= 1
+            elif token_type == nested:
+                depth += 1
+            index += step
+        return None
+
+    # root to the node spanning exactly first_token..last_token, found through the old offsets:
+    # a node starts no earlier than its parent and its children are in source order
+    def find_path(self, first_token, last_token):
+        path = [self.node]
+        target = first_token.pos_start.index
+
+        while True:
+            node = path[-1]
+            # an if starts at its 'if' and a let at its 'let', before the span they report
+            if node.pos_start is first_token.pos_start and node.pos_end is last_token.pos_end and not isinstance(node, (IfNode, VariableAssignmentNode)):
+                return path
+            candidates = [child for child in children(node) if child.pos_start.index <= target]
+            if not candidates:
+                return None
+            path.append(candidates[-1])
+
+    def shift(self, old_tokens, resync, delta):
+        previous_end = None
+        for token in old_tokens[resync:]:
+            if token.pos_start is not previous_end:
+                token.pos_start.index += delta
+            token.pos_end.index += delta
+            previous_end = token.pos_end
+
+    # builds new ancestors along the path, every other node is reused as is
+    def replace(self, path, node):
+        for parent, old in zip(reversed(path[:-1]), reversed(path[1:])):
+            node = self.with_child(parent, old, node)
+        return node
+
+    def with_child(self, parent, old, new):
+        if isinstance(parent, BinaryOperatorNode):
+            if parent.left_node is old:
+                return BinaryOperatorNode(new, parent.operator_token, parent.right_node)
+            return BinaryOperatorNode(parent.left_node, parent.operator_token, new)
+        elif isinstance(parent, UnaryOperatorNode):
+            return UnaryOperatorNode(parent.operator_token, new)
+        elif isinstance(parent, VariableAssignmentNode):
+            return VariableAssignmentNode(parent.var_name_token, new)
+        cases = [(new if condition is old else condition, new if expr is old else expr) for condition, expr in parent.cases]
+        return IfNode(cases, new if parent.else_case is old else parent.else_case)
+
+# the lexer's tuples as Token objects, whose Positions an edit moves in place.
+# touching tokens share a Position, which trim and shift allow for
+def to_tokens(lexed, source) -> list:
+    tokens, last_end, last_index = [], None, -1
+    for token_type, value, start, end in lexed:
+        pos_start = last_end if start == last_index else Position(start, source)
+        last_end, last_index = Position(end, source), end
+        tokens.append(Token(token_type, value, pos_start, last_end))
+    return tokens
+
+def binary_operator(token):
+    return BINARY_OPERATORS.get(token.type) or BINARY_OPERATORS.get((token.type, token.value))
+
+def same_token(old, new, delta):
+    return old.type == new.type and old.value == new.value and old.pos_start.index + delta == new.pos_start.index and old.pos_end.index + delta == new.pos_end.index
+
+def token_start(token):
+    return token.pos_start.index
+
+def token_end(token):
+    return token.pos_end.index
@@ -1,10 +1,48 @@
-from distutils.log import error
-from number import Number
-from errors import RuntimeResult, RuntimeError
+from number import Number, BINARY_OPERATIONS, UNARY_OPERATIONS, operator_key, unsupported_binary, unsupported_unary
+from errors import RuntimeResult, RuntimeError, RuntimeErrorRaised
+from nodes import NumberNode, BinaryOperatorNode, UnaryOperatorNode, VariableAccessNode, VariableAssignmentNode, IfNode
+from limits import SIZED_OPERATORS
 from constants import *
 
+# operations of the allocation-free evaluation mode, on plain Python values
+VALUE_OPERATIONS = {
+    TOKEN_PLUS: lambda left, right: left + right,
+    TOKEN_MINUS: lambda left, right: left - right,
+    TOKEN_MULTIPLY: lambda left, right: left * right,
+    TOKEN_POWER: lambda left, right: left ** right,
+    TOKEN_EQUALS_EQUALS: lambda left, right: int(left == right),
+    TOKEN_NOT_EQUALS: lambda left, right: int(left != right),
+    TOKEN_LESS_THAN: lambda left, right: int(left < right),
+    TOKEN_GREATER_THAN: lambda left, right: int(left > right),
+    TOKEN_LESS_EQUALS: lambda left, right: int(left <= right),
+    TOKEN_GREATER_EQUALS: lambda left, right: int(left >= right),
+    (TOKEN_KEYWORD, "and"): lambda left, right: int(left and right),
+    (TOKEN_KEYWORD, "or"): lambda left, right: int(left or right),
+}
+
 class Interpreter:
+    def __init__(self):
+        self.evaluators = {
+            NumberNode: self.evaluate_NumberNode,
+            BinaryOperatorNode: self.evaluate_BinaryOperatorNode,
+            UnaryOperatorNode: self.evaluate_UnaryOperatorNode,
+            VariableAccessNode: self.evaluate_VariableAccessNode,
+            VariableAssignmentNode: self.evaluate_VariableAssignmentNode,
+            IfNode: self.evaluate_IfNode,
+        }
+        # values of shared subexpressions (see cse.py) by their representative. they stay valid until a
+        # variable changes: assignments clear them, callers that change variables another way call forget
+        self.memo = {}
+
+    def forget(self):
+        self.memo.clear()
+
     def visit(self, node, context):
+        if context.steps is not None:
+            context.steps -= 1
+            if context.steps < 0:
+                error = context.limits.check_steps(node, context)
+                if error: return RuntimeResult().failure(error)
         method_name = f"visit_{type(node).__name__}"
         method = getattr(self, method_name, self.no_visit_method)
         return method(node, context)
@@ -19,64 +57,83 @@ class Interpreter:
         
     def visit_BinaryOperatorNode(self, node, context):
         res = RuntimeResult()
+        shared = node.shared
+        if shared is not None and shared in self.memo:
+            return res.success(self.memo[shared].copy().set_pos(node.pos_start, node.pos_end))
+
         left = res.register(self.visit(node.left_node, context))
         if res.error: return res
+
+        # the right operand of and/or is not evaluated once the left one decides the result
+        if node.operator_token.type == TOKEN_KEYWORD and left.is_true() == (node.operator_token.value == "or"):
+            return res.success(self.remember(shared, left.short_circuited().set_pos(node.pos_start, node.pos_end)))
+
         right = res.register(self.visit(node.right_node, context))
         if res.error: return res
+
+        if context.limits is not None and node.operator_token.type in SIZED_OPERATORS:
+            error = context.limits.check_size(node, node.operator_token.type, left.value, right.value, context)
+            if error: return res.failure(error)
         
-        if node.operator_token.type == TOKEN_PLUS:
-            result, error = left.added_to(right)
-        elif node.operator_token.type == TOKEN_MINUS:
-            result, error = left.subbed_by(right)
-        elif node.operator_token.type == TOKEN_MULTIPLY:
-            result, error = left.multed_by(right)
-        elif node.operator_token.type == TOKEN_DIVIDE:
-            result, error = left.divided_by(right)
-        elif node.operator_token.type == TOKEN_POWER:
-            result, error = left.powed_by(right)
-        elif node.operator_token.type == TOKEN_EQUALS_EQUALS:
-            result, error = left.get_comparison_eq(right)
-        elif node.operator_token.type == TOKEN_NOT_EQUALS:
-            result, error = left.get_comparison_ne(right)
-        elif node.operator_token.type == TOKEN_LESS_THAN:
-            result, error = left.get_comparison_lt(right)
-        elif node.operator_token.type == TOKEN_GREATER_THAN:
-            result, error = left.get_comparison_gt(right)
-        elif node.operator_token.type == TOKEN_LESS_EQUALS:
-            result, error = left.get_comparison_lte(right)
-        elif node.operator_token.type == TOKEN_GREATER_EQUALS:
-            result, error = left.get_comparison_gte(right)
-        elif node.operator_token.matches(TOKEN_KEYWORD, "and"):
-            result, error = left.anded_by(right)
-        elif node.operator_token.matches(TOKEN_KEYWORD, "or"):
-            result, error = left.ored_by(right)
-        
+        # the inline cache holds while the node sees the operand types it saw last time, which it nearly always does
+        cache = node.cache
+        if cache is None or cache[0] is not type(left) or cache[1] is not type(right):
+            cache = self.dispatch_binary(node, left, right)
+        result, error = cache[2](left, right)
+
         if error:
             return res.failure(error)
-        return res.success(result.set_pos(node.pos_start, node.pos_end))
+        return res.success(self.remember(shared, result.set_pos(node.pos_start, node.pos_end)))
         
     def visit_UnaryOperatorNode(self, node, context):
         res = RuntimeResult()
+        shared = node.shared
+        if shared is not None and shared in self.memo:
+            return res.success(self.memo[shared].copy().set_pos(node.pos_start, node.pos_end))
+
         number = res.register(self.visit(node.node, context))
         if res.error: return res
         
-        error = None
-        
-        if node.operator_token.type == TOKEN_MINUS:
-            number, error = number.multed_by(Number(-1))
-        elif node.operator_token.type.matches(TOKEN_KEYWORD, "not"):
-            number, error = number.notted()
-        
+        cache = node.cache
+        if cache is None or cache[0] is not type(number):
+            cache = self.dispatch_unary(node, number)
+        number, error = cache[1](number)
+
         if error:
             return res.failure(error)
-        return res.success(number.set_pos(node.pos_start, node.pos_end))
+        return res.success(self.remember(shared, number.set_pos(node.pos_start, node.pos_end)))
+
+    # the operation for a node's operator and operand types, which is then cached on the node. an if without
+    # a taken branch is the only operand no operation takes, the other backends fail on it with a TypeError too
+    def dispatch_binary(self, node, left, right):
+        key = (operator_key(node.operator_token), type(left), type(right))
+        if key not in BINARY_OPERATIONS:
+            raise unsupported_binary(node.operator_token, left, right)
+        node.cache = (type(left), type(right), BINARY_OPERATIONS[key])
+        return node.cache
+
+    def dispatch_unary(self, node, operand):
+        key = (operator_key(node.operator_token), type(operand))
+        if key not in UNARY_OPERATIONS:
+            raise unsupported_unary(node.operator_token, operand)
+        node.cache = (type(operand), UNARY_OPERATIONS[key])
+        return node.cache
+
+    def remember(self, shared, value):
+        if shared is not None:
+            self.memo[shared] = value
+        return value
 
     def visit_VariableAccessNode(self, node, context):
         res = RuntimeResult()
         var_name = node.var_name_token.value
-        value = context.symbol_table.get(var_name)
+        symbol_table = context.symbol_table
+        binding = node.binding
+        value = symbol_table.values[binding[1] if binding[0] is symbol_table else symbol_table.slot(node.var_name_token.value)]
+        if value is None:
+            value = symbol_table.get(var_name)
 
-        if not value:
+        if value is None:
             return res.failure(RuntimeError(node.pos_start, node.pos_end, f"Trying to access variable {var_name} which is undefined", context))
         value = value.copy().set_pos(node.pos_start, node.pos_end)
         return res.success(value)
@@ -87,7 +144,10 @@ class Interpreter:
         value = res.register(self.visit(node.value_node, context))
         if res.error: return res
 
-        context.symbol_table.set(var_name, value)
+        symbol_table = context.symbol_table
+        binding = node.binding
+        symbol_table.values[binding[1] if binding[0] is symbol_table else symbol_table.slot(node.var_name_token.value)] = value
+        if self.memo: self.memo.clear()
         return res.success(value)
 
     def visit_IfNode(self, node, context):
@@ -103,26 +163,179 @@ class Interpreter:
                 return res.success(expr_value)
         
         if node.else_case:
-            else_value = res.register(self.visit(expr, context))
+            else_value = res.register(self.visit(node.else_case, context))
             if res.error: return res
             return res.success(else_value)
         
         return res.success(None)
 
 
+    # allocation-free mode: nodes evaluate to plain Python values and a RuntimeError
+    # (with its positions and context) is only built when evaluation actually fails
+    def evaluate(self, node, context):
+        if context.steps is not None: return self.evaluate_counted(node, context)
+        res = RuntimeResult()
+        try:
+            value, origin = self.evaluate_origin(node, context)
+        except RuntimeErrorRaised as raised:
+            return res.failure(raised.error)
+        if value is None:
+            return res.success(None)
+        return res.success(Number(value).set_context(context).set_pos(origin.pos_start, origin.pos_end))
+
+    def evaluate_node(self, node, context):
+        return self.evaluators[type(node)](node, context)
+
+    # a limited evaluation that needs its steps counted runs with a counting evaluate_node swapped in,
+    # so the others do not pay for it
+    def evaluate_counted(self, node, context):
+        res = RuntimeResult()
+        self.evaluate_node = self.evaluate_node_counted
+        try:
+            value, origin = self.evaluate_origin(node, context)
+        except RuntimeErrorRaised as raised:
+            return res.failure(raised.error)
+        finally:
+            del self.evaluate_node
+        if value is None:
+            return res.success(None)
+        return res.success(Number(value).set_context(context).set_pos(origin.pos_start, origin.pos_end))
+
+    def evaluate_node_counted(self, node, context):
+        self.step(node, context)
+        return self.evaluators[type(node)](node, context)
+
+    def step(self, node, context):
+        context.steps -= 1
+        if context.steps < 0:
+            error = context.limits.check_steps(node, context)
+            if error: raise RuntimeErrorRaised(error)
+
+    # also returns the node the value came from, which is where the Interpreter would have positioned it
+    def evaluate_origin(self, node, context):
+        if type(node) is VariableAssignmentNode:
+            if context.steps is not None: self.step(node, context)
+            value, origin = self.evaluate_origin(node.value_node, context)
+            self.assign(node, value, context)
+            return value, origin
+        elif type(node) is IfNode:
+            if context.steps is not None: self.step(node, context)
+            for condition, expr in node.cases:
+                if self.evaluate_node(condition, context) != 0:
+                    return self.evaluate_origin(expr, context)
+            if node.else_case:
+                return self.evaluate_origin(node.else_case, context)
+            return None, node
+        return self.evaluate_node(node, context), node
+
+    def evaluate_NumberNode(self, node, context):
+        return node.token.value
+
+    def evaluate_BinaryOperatorNode(self, node, context):
+        shared = node.shared
+        if shared is not None and shared in self.memo:
+            return self.memo[shared]
+
+        left = self.evaluate_node(node.left_node, context)
+        operator_token = node.operator_token
+
+        if operator_token.type == TOKEN_DIVIDE:
+            right, origin = self.evaluate_origin(node.right_node, context)
+            if right == 0:
+                raise RuntimeErrorRaised(RuntimeError(origin.pos_start, origin.pos_end, "Disivion by zero is illegal", context))
+            value = left / right
+        elif operator_token.type == TOKEN_KEYWORD and (left != 0) == (operator_token.value == "or"):
+            value = int(left)
+        else:
+            right = self.evaluate_node(node.right_node, context)
+            if operator_token.type in SIZED_OPERATORS and context.limits is not None:
+                error = context.limits.check_size(node, operator_token.type, left, right, context)
+                if error: raise RuntimeErrorRaised(error)
+            operation = VALUE_OPERATIONS.get(operator_token.type) or VALUE_OPERATIONS[(operator_token.type, operator_token.value)]
+            value = operation(left, right)
+        return self.remember(shared, value)
+
+    def evaluate_UnaryOperatorNode(self, node, context):
+        shared = node.shared
+        if shared is not None and shared in self.memo:
+            return self.memo[shared]
+
+        value = self.evaluate_node(node.node, context)
+
+        if node.operator_token.type == TOKEN_MINUS:
+            value = value * -1
+        elif node.operator_token.type == TOKEN_KEYWORD:
+            value = 1 if value == 0 else 0
+        return self.remember(shared, value)
+
+    def evaluate_VariableAccessNode(self, node, context):
+        var_name = node.var_name_token.value
+        symbol_table = context.symbol_table
+        binding = node.binding
+        value = symbol_table.values[binding[1] if binding[0] is symbol_table else symbol_table.slot(node.var_name_token.value)]
+        if value is None:
+            value = symbol_table.get(var_name)
+
+        if value is None:
+            raise RuntimeErrorRaised(RuntimeError(node.pos_start, node.pos_end, f"Trying to access variable {var_name} which is undefined", context))
+        return value.value
+
+    def evaluate_VariableAssignmentNode(self, node, context):
+        value = self.evaluate_node(node.value_node, context)
+        self.assign(node, value, context)
+        return value
+
+    def assign(self, node, value, context):
+        # the symbol table is shared with the other backends, so it keeps holding Numbers
+        number = None if value is None else Number(value).set_context(context).set_pos(node.value_node.pos_start, node.value_node.pos_end)
+        symbol_table = context.symbol_table
+        binding = node.binding
+        symbol_table.values[binding[1] if binding[0] is symbol_table else symbol_table.slot(node.var_name_token.value)] = number
+        if self.memo: self.memo.clear()
+
+    def evaluate_IfNode(self, node, context):
+        for condition, expr in node.cases:
+            if self.evaluate_node(condition, context) != 0:
+                return self.evaluate_node(expr, context)
+
+        if node.else_case:
+            return self.evaluate_node(node.else_case, context)
+        return None
+
+
 class SymbolTable:
     def __init__(self):
-        self.symbols = {}
+        self.values = []
+        self.slots = {}
         self.parent = None
 
+    @property
+    def symbols(self):
+        return {name: self.values[slot] for name, slot in self.slots.items() if self.values[slot] is not None}
+
+    def slot(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.values)
+            self.values.append(None)
+        return slot
+
+    # binds a variable node to its slot in this table, see Resolver. only the table a program is parsed for
+    # binds its nodes: cached programs run against other tables too, which look their slots up by name
+    def resolve(self, node):
+        slot = self.slot(node.var_name_token.value)
+        node.binding = (self, slot)
+        return slot
+
     def get(self, name):
-        value = self.symbols.get(name, None)
+        slot = self.slots.get(name)
+        value = None if slot is None else self.values[slot]
         if value is None and self.parent:
             return self.parent.get(name)
         return value
 
     def set(self, name, value):
-        self.symbols[name] = value
+        self.values[self.slot(name)] = value
 
     def remove(self, name):
-        del self.symbols[name]
\ No newline at end of file
+        self.values[self.slots[name]] = None
\ No newline at end of file
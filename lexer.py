@@ -1,137 +1,91 @@
-from  pys_token import Token
+import re
 from  constants import *
-from  errors import IllegalCharacterException, ExpectedCharacterError
+from  errors import IllegalCharacterException, ExpectedCharacterError, LexerErrorRaised
 from  position import Position
+from  source import Source
 
-class Lexer:
-    def __init__(self, filename: str, text: str):
-        self.filename = filename
-        self.text = text
-        self.position = Position(-1, 0, -1, filename, text)
-        self.current_character = None
-        self.next()
-    
-    def next(self):
-        self.position.next(self.current_character)
-        self.current_character = self.text[self.position.index] if self.position.index < len(self.text) else None
-        
-    def make_tokens(self) -> Token:
-        tokens = []
-        
-        while self.current_character is not None:
-            if self.current_character in " \t":
-                self.next()
-            elif self.current_character in DIGITS:
-                tokens.append(self.make_number())
-            elif self.current_character in LETTERS:
-                tokens.append(self.make_identifier())
-            elif self.current_character == "+":
-                tokens.append(Token(TOKEN_PLUS, pos_start=self.position))
-                self.next()
-            elif self.current_character == "-":
-                tokens.append(Token(TOKEN_MINUS, pos_start=self.position))
-                self.next()
-            elif self.current_character == "*":
-                tokens.append(Token(TOKEN_MULTIPLY, pos_start=self.position))
-                self.next()
-            elif self.current_character == "/":
-                tokens.append(Token(TOKEN_DIVIDE, pos_start=self.position))
-                self.next()
-            elif self.current_character == "^":
-                tokens.append(Token(TOKEN_POWER, pos_start=self.position))
-                self.next()
-            elif self.current_character == "(":
-                tokens.append(Token(TOKEN_LEFT_PARENTHESIS, pos_start=self.position))
-                self.next()
-            elif self.current_character == ")":
-                tokens.append(Token(TOKEN_RIGHT_PARENTHESIS, pos_start=self.position))
-                self.next()
-            elif self.current_character == "!":
-                token, error = self.make_not_equals()
-                if error: return [], error
-                tokens.append(token)
-            elif self.current_character == "=":
-                tokens.append(self.make_equals()) # debug here 
-            elif self.current_character == "<":
-                tokens.append(self.make_less_than())
-            elif self.current_character == ">":
-                tokens.append(self.make_greater_than())
-            else:
-                pos_start = self.position.copy()
-                char = self.current_character
-                self.next()
-                return "", IllegalCharacterException(pos_start, self.position, f"'{char}'")
-        tokens.append(Token(TOKEN_EOF, pos_start=self.position))
-        return tokens, ""
-
-    def make_number(self):
-        num_str = ""
-        dot_count = 0
-        pos_start = self.position.copy()
-        
-        while self.current_character is not None and self.current_character in DIGITS + ".":
-            if self.current_character == ".":
-                if dot_count == 1:
-                    break
-                dot_count +=  1
-                num_str += "."
-            else:
-                num_str += self.current_character
-            self.next()
-                
-        if dot_count == 0:
-            return Token(TOKEN_INT, int(num_str), pos_start, self.position)
-        return Token(TOKEN_FLOAT, float(num_str), pos_start, self.position)
+TOKEN_REGEX = r"""
+    [ \t]*(?:
+     (?P<FLOAT>[0-9]+\.[0-9]*)
+    |(?P<INT>[0-9]+)
+    |(?P<IDENTIFIER>[A-Za-z][A-Za-z0-9_]*)
+    |(?P<OPERATOR>==|!=|<=|>=|[-+*/^()=<>])
+    |(?P<NOT>!)
+    |(?P<ILLEGAL>.)
+    |(?P<EOF>\Z))
+"""
+TOKEN_PATTERN = re.compile(TOKEN_REGEX, re.VERBOSE | re.DOTALL)
+# the groups of TOKEN_REGEX by number, match.lastindex is cheaper than match.lastgroup
+GROUP_FLOAT, GROUP_INT, GROUP_IDENTIFIER, GROUP_OPERATOR, GROUP_NOT, GROUP_ILLEGAL, GROUP_EOF = range(1, 8)
+# memory-mapped files are scanned in place, as bytes
+BYTES_TOKEN_PATTERN = re.compile(TOKEN_REGEX.encode(), re.VERBOSE | re.DOTALL)
 
-    def make_identifier(self):
-        id_str = ""
-        pos_start = self.position.copy()
-        
-        while self.current_character is not None and self.current_character in LETTERS_DIGITS + "_":
-            id_str += self.current_character
-            self.next()
-        
-        token_type = TOKEN_KEYWORD if id_str in KEYWORDS else TOKEN_IDENTIFIER
-        return Token(token_type, id_str, pos_start, self.position)
+OPERATORS = {
+    "+": TOKEN_PLUS,
+    "-": TOKEN_MINUS,
+    "*": TOKEN_MULTIPLY,
+    "/": TOKEN_DIVIDE,
+    "^": TOKEN_POWER,
+    "(": TOKEN_LEFT_PARENTHESIS,
+    ")": TOKEN_RIGHT_PARENTHESIS,
+    "=": TOKEN_EQUALS,
+    "==": TOKEN_EQUALS_EQUALS,
+    "!=": TOKEN_NOT_EQUALS,
+    "<": TOKEN_LESS_THAN,
+    "<=": TOKEN_LESS_EQUALS,
+    ">": TOKEN_GREATER_THAN,
+    ">=": TOKEN_GREATER_EQUALS,
+}
 
-    def make_not_equals(self):
-        pos_start = self.position.copy()
-        self.next()
+BYTES_OPERATORS = {text.encode(): token_type for text, token_type in OPERATORS.items()}
 
-        if self.current_character == "=":
-            self.next()
-            return Token(TOKEN_NOT_EQUALS, pos_start=pos_start, pos_end=self.position), None
-        return None, ExpectedCharacterError(pos_start, self.position, "'=' is required after '!'")
+KEYWORD_SET = frozenset(KEYWORDS)
 
-    def make_equals(self):
-        token_type = TOKEN_EQUALS
-        pos_start = self.position.copy()
-        self.next()
+class Lexer:
+    def __init__(self, filename: str, text: str, source: Source = None):
+        self.filename = filename
+        self.text = text
+        self.source = source or Source(filename, text)
 
-        if self.current_character == "=":
-            self.next()
-            token_type = TOKEN_EQUALS_EQUALS
-        
-        return Token(token_type, pos_start=pos_start, pos_end=self.position)
+    # start/end narrow the scan to part of the source, the EOF token is then placed at end
+    def make_tokens(self, start: int = None, end: int = None):
+        try:
+            return list(self.generate_tokens(start, end)), ""
+        except LexerErrorRaised as raised:
+            return [], raised.error
 
-    def make_less_than(self):
-        token_type = TOKEN_LESS_THAN
-        pos_start = self.position.copy()
-        self.next()
+    # the tokens one at a time, for a Parser that reads them as they are scanned instead of from a list.
+    # a token is a plain (type, value, start, end) tuple of offsets into the source: the collector does not
+    # track tuples of numbers and strings, and the parser only makes a Token with Positions for the tokens
+    # it keeps in nodes. an illegal character raises LexerErrorRaised when the scan reaches it
+    def generate_tokens(self, start: int = None, end: int = None):
+        source = self.source
+        encoded = not isinstance(source.buffer, str)
+        pattern = BYTES_TOKEN_PATTERN if encoded else TOKEN_PATTERN
+        # locals are cheaper to look up than globals in the loop
+        operators, keywords = BYTES_OPERATORS if encoded else OPERATORS, KEYWORD_SET
 
-        if self.current_character == "=":
-            self.next()
-            token_type = TOKEN_LESS_EQUALS
-        
-        return Token(token_type, pos_start=pos_start, pos_end=self.position)
+        scan_start = source.start if start is None else start
+        scan_end = source.end if end is None else end
 
-    def make_greater_than(self):
-        token_type = TOKEN_GREATER_THAN
-        pos_start = self.position.copy()
-        self.next()
+        for match in pattern.finditer(source.buffer, scan_start, scan_end):
+            group = match.lastindex
+            start, end = match.span(group)
 
-        if self.current_character == "=":
-            self.next()
-            token_type = TOKEN_GREATER_EQUALS
-        
-        return Token(token_type, pos_start=pos_start, pos_end=self.position)
+            if group == GROUP_OPERATOR:
+                yield (operators[match[group]], None, start, end)
+            elif group == GROUP_IDENTIFIER:
+                value = match[group].decode() if encoded else match[group]
+                yield (TOKEN_KEYWORD if value in keywords else TOKEN_IDENTIFIER, value, start, end)
+            elif group == GROUP_INT:
+                yield (TOKEN_INT, int(match[group]), start, end)
+            elif group == GROUP_FLOAT:
+                yield (TOKEN_FLOAT, float(match[group]), start, end)
+            elif group == GROUP_EOF:
+                yield (TOKEN_EOF, None, start, start + 1)
+                return
+            elif group == GROUP_NOT:
+                raise LexerErrorRaised(ExpectedCharacterError(Position(start, source), Position(end, source), "'=' is required after '!'"))
+            else:
+                char, char_end = source.character(start)
+                raise LexerErrorRaised(IllegalCharacterException(Position(start, source), Position(char_end, source), f"'{char}'"))
@@ -0,0 +1,74 @@
+import time
+from errors import RuntimeError
+from constants import *
+
+# evaluated nodes between two looks at the clock
+CHECK_INTERVAL = 4096
+# results up to this size take microseconds, only larger ones are worth looking at the clock for
+CLOCK_BITS = 1 << 14
+# the operators whose result can outgrow their operands by more than a bit
+SIZED_OPERATORS = (TOKEN_MULTIPLY, TOKEN_POWER)
+
+# the bits an integer * or ^ result can have at most, what both the limits and constant folding go by
+def result_bits(operator_type, left: int, right: int) -> int:
+    if operator_type == TOKEN_MULTIPLY:
+        return left.bit_length() + right.bit_length()
+    # negative powers are floats, and powers of -1, 0 and 1 stay as small as they are
+    return 0 if right <= 0 or abs(left) <= 1 else right * abs(left).bit_length()
+
+class Limits:
+    # None leaves a limit out. steps are the nodes evaluated (instructions on the vm), bits the size of
+    # an integer result and timeout the seconds an evaluation may take
+    def __init__(self, max_steps: int = None, max_bits: int = None, timeout: float = None):
+        self.max_steps = max_steps
+        self.max_bits = max_bits
+        self.timeout = timeout
+        # without loops no node is evaluated twice, and a program has no more nodes (or vm instructions) than
+        # its source has characters, so steps are only counted for programs that could exceed the limit,
+        # or run for long enough to need the clock between the operations that look at it anyway
+        self.uncounted_size = min(float("inf") if max_steps is None else max_steps, float("inf") if timeout is None else CHECK_INTERVAL)
+
+    def start(self, node, context):
+        # the clock starts at the first check, what runs before it is too little to matter
+        context.deadline = None
+        source = node.pos_start.source
+        if source.end - source.start <= self.uncounted_size:
+            context.steps = None
+        else:
+            # steps counts down to the next check, steps_left is what remains after it
+            context.steps = 0
+            context.steps_left = self.max_steps if self.max_steps is not None else float("inf")
+
+    # called once context.steps runs out
+    def check_steps(self, node, context):
+        if context.steps_left <= 0:
+            return RuntimeError(node.pos_start, node.pos_end, f"Evaluation exceeded its limit of {self.max_steps} steps", context)
+        error = self.check_time(node, context)
+        if error: return error
+
+        steps = min(CHECK_INTERVAL, context.steps_left)
+        context.steps_left -= steps
+        # this node takes the first of them
+        context.steps = steps - 1
+        return None
+
+    def check_time(self, node, context):
+        if self.timeout is None:
+            return None
+        if context.deadline is None:
+            context.deadline = time.monotonic() + self.timeout
+        elif time.monotonic() > context.deadline:
+            return RuntimeError(node.pos_start, node.pos_end, f"Evaluation exceeded its time limit of {self.timeout} seconds", context)
+        return None
+
+    # checked before multiplying or raising to a power, so 9^9^9 fails at once instead of computing for hours
+    def check_size(self, node, operator_type, left, right, context):
+        if type(left) is not int or type(right) is not int:
+            return None
+        bits = result_bits(operator_type, left, right)
+
+        if self.max_bits is not None and bits > self.max_bits:
+            return RuntimeError(node.pos_start, node.pos_end, f"Result would exceed the limit of {self.max_bits} bits", context)
+        if bits > CLOCK_BITS:
+            return self.check_time(node, context)
+        return None
@@ -1,4 +1,38 @@
+import sys
+import argparse
 import pysharp
 
 if __name__ == "__main__":
-    pysharp.run()
+    arguments = argparse.ArgumentParser(description="pysharp interpreter, runs the REPL when given no script")
+    arguments.add_argument("script", nargs="?", help="file with one statement per line, '-' for stdin")
+    arguments.add_argument("--profile", action="store_true", help="report where the script spends its time on stderr")
+    arguments.add_argument("--collapsed", help="with --profile, write collapsed stacks for flame graph tools to this file")
+    arguments.add_argument("--cache", action="store_true", help="read, or write, the precompiled .pysc file next to the script")
+    arguments.add_argument("--serve", metavar="ADDRESS", help="serve evaluation requests on host:port or unix:PATH")
+    arguments.add_argument("--timeout", type=float, default=5.0, help="with --serve, seconds a request may evaluate for before its worker is killed")
+    arguments.add_argument("--concurrency", type=int, default=8, help="with --serve, worker processes, the most requests evaluated at the same time")
+    arguments.add_argument("--max-steps", type=int, help="nodes a statement or request may evaluate")
+    arguments.add_argument("--max-bits", type=int, help="bits an integer a statement or request computes may have")
+    arguments.add_argument("--time-limit", type=float, help="seconds a statement or request may evaluate for")
+    options = arguments.parse_args()
+
+    limits = None
+    if options.max_steps is not None or options.max_bits is not None or options.time_limit is not None:
+        from limits import Limits
+        limits = Limits(options.max_steps, options.max_bits, options.time_limit)
+
+    if options.serve:
+        import asyncio
+        import server
+        try:
+            asyncio.run(server.serve(options.serve, options.timeout, options.concurrency, limits))
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    script = options.script or (None if sys.stdin.isatty() else "-")
+    if script and options.profile:
+        sys.exit(1 if pysharp.profile_file(script, options.collapsed, options.cache, limits) else 0)
+    elif script:
+        sys.exit(1 if pysharp.run_file(script, cache=options.cache, limits=limits) else 0)
+    pysharp.run(limits)
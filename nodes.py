@@ -1,8 +1,16 @@
 
+UNBOUND = (None, None)
+
 class UnaryOperatorNode:
+    __slots__ = ("operator_token", "node", "shared", "cache", "pos_start", "pos_end")
+
     def __init__(self, operator_token, node):
         self.operator_token = operator_token
         self.node = node
+        # the representative of identical subexpressions this one is evaluated once with, see cse.py
+        self.shared = None
+        # (operand type, operation) the Interpreter last dispatched this node to
+        self.cache = None
         self.pos_start = self.operator_token.pos_start
         self.pos_end = node.pos_end
         
@@ -11,6 +19,8 @@ class UnaryOperatorNode:
 
 
 class NumberNode:
+    __slots__ = ("token", "pos_start", "pos_end")
+
     def __init__(self, token):
         self.token = token
         self.pos_start = self.token.pos_start
@@ -22,10 +32,16 @@ class NumberNode:
 
   
 class BinaryOperatorNode:
+    __slots__ = ("left_node", "operator_token", "right_node", "shared", "cache", "pos_start", "pos_end")
+
     def __init__(self, left_node, operator_token, right_node):
         self.left_node = left_node
         self.operator_token = operator_token
         self.right_node = right_node
+        # the representative of identical subexpressions this one is evaluated once with, see cse.py
+        self.shared = None
+        # (left operand type, right operand type, operation) the Interpreter last dispatched this node to
+        self.cache = None
         self.pos_start = self.left_node.pos_start
         self.pos_end = self.right_node.pos_end
         
@@ -35,25 +51,50 @@ class BinaryOperatorNode:
 
 
 class VariableAccessNode:
+    __slots__ = ("var_name_token", "binding", "pos_start", "pos_end")
+
     def __init__(self, var_name_token):
         self.var_name_token = var_name_token
+        # (symbol table, slot) the variable was resolved to, read and written as one
+        self.binding = UNBOUND
         self.pos_start = self.var_name_token.pos_start
         self.pos_end = self.var_name_token.pos_end
 
 
 
 class VariableAssignmentNode:
+    __slots__ = ("var_name_token", "value_node", "binding", "pos_start", "pos_end")
+
     def __init__(self, var_name_token, value_node):
         self.var_name_token = var_name_token
         self.value_node = value_node
+        # (symbol table, slot) the variable was resolved to, read and written as one
+        self.binding = UNBOUND
         self.pos_start = self.var_name_token.pos_start
         self.pos_end = self.value_node.pos_end
 
 
 class IfNode:
+    __slots__ = ("cases", "else_case", "pos_start", "pos_end")
+
     def __init__(self, cases, else_case):
         self.cases = cases
         self.else_case = else_case
 
         self.pos_start = self.cases[0][0].pos_start
-        self.pos_end = (self.else_case or self.cases[-1][0]).pos_end
\ No newline at end of file
+        self.pos_end = (self.else_case or self.cases[-1][0]).pos_end
+
+
+def children(node) -> list:
+    if isinstance(node, BinaryOperatorNode):
+        return [node.left_node, node.right_node]
+    elif isinstance(node, UnaryOperatorNode):
+        return [node.node]
+    elif isinstance(node, VariableAssignmentNode):
+        return [node.value_node]
+    elif isinstance(node, IfNode):
+        nodes = [child for case in node.cases for child in case]
+        if node.else_case:
+            nodes.append(node.else_case)
+        return nodes
+    return []
\ No newline at end of file
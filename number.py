@@ -1,7 +1,9 @@
-from calendar import c
 from errors import RuntimeError
+from constants import *
 
 class Number:
+    __slots__ = ("value", "pos_start", "pos_end", "context")
+
     def __init__(self, value):
         self.value = value
         self.set_pos()
@@ -19,63 +21,61 @@ class Number:
         self.context = context
         return self
     
+    # the operand types are not checked here, the tables below only pair a Number with a Number
     def added_to(self, other):
-        if isinstance(other, Number):
-            return Number(self.value + other.value).set_context(self.context), None
-        
+        return Number(self.value + other.value).set_context(self.context), None
+
     def subbed_by(self, other):
-        if isinstance(other, Number):
-            return Number(self.value - other.value).set_context(self.context), None
+        return Number(self.value - other.value).set_context(self.context), None
 
     def multed_by(self, other):
-        if isinstance(other, Number):
-            return Number(self.value * other.value).set_context(self.context), None
+        return Number(self.value * other.value).set_context(self.context), None
 
     def divided_by(self, other):
-        if isinstance(other, Number):
-            if other.value == 0:
-                return None, RuntimeError(other.pos_start, other.pos_end, "Disivion by zero is illegal", self.context)
-            return Number(self.value / other.value).set_context(self.context), None
+        if other.value == 0:
+            return None, RuntimeError(other.pos_start, other.pos_end, "Disivion by zero is illegal", self.context)
+        return Number(self.value / other.value).set_context(self.context), None
     
     def powed_by(self, other):
-        if isinstance(other, Number):
-            return Number(self.value ** other.value).set_context(self.context), None
+        return Number(self.value ** other.value).set_context(self.context), None
 
     def get_comparison_eq(self, other):
-        if isinstance(other, Number):
-            return Number(int(self.value == other.value)).set_context(self.context), None
+        return Number(int(self.value == other.value)).set_context(self.context), None
 
     def get_comparison_ne(self, other):
-        if isinstance(other, Number):
-            return Number(int(self.value != other.value)).set_context(self.context), None
+        return Number(int(self.value != other.value)).set_context(self.context), None
 
     def get_comparison_lt(self, other):
-        if isinstance(other, Number):
-            return Number(int(self.value < other.value)).set_context(self.context), None
+        return Number(int(self.value < other.value)).set_context(self.context), None
 
     def get_comparison_gt(self, other):
-        if isinstance(other, Number):
-            return Number(int(self.value > other.value)).set_context(self.context), None
+        return Number(int(self.value > other.value)).set_context(self.context), None
 
     def get_comparison_lte(self, other):
-        if isinstance(other, Number):
-            return Number(int(self.value <= other.value)).set_context(self.context), None
+        return Number(int(self.value <= other.value)).set_context(self.context), None
 
     def get_comparison_gte(self, other):
-        if isinstance(other, Number):
-            return Number(int(self.value >= other.value)).set_context(self.context), None
+        return Number(int(self.value >= other.value)).set_context(self.context), None
 
     def anded_by(self, other):
-        if isinstance(other, Number):
-            return Number(int(self.value and other.value)).set_context(self.context), None
+        return Number(int(self.value and other.value)).set_context(self.context), None
 
     def ored_by(self, other):
-        if isinstance(other, Number):
-            return Number(int(self.value or other.value)).set_context(self.context), None
+        return Number(int(self.value or other.value)).set_context(self.context), None
+
+    # what anded_by/ored_by return when this left operand alone decides the result
+    def short_circuited(self):
+        return Number(int(self.value)).set_context(self.context)
 
     def notted(self):
         return Number(1 if self.value == 0 else 0).set_context((self.context)), None
 
+    def negated(self):
+        return Number(self.value * -1).set_context(self.context), None
+
+    def positive(self):
+        return self, None
+
     def copy(self):
         copy = Number(self.value)
         copy.set_pos(self.pos_end, self.pos_end)
@@ -83,4 +83,39 @@ class Number:
         return copy
 
     def is_true(self):
-        return self.value != 0
\ No newline at end of file
+        return self.value != 0
+
+# the operator of a token as the tables key it: its type, or (TOKEN_KEYWORD, word) for and, or and not
+def operator_key(token):
+    return (token.type, token.value) if token.type == TOKEN_KEYWORD else token.type
+
+# binary operations by (operator, left operand type, right operand type) and unary ones by (operator, operand type).
+# another value type only needs entries of its own here
+BINARY_OPERATIONS = {
+    (TOKEN_PLUS, Number, Number): Number.added_to,
+    (TOKEN_MINUS, Number, Number): Number.subbed_by,
+    (TOKEN_MULTIPLY, Number, Number): Number.multed_by,
+    (TOKEN_DIVIDE, Number, Number): Number.divided_by,
+    (TOKEN_POWER, Number, Number): Number.powed_by,
+    (TOKEN_EQUALS_EQUALS, Number, Number): Number.get_comparison_eq,
+    (TOKEN_NOT_EQUALS, Number, Number): Number.get_comparison_ne,
+    (TOKEN_LESS_THAN, Number, Number): Number.get_comparison_lt,
+    (TOKEN_GREATER_THAN, Number, Number): Number.get_comparison_gt,
+    (TOKEN_LESS_EQUALS, Number, Number): Number.get_comparison_lte,
+    (TOKEN_GREATER_EQUALS, Number, Number): Number.get_comparison_gte,
+    ((TOKEN_KEYWORD, "and"), Number, Number): Number.anded_by,
+    ((TOKEN_KEYWORD, "or"), Number, Number): Number.ored_by,
+}
+
+UNARY_OPERATIONS = {
+    (TOKEN_MINUS, Number): Number.negated,
+    (TOKEN_PLUS, Number): Number.positive,
+    ((TOKEN_KEYWORD, "not"), Number): Number.notted,
+}
+
+# what every backend raises for operands the tables have no operation for
+def unsupported_binary(token, left, right) -> TypeError:
+    return TypeError(f"unsupported operand types for {token.type}: '{type(left).__name__}' and '{type(right).__name__}'")
+
+def unsupported_unary(token, operand) -> TypeError:
+    return TypeError(f"unsupported operand type for {token.type}: '{type(operand).__name__}'")
@@ -0,0 +1,126 @@
+from number import Number, BINARY_OPERATIONS, UNARY_OPERATIONS, operator_key
+from pys_token import Token
+from nodes import NumberNode, BinaryOperatorNode, UnaryOperatorNode, VariableAssignmentNode, IfNode, children
+from limits import SIZED_OPERATORS, result_bits
+from constants import *
+
+# folding 9^9^9 would hang the optimizer even when the branch is never taken
+MAX_FOLDED_BITS = 4096
+
+class Optimizer:
+    # with the max_bits of the limits a program runs under, a result the limits would reject is not folded
+    # either, so the operation is left for evaluation to fail on as it does unoptimized
+    def __init__(self, max_bits: int = None):
+        self.max_bits = MAX_FOLDED_BITS if max_bits is None else min(max_bits, MAX_FOLDED_BITS)
+
+    def optimize(self, node):
+        results = []
+        work = [(node, False)]
+
+        # post-order walk with an explicit stack so deeply nested input cannot overflow the Python stack
+        while work:
+            node, children_done = work.pop()
+            node_children = children(node)
+
+            if not children_done and node_children:
+                work.append((node, True))
+                work.extend((child, False) for child in reversed(node_children))
+                continue
+
+            optimized_children = results[len(results) - len(node_children):]
+            del results[len(results) - len(node_children):]
+            method = getattr(self, f"optimize_{type(node).__name__}", None)
+            results.append(method(node, *optimized_children) if method else node)
+
+        return results[0]
+
+    def literal(self, node):
+        if isinstance(node, NumberNode):
+            return Number(node.token.value)
+        return None
+
+    def fold(self, node, result):
+        if not isinstance(result.value, (int, float)):
+            return None
+        token_type = TOKEN_INT if isinstance(result.value, int) else TOKEN_FLOAT
+        return NumberNode(Token(token_type, result.value, node.pos_start, node.pos_end))
+
+    def rebuild(self, node, optimized):
+        optimized.pos_start = node.pos_start
+        optimized.pos_end = node.pos_end
+        return optimized
+
+    def optimize_BinaryOperatorNode(self, node, left_node, right_node):
+        left, right = self.literal(left_node), self.literal(right_node)
+
+        if left is not None and right is not None and self.can_fold(node.operator_token, left, right):
+            operator_token = node.operator_token
+            operation = BINARY_OPERATIONS[(operator_key(operator_token), type(left), type(right))]
+            try:
+                result, error = operation(left, right)
+            except (OverflowError, ZeroDivisionError):
+                result, error = None, True
+
+            # errors such as division by zero are left for evaluation so they keep their runtime traceback
+            folded = self.fold(node, result) if not error else None
+            if folded: return folded
+
+        # like a dead branch, the right operand of and/or is dropped when a constant left one decides the result
+        if left is not None and node.operator_token.type == TOKEN_KEYWORD and left.is_true() == (node.operator_token.value == "or"):
+            try:
+                return self.fold(node, left.short_circuited())
+            except (OverflowError, ValueError):
+                pass
+
+        if left_node is node.left_node and right_node is node.right_node:
+            return node
+        return self.rebuild(node, BinaryOperatorNode(left_node, node.operator_token, right_node))
+
+    def can_fold(self, operator_token, left, right):
+        if operator_token.type not in SIZED_OPERATORS or type(left.value) is not int or type(right.value) is not int:
+            return True
+        # the result's size is what matters, (9^64)^64 only has small exponents
+        return result_bits(operator_token.type, left.value, right.value) <= self.max_bits
+
+    def optimize_UnaryOperatorNode(self, node, operand_node):
+        operand = self.literal(operand_node)
+
+        if operand is not None:
+            result, error = UNARY_OPERATIONS[(operator_key(node.operator_token), type(operand))](operand)
+            folded = self.fold(node, result) if not error else None
+            if folded: return folded
+
+        if operand_node is node.node:
+            return node
+        return self.rebuild(node, UnaryOperatorNode(node.operator_token, operand_node))
+
+    def optimize_VariableAssignmentNode(self, node, value_node):
+        if value_node is node.value_node:
+            return node
+        return self.rebuild(node, VariableAssignmentNode(node.var_name_token, value_node))
+
+    def optimize_IfNode(self, node, *optimized_children):
+        pairs = optimized_children[:2 * len(node.cases)]
+        else_case = optimized_children[-1] if node.else_case else None
+        cases = []
+
+        for condition, expr in zip(pairs[::2], pairs[1::2]):
+            value = self.literal(condition)
+            if value is None:
+                cases.append((condition, expr))
+            elif value.is_true():
+                else_case = expr
+                break
+
+        if not cases:
+            if else_case:
+                return else_case
+            # no branch can be taken, keep one dead case so the node still evaluates to nothing
+            cases = [pairs[:2]]
+
+        changed = len(cases) != len(node.cases) or else_case is not node.else_case or any(
+            new[0] is not old[0] or new[1] is not old[1] for new, old in zip(cases, node.cases)
+        )
+        if not changed:
+            return node
+        return self.rebuild(node, IfNode(cases, else_case))
@@ -1,207 +1,236 @@
 from constants import *
+from pys_token import Token
+from position import Position
 from nodes import NumberNode, BinaryOperatorNode, UnaryOperatorNode, VariableAssignmentNode, VariableAccessNode, IfNode
-from errors import SyntaxError
+from errors import SyntaxError, LexerErrorRaised
+
+# grammar levels, from loosest to tightest binding
+LEVEL_EXPR   = 1
+LEVEL_COMP   = 2
+LEVEL_ARITH  = 3
+LEVEL_TERM   = 4
+LEVEL_FACTOR = 5
+
+# operator -> (precedence, level its right operand is parsed at)
+BINARY_OPERATORS = {
+    (TOKEN_KEYWORD, "and"): (LEVEL_EXPR, LEVEL_COMP),
+    (TOKEN_KEYWORD, "or"):  (LEVEL_EXPR, LEVEL_COMP),
+    TOKEN_EQUALS_EQUALS:    (LEVEL_COMP, LEVEL_ARITH),
+    TOKEN_NOT_EQUALS:       (LEVEL_COMP, LEVEL_ARITH),
+    TOKEN_LESS_THAN:        (LEVEL_COMP, LEVEL_ARITH),
+    TOKEN_GREATER_THAN:     (LEVEL_COMP, LEVEL_ARITH),
+    TOKEN_LESS_EQUALS:      (LEVEL_COMP, LEVEL_ARITH),
+    TOKEN_GREATER_EQUALS:   (LEVEL_COMP, LEVEL_ARITH),
+    TOKEN_PLUS:             (LEVEL_ARITH, LEVEL_TERM),
+    TOKEN_MINUS:            (LEVEL_ARITH, LEVEL_TERM),
+    TOKEN_MULTIPLY:         (LEVEL_TERM, LEVEL_FACTOR),
+    TOKEN_DIVIDE:           (LEVEL_TERM, LEVEL_FACTOR),
+    TOKEN_POWER:            (LEVEL_FACTOR, LEVEL_FACTOR),
+}
+
+# an expression that fails before consuming a single token reports the message of
+# the outermost level that started at that token instead of the innermost one
+LEVEL_MESSAGES = {
+    LEVEL_EXPR: "Expected 'let', int, float, variable name, '+', '-', or '('",
+    LEVEL_COMP: "Expected int, float, vriable name, '+', '-', '(', or 'not'",
+}
+
+# parser stack frames
+FRAME_EXPRESSION  = 0
+FRAME_BINARY      = 1
+FRAME_UNARY       = 2
+FRAME_LET         = 3
+FRAME_PARENTHESIS = 4
+FRAME_IF          = 5
+
+# what an if frame is waiting for
+IF_CONDITION      = 0
+IF_ELIF_CONDITION = 1
+IF_CASE           = 2
+IF_ELSE           = 3
 
 class ParseResult:
     def __init__(self):
         self.error = None
         self.node = None
-        self.advance_count  = 0
 
-    def register_next(self):
-        self.advance_count += 1
-
-    def register(self, result):
-        self.advance_count += result.advance_count  # bug here but idk why, fix later lol
-        if result.error: self.error = result.error
-        return result.node        
-    
     def success(self, node):
         self.node = node
         return self
-    
+
     def failure(self, error):
-        if not self.error or self.advance_count == 0:
-            self.error = error
+        self.error = error
         return self
 
 class Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
+    # tokens is a list, or a Lexer.generate_tokens stream that is read one token ahead
+    # so lexing overlaps parsing and the tokens are never all held at once.
+    # they are the lexer's (type, value, start, end) tuples of offsets into source
+    def __init__(self, tokens, source):
+        self.tokens = iter(tokens)
+        self.source = source
         self.token_index = -1
         self.current_token = None
-        self.next()
 
     def parse(self):
-        res = self.expr()
-        if not res.error and self.current_token.type != TOKEN_EOF:
-            return res.failure(SyntaxError(self.current_token.pos_start, self.current_token.pos_end, "Expected '+', '-', '*' or '/'"))
-        return res
-        
+        res = ParseResult()
+        try:
+            self.next()
+            node, error = self.expr()
+            if not error and self.current_token[0] != TOKEN_EOF:
+                token = self.token(self.current_token)
+                error = SyntaxError(token.pos_start, token.pos_end, "Expected '+', '-', '*' or '/'")
+            if error:
+                # an illegal character further on is reported first, as when the whole input was lexed up front
+                for _ in self.tokens: pass
+                return res.failure(error)
+        except LexerErrorRaised as raised:
+            return res.failure(raised.error)
+        return res.success(node)
+
+    # past the last token (the EOF) it stays current
     def next(self):
         self.token_index += 1
-        if self.token_index < len(self.tokens):
-            self.current_token = self.tokens[self.token_index]
+        self.current_token = next(self.tokens, self.current_token)
         return self.current_token
 
-    def if_expr(self):
-        res = ParseResult()
-        cases = []
-        else_case = None
-
-        if not self.current_token.matches(TOKEN_KEYWORD, "if"):
-            return res.failure(SyntaxError(self.current_token.pos_start, self.current_token.pos_end, "'if' expected"))
-
-        res.register_next()
-        self.next()
-
-        condition = res.register(self.expr())
-        if res.error: return res
-
-        if not self.current_token.matches(TOKEN_KEYWORD, "then"):
-            return res.failure(SyntaxError(self.current_token.pos_start, self.current_token.pos_end, "'then' expected"))
+    # the Token a node keeps, only the tokens that end up in the tree or an error get one
+    def token(self, token) -> Token:
+        return Token(token[0], token[1], Position(token[2], self.source), Position(token[3], self.source))
 
-        res.register_next()
-        self.next()
+    def error(self, frames, details):
+        token = self.token(self.current_token)
+        for frame in frames:
+            if frame[0] == FRAME_EXPRESSION and frame[3] and frame[2] == self.token_index:
+                details = frame[3]
+                break
+        return None, SyntaxError(token.pos_start, token.pos_end, details)
 
-        expr = res.register(self.expr())
-        if res.error: return res
-        cases.append((condition, expr))
+    def binary_operator(self, token):
+        operator = BINARY_OPERATORS.get(token[0])
+        if operator is None and token[0] == TOKEN_KEYWORD:
+            operator = BINARY_OPERATORS.get((TOKEN_KEYWORD, token[1]))
+        return operator
 
-        while self.current_token.matches(TOKEN_KEYWORD, "elif"):
-            res.register_next()
-            self.next()
-
-            condition = res.register(self.expr())
-            if res.error: return res
-
-            if not self.current_token.matches(TOKEN_KEYWORD, "then"):
-                return res.failure(SyntaxError(self.current_token.pos_start, self.current_token.pos_end, "'then expected"))
-            
-            res.register_next()
-            self.next()
-
-            expr = res.register(self.expr())
-            if res.error: return res
-            cases.append((condition, expr))
-
-            if self.current_token.matches(TOKEN_KEYWORD, "else"):
-                res.register_next()
+    def expr(self):
+        # explicit stack instead of one Python frame per grammar rule, so nesting depth is only bounded by memory
+        frames = []
+        level = LEVEL_EXPR
+
+        while True:
+            # start parsing an expression at `level`: prefix operators and atoms
+            token = self.current_token
+            token_type = token[0]
+            node = None
+
+            if level == LEVEL_EXPR and token_type == TOKEN_KEYWORD and token[1] == "let":
+                frames.append([FRAME_EXPRESSION, level, self.token_index, None, None])
+                self.next()
+                if self.current_token[0] != TOKEN_IDENTIFIER:
+                    return self.error(frames, "Variable name expected")
+                var_name = self.current_token
+                self.next()
+                if self.current_token[0] != TOKEN_EQUALS:
+                    return self.error(frames, "'=' expected")
                 self.next()
+                frames.append([FRAME_LET, var_name])
+                continue
 
-                else_case = res.register(self.expr())
-                if res.error: return res
+            if level <= LEVEL_COMP and token_type == TOKEN_KEYWORD and token[1] == "not":
+                message = LEVEL_MESSAGES[level] if level == LEVEL_EXPR else None
+                frames.append([FRAME_EXPRESSION, level, self.token_index, message, None])
+                frames.append([FRAME_UNARY, token])
+                self.next()
+                level = LEVEL_COMP
+                continue
 
-            return res.success(IfNode(cases, else_case))
+            frames.append([FRAME_EXPRESSION, level, self.token_index, LEVEL_MESSAGES.get(level), None])
 
-    def atom(self):
-        res = ParseResult()
-        token = self.current_token
-        
-        if token.type in (TOKEN_INT, TOKEN_FLOAT):
-            res.register_next()
-            self.next()
-            return res.success(NumberNode(token))
-        elif token.type == TOKEN_IDENTIFIER:
-            res.register_next()
-            self.next()
-            return res.success(VariableAccessNode(token))
-        elif token.type == TOKEN_LEFT_PARENTHESIS:
-            res.register_next()
-            self.next()
-            expr = res.register(self.expr())
-            if res.error: return res
-            if self.current_token.type == TOKEN_RIGHT_PARENTHESIS:
-                res.register_next()
+            if token_type == TOKEN_PLUS or token_type == TOKEN_MINUS:
+                frames.append([FRAME_UNARY, token])
+                self.next()
+                level = LEVEL_FACTOR
+                continue
+            elif token_type == TOKEN_INT or token_type == TOKEN_FLOAT:
+                self.next()
+                node = NumberNode(self.token(token))
+            elif token_type == TOKEN_IDENTIFIER:
+                self.next()
+                node = VariableAccessNode(self.token(token))
+            elif token_type == TOKEN_LEFT_PARENTHESIS:
+                self.next()
+                frames.append([FRAME_PARENTHESIS])
+                level = LEVEL_EXPR
+                continue
+            elif token_type == TOKEN_KEYWORD and token[1] == "if":
                 self.next()
-                return res.success(expr)
+                frames.append([FRAME_IF, [], None, IF_CONDITION])
+                level = LEVEL_EXPR
+                continue
             else:
-                return res.failure(SyntaxError(self.current_token.pos_start, self.current_token.pos_end, "')' expected"))
-        elif token.matches(TOKEN_KEYWORD, "if"):
-            if_expr = res.register(self.if_expr())
-            if res.error: return res
-            return res.success(if_expr)
-
-        return res.failure(SyntaxError(token.pos_start, token.pos_end, "Expected int, float, variable name, '+', '-', or '('"))
-    
-    def power(self):
-        return self.binary_operation(self.atom, (TOKEN_POWER, ), self.factor)
-            
-    def factor(self):
-        res = ParseResult()
-        token = self.current_token
-        
-        if token.type in (TOKEN_PLUS, TOKEN_MINUS):
-            res.register_next()
-            self.next()
-            factor = res.register(self.factor())
-            if res.error: return res
-            return res.success(UnaryOperatorNode(token, factor))
-        return self.power()
-    
-    def term(self):
-        return self.binary_operation(self.factor, (TOKEN_MULTIPLY, TOKEN_DIVIDE))
-
-    def arith_expr(self):
-        return self.binary_operation(self.term, (TOKEN_PLUS, TOKEN_MINUS))
-
-    def comp_expr(self):
-        res = ParseResult()
-        if self.current_token.matches(TOKEN_KEYWORD, "not"):
-            operation_token = self.current_token
-            self.next()
-
-            node = res.register(self.comp_expr())
-            if res.error: return res
-            return res.success(UnaryOperatorNode(operator_token, node))
-        
-        node = res.register(self.binary_operation(self.arith_expr, (TOKEN_EQUALS_EQUALS, TOKEN_NOT_EQUALS, TOKEN_LESS_THAN, TOKEN_GREATER_THAN, TOKEN_LESS_EQUALS, TOKEN_GREATER_EQUALS)))
-
-        if res.error:
-            return res.failure(SyntaxError(self.current_token.pos_start, self.current_token.pos_end, "Expected int, float, vriable name, '+', '-', '(', or 'not'"))
-        
-        return res.success(node)
-    
-    def expr(self):
-        res = ParseResult()
-        if self.current_token.matches(TOKEN_KEYWORD, "let"):
-            res.register_next()
-            self.next()
-            if self.current_token.type != TOKEN_IDENTIFIER:
-                return res.failure(SyntaxError(self.current_token.pos_start, self.current_token.pos_end, "Variable name expected"))
-            
-            var_name = self.current_token
-            res.register_next()
-            self.next()
-            
-            if self.current_token.type != TOKEN_EQUALS:
-                return res.failure(SyntaxError(self.current_token.pos_start, self.current_token.pos_end, "'=' expected"))
-            
-            res.register_next()
-            self.next()
-            expr = res.register(self.expr())
-            if res.error: return res
-            return res.success(VariableAssignmentNode(var_name, expr))
-                
-        node = res.register(self.binary_operation(self.comp_expr, ((TOKEN_KEYWORD, "and"), (TOKEN_KEYWORD, "or"))))
-
-        if res.error:
-            return res.failure(SyntaxError(self.current_token.pos_start, self.current_token.pos_end, "Expected 'let', int, float, variable name, '+', '-', or '('"))
+                return self.error(frames, "Expected int, float, variable name, '+', '-', or '('")
+
+            # hand the finished node to the frame waiting for it until one needs another operand
+            level = None
+            while level is None:
+                frame = frames[-1]
+                kind = frame[0]
+
+                if kind == FRAME_EXPRESSION:
+                    frame[4] = node
+                    token = self.current_token
+                    operator = self.binary_operator(token)
+                    if operator is not None and operator[0] >= frame[1]:
+                        self.next()
+                        frames.append([FRAME_BINARY, token])
+                        level = operator[1]
+                        continue
+                    frames.pop()
+                    if not frames:
+                        return node, None
+                elif kind == FRAME_BINARY:
+                    frames.pop()
+                    node = BinaryOperatorNode(frames[-1][4], self.token(frame[1]), node)
+                elif kind == FRAME_UNARY:
+                    frames.pop()
+                    node = UnaryOperatorNode(self.token(frame[1]), node)
+                elif kind == FRAME_LET:
+                    frames.pop()
+                    node = VariableAssignmentNode(self.token(frame[1]), node)
+                elif kind == FRAME_PARENTHESIS:
+                    if self.current_token[0] != TOKEN_RIGHT_PARENTHESIS:
+                        return self.error(frames, "')' expected")
+                    self.next()
+                    frames.pop()
+                elif frame[3] == IF_CASE:
+                    frame[1].append((frame[2], node))
+                    if self.current_token[:2] == (TOKEN_KEYWORD, "elif"):
+                        self.next()
+                        frame[3] = IF_ELIF_CONDITION
+                        level = LEVEL_EXPR
+                    elif self.current_token[:2] == (TOKEN_KEYWORD, "else"):
+                        self.next()
+                        frame[3] = IF_ELSE
+                        level = LEVEL_EXPR
+                    else:
+                        frames.pop()
+                        node = IfNode(frame[1], None)
+                elif frame[3] == IF_ELSE:
+                    frames.pop()
+                    node = IfNode(frame[1], node)
+                else:
+                    if self.current_token[:2] != (TOKEN_KEYWORD, "then"):
+                        return self.error(frames, "'then' expected" if frame[3] == IF_CONDITION else "'then expected")
+                    self.next()
+                    frame[2] = node
+                    frame[3] = IF_CASE
+                    level = LEVEL_EXPR
+
+class TokenParser(Parser):
+    # parses Token objects, which the nodes keep as they are: incremental reparsing finds a node by its
+    # tokens and moves their Positions in place
+    def __init__(self, tokens):
+        super().__init__(((token.type, token.value, token) for token in tokens), None)
 
-        return res.success(node)
-    
-    def binary_operation(self, callback_a, operation_tokens, callback_b=None):
-        if callback_b == None:
-            callback_b = callback_a
-        res = ParseResult()
-        left = res.register(callback_a())
-        if res.error: return res
-        
-        while self.current_token.type in operation_tokens or (self.current_token.type, self.current_token.value) in operation_tokens:
-            operator_token = self.current_token
-            res.register_next()
-            self.next()
-            right = res.register(callback_b())
-            if res.error: return res
-            left = BinaryOperatorNode(left, operator_token, right)
-        return res.success(left)
\ No newline at end of file
+    def token(self, token) -> Token:
+        return token[2]
@@ -1,18 +1,26 @@
 class Position:
-    def __init__(self, index, line, col, filename, content):
+    __slots__ = ("index", "source")
+
+    # a plain offset into its source, lines and columns are only worked out when rendering
+    def __init__(self, index, source):
         self.index = index
-        self.line = line
-        self.col = col
-        self.filename = filename
-        self.content = content
+        self.source = source
+
+    @property
+    def line(self):
+        return self.source.line(self.index)
+
+    @property
+    def col(self):
+        return self.source.column(self.index)
+
+    @property
+    def filename(self):
+        return self.source.filename
 
-    def next(self, current_char=None):
+    def next(self):
         self.index += 1
-        self.col += 1
-        if current_char == "\n":
-            self.line += 1
-            self.col = 0
         return self
 
     def copy(self):
-        return Position(self.index, self.line, self.col, self.filename, self.content)
\ No newline at end of file
+        return Position(self.index, self.source)
@@ -0,0 +1,290 @@
+import os
+import sys
+import hashlib
+from array import array
+from pys_token import Token
+from position import Position
+from source import Source
+from lexer import OPERATORS
+from nodes import NumberNode, BinaryOperatorNode, UnaryOperatorNode, VariableAccessNode, VariableAssignmentNode, IfNode
+from constants import *
+
+# a cache written by another version of the node classes, token types or this encoding is never read
+FORMAT_VERSION = 2
+MAGIC = b"PYSC"
+CACHE_SUFFIX = ".pysc"
+
+# the file is written and read one statement at a time, so neither side holds more than a statement's records.
+# every statement starts with varints: the gap from the end of the previous one, its length, the lines it is
+# below the previous one, then a byte for the width of its records and, if it parsed, their count.
+# every node is one record of two integers, written in post-order so a stack rebuilds the tree:
+# the token's offset from the statement's start, and its kind with the token's length above the kind's bits.
+# values, names and operators are read back from the script's text, which the digest guarantees is unchanged
+KIND_INT, KIND_FLOAT, KIND_VARIABLE, KIND_ASSIGNMENT, KIND_UNARY, KIND_BINARY, KIND_IF = range(7)
+KIND_BITS = 3
+KIND_MASK = (1 << KIND_BITS) - 1
+RECORD_SIZE = 2
+# the width byte of a statement: not parsed, it is parsed again to report its error, or the typecode of its
+# records, the narrowest its largest value fits in. END follows the last statement of a complete file
+UNPARSED, END = 0, 4
+TYPECODES = {1: "B", 2: "H", 3: "I"}
+LIMITS = [(1 << 8, 1), (1 << 16, 2), (1 << 32, 3)]
+# the most bytes a statement's header can take
+HEADER_SIZE = 4 * 10 + 1
+CHUNK_SIZE = 1 << 16
+
+# (type, value) of the operator token with the text, for text and for memory-mapped bytes
+OPERATOR_TOKENS = {text: (token_type, None) for text, token_type in OPERATORS.items()}
+OPERATOR_TOKENS.update({keyword: (TOKEN_KEYWORD, keyword) for keyword in ("and", "or", "not")})
+OPERATOR_TOKENS.update({text.encode(): token for text, token in OPERATOR_TOKENS.items()})
+
+def cache_path(path: str) -> str:
+    return os.path.splitext(path)[0] + CACHE_SUFFIX
+
+def digest(source: Source) -> bytes:
+    with memoryview(source.buffer) as view:
+        return hashlib.blake2b(view[source.start:source.end], digest_size=16).digest()
+
+def header(content_digest: bytes) -> bytes:
+    return MAGIC + bytes((FORMAT_VERSION, sys.byteorder == "little", array("I").itemsize)) + content_digest
+
+def write_varint(output: bytearray, value: int):
+    while value >= 0x80:
+        output.append(value & 0x7F | 0x80)
+        value >>= 7
+    output.append(value)
+
+def read_varint(data: bytes, offset: int):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+class Encoder:
+    # writes to a temporary file next to the cache, which only replaces it once save is called;
+    # a cache that cannot be written is silently skipped, like a .pyc
+    def __init__(self, path: str, content_digest: bytes):
+        self.path = path
+        self.temporary = f"{path}.{os.getpid()}.tmp"
+        self.previous_end = 0
+        self.previous_line = 0
+        try:
+            self.file = open(self.temporary, "wb")
+            self.file.write(header(content_digest))
+        except OSError:
+            self.close()
+
+    # node is None for a statement that failed to lex or parse
+    def add(self, source: Source, node):
+        if self.file is None: return
+        records = None
+        if node is not None:
+            records = []
+            self.encode(node, source.start, records)
+            largest = max(records)
+            width = next((width for limit, width in LIMITS if largest < limit), UNPARSED)
+            # a statement longer than 4 GB is parsed again instead
+            if width == UNPARSED:
+                records = None
+
+        output = bytearray()
+        write_varint(output, source.start - self.previous_end)
+        write_varint(output, source.end - source.start)
+        write_varint(output, source.first_line - self.previous_line)
+        if records is None:
+            output.append(UNPARSED)
+        else:
+            output.append(width)
+            write_varint(output, len(records) // RECORD_SIZE)
+            output += array(TYPECODES[width], records).tobytes()
+        self.previous_end, self.previous_line = source.end, source.first_line
+
+        try:
+            self.file.write(output)
+        except OSError:
+            self.close()
+
+    def encode(self, node, base: int, records: list):
+        work = [(node, False)]
+
+        # explicit stack so deeply nested input cannot overflow the Python stack
+        while work:
+            node, children_done = work.pop()
+            node_type = type(node)
+
+            if node_type is NumberNode:
+                token = node.token
+                kind = KIND_INT if token.type == TOKEN_INT else KIND_FLOAT
+            elif node_type is VariableAccessNode:
+                token = node.var_name_token
+                kind = KIND_VARIABLE
+            elif not children_done:
+                work.append((node, True))
+                if node_type is BinaryOperatorNode:
+                    work += [(node.right_node, False), (node.left_node, False)]
+                elif node_type is UnaryOperatorNode:
+                    work.append((node.node, False))
+                elif node_type is VariableAssignmentNode:
+                    work.append((node.value_node, False))
+                elif node_type is IfNode:
+                    if node.else_case:
+                        work.append((node.else_case, False))
+                    for condition, expr in reversed(node.cases):
+                        work += [(expr, False), (condition, False)]
+                else:
+                    raise Exception(f"Cannot encode {node_type.__name__}")
+                continue
+            elif node_type is VariableAssignmentNode:
+                token = node.var_name_token
+                kind = KIND_ASSIGNMENT
+            elif node_type is IfNode:
+                # an if has no token of its own, its record holds the number of cases and whether it has an else case
+                records += (len(node.cases), KIND_IF | (1 if node.else_case else 0) << KIND_BITS)
+                continue
+            else:
+                token = node.operator_token
+                kind = KIND_BINARY if node_type is BinaryOperatorNode else KIND_UNARY
+
+            start = token.pos_start.index
+            records += (start - base, kind | (token.pos_end.index - start) << KIND_BITS)
+
+    def save(self):
+        if self.file is None: return
+        try:
+            self.file.write(bytes((0, 0, 0, END)))
+            self.file.close()
+            self.file = None
+            os.replace(self.temporary, self.path)
+        except OSError:
+            self.close()
+
+    # a partly written file is never left behind
+    def close(self):
+        file, self.file = getattr(self, "file", None), None
+        try:
+            if file is not None:
+                file.close()
+            os.remove(self.temporary)
+        except OSError:
+            pass
+
+class Program:
+    def __init__(self, file):
+        self.file = file
+        # the part of the script after the last statement decoded, when the file turned out to be damaged
+        self.rest = None
+
+    # yields (statement source, tree), the tree is None for a statement that has to be parsed again.
+    # with a symbol table, variables are bound to their slots as they are decoded, see Resolver
+    def decode(self, source: Source, symbol_table=None):
+        data, offset = b"", 0
+        previous_end, line = 0, 0
+        # the last statement yielded
+        decoded = None
+
+        with self.file as file:
+            try:
+                while True:
+                    if len(data) - offset < HEADER_SIZE:
+                        data, offset = data[offset:] + file.read(CHUNK_SIZE), 0
+                    gap, offset = read_varint(data, offset)
+                    length, offset = read_varint(data, offset)
+                    lines, offset = read_varint(data, offset)
+                    width = data[offset]
+                    offset += 1
+                    if width == END:
+                        return
+
+                    start = previous_end + gap
+                    previous_end, line = start + length, line + lines
+                    if previous_end > source.end:
+                        raise ValueError("statement past the end of the script")
+                    statement = Source(source.filename, source.buffer, start, previous_end, line)
+                    if width == UNPARSED:
+                        yield statement, None
+                        decoded = statement
+                        continue
+
+                    count, offset = read_varint(data, offset)
+                    records = array(TYPECODES[width])
+                    size = count * RECORD_SIZE * records.itemsize
+                    if len(data) - offset < size:
+                        data, offset = data[offset:] + file.read(max(size, CHUNK_SIZE)), 0
+                        if len(data) < size:
+                            raise ValueError("records past the end of the file")
+                    records.frombytes(data[offset:offset + size])
+                    offset += size
+                    yield statement, self.decode_tree(statement, records, symbol_table)
+                    decoded = statement
+            except (IndexError, KeyError, ValueError):
+                # a cut-off or damaged file: split_lines finds the statements after the last one decoded
+                self.rest = source if decoded is None else Source(source.filename, source.buffer, decoded.end, source.end, decoded.first_line)
+
+        # only a damaged file gets here, it is removed so the next run writes it again
+        try:
+            os.remove(file.name)
+        except OSError:
+            pass
+
+    def decode_tree(self, source: Source, records: array, symbol_table=None):
+        resolve = symbol_table.resolve if symbol_table else None
+        buffer, base = source.buffer, source.start
+        encoded = not isinstance(buffer, str)
+        stack = []
+        push, pop = stack.append, stack.pop
+        # locals are cheaper to look up than globals in the loop
+        new_position, new_token, operators = Position, Token, OPERATOR_TOKENS
+
+        records = iter(records)
+        for start, code in zip(records, records):
+            kind = code & KIND_MASK
+            if kind == KIND_IF:
+                else_case = pop() if code >> KIND_BITS else None
+                children = stack[len(stack) - 2 * start:]
+                del stack[len(stack) - 2 * start:]
+                push(IfNode(list(zip(children[::2], children[1::2])), else_case))
+                continue
+
+            start += base
+            end = start + (code >> KIND_BITS)
+            text = buffer[start:end]
+            pos_start, pos_end = new_position(start, source), new_position(end, source)
+            if kind == KIND_BINARY:
+                right = pop()
+                push(BinaryOperatorNode(pop(), new_token(*operators[text], pos_start, pos_end), right))
+            elif kind == KIND_INT:
+                push(NumberNode(new_token(TOKEN_INT, int(text), pos_start, pos_end)))
+            elif kind == KIND_VARIABLE:
+                node = VariableAccessNode(new_token(TOKEN_IDENTIFIER, text.decode() if encoded else text, pos_start, pos_end))
+                if resolve: resolve(node)
+                push(node)
+            elif kind == KIND_FLOAT:
+                push(NumberNode(new_token(TOKEN_FLOAT, float(text), pos_start, pos_end)))
+            elif kind == KIND_UNARY:
+                push(UnaryOperatorNode(new_token(*operators[text], pos_start, pos_end), pop()))
+            else:
+                node = VariableAssignmentNode(new_token(TOKEN_IDENTIFIER, text.decode() if encoded else text, pos_start, pos_end), pop())
+                if resolve: resolve(node)
+                push(node)
+
+        return pop()
+
+# the cached program of a script, or None when there is none or it was written for other content.
+# the file stays open until the program has been decoded
+def load(path: str, content_digest: bytes):
+    expected = header(content_digest)
+    try:
+        file = open(path, "rb")
+    except OSError:
+        return None
+    try:
+        if file.read(len(expected)) == expected:
+            return Program(file)
+    except OSError:
+        pass
+    file.close()
+    return None
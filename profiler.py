@@ -0,0 +1,110 @@
+import time
+from interpreter import Interpreter
+from number import Number
+from string_arrows import string_arrows
+
+# longest piece of source used to label a flame graph frame
+MAX_FRAME_TEXT = 40
+
+class SpanStats:
+    __slots__ = ("node", "calls", "inclusive", "exclusive", "allocations")
+
+    def __init__(self, node):
+        self.node = node
+        self.calls = 0
+        self.inclusive = 0
+        self.exclusive = 0
+        self.allocations = 0
+
+class ProfilingInterpreter(Interpreter):
+    def __init__(self):
+        super().__init__()
+        self.spans = {}
+        # call stacks are interned: (parent stack id, span key) -> stack id, and the time spent in each
+        self.stack_ids = {}
+        self.stack_times = []
+        # one frame per node being visited: [stack id, time spent in children, values the children returned]
+        self.frames = []
+
+    def visit(self, node, context):
+        pos_start, pos_end = node.pos_start, node.pos_end
+        # an if without else ends where its last condition does, so the node type is part of the key
+        key = (pos_start.source, pos_start.index, pos_end.index, type(node))
+        parent = self.frames[-1] if self.frames else None
+        stack = self.stack_ids.setdefault((parent[0] if parent else -1, key), len(self.stack_ids))
+        if stack == len(self.stack_times):
+            self.stack_times.append(0)
+        frame = [stack, 0, []]
+        self.frames.append(frame)
+
+        start = time.perf_counter_ns()
+        try:
+            res = super().visit(node, context)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            self.frames.pop()
+
+        stats = self.spans.get(key)
+        if stats is None:
+            stats = self.spans[key] = SpanStats(node)
+        stats.calls += 1
+        stats.inclusive += elapsed
+        stats.exclusive += elapsed - frame[1]
+        # the RuntimeResult, plus the value unless it was handed up from a child
+        stats.allocations += 1
+        if isinstance(res.value, Number) and not any(res.value is value for value in frame[2]):
+            stats.allocations += 1
+        self.stack_times[stack] += elapsed - frame[1]
+
+        if parent:
+            parent[1] += elapsed
+            parent[2].append(res.value)
+        return res
+
+    def label(self, node):
+        text = node.pos_start.source.text(node.pos_start.index, node.pos_end.index)
+        if len(text) > MAX_FRAME_TEXT:
+            text = text[:MAX_FRAME_TEXT - 3] + "..."
+        # ';' separates frames in the collapsed format
+        return f"{type(node).__name__} {text.replace(';', ',')} ({node.pos_start.line + 1}:{node.pos_start.col + 1})"
+
+    def hottest_spans(self, limit: int = 10) -> list:
+        return sorted(self.spans.values(), key=lambda stats: stats.exclusive, reverse=True)[:limit]
+
+    def hottest_lines(self, limit: int = 10) -> list:
+        lines = {}
+        for (source, index, _, _), stats in self.spans.items():
+            line = (source.filename, source.line(index))
+            total = lines.get(line)
+            if total is None:
+                total = lines[line] = SpanStats(stats.node)
+            total.calls += stats.calls
+            total.exclusive += stats.exclusive
+            total.allocations += stats.allocations
+        return sorted(lines.items(), key=lambda item: item[1].exclusive, reverse=True)[:limit]
+
+    def report(self, limit: int = 10) -> str:
+        result = "Hottest lines:\n"
+        for (filename, line), stats in self.hottest_lines(limit):
+            text = stats.node.pos_start.source.line_text(line)
+            result += f"  File {filename}, line {line + 1}: {stats.exclusive / 1e6:.3f} ms, {stats.calls} visits, {stats.allocations} allocations\n"
+            result += f"    {text if len(text) <= 80 else text[:77] + '...'}\n"
+
+        result += "\nHottest expressions:\n"
+        for stats in self.hottest_spans(limit):
+            node = stats.node
+            result += f"  File {node.pos_start.filename}, line {node.pos_start.line + 1}, {type(node).__name__}: "
+            result += f"{stats.calls} calls, {stats.inclusive / 1e6:.3f} ms inclusive, {stats.exclusive / 1e6:.3f} ms exclusive, {stats.allocations} allocations\n"
+            result += string_arrows(node.pos_start.source, node.pos_start, node.pos_end) + "\n\n"
+        return result
+
+    # one "frame;frame;frame microseconds" line per distinct stack, as read by flamegraph.pl and speedscope
+    def write_collapsed(self, path: str):
+        labels = {key: self.label(stats.node) for key, stats in self.spans.items()}
+        stacks = {}
+        for (parent, key), stack in self.stack_ids.items():
+            stacks[stack] = (stacks[parent] if parent >= 0 else "<program>") + ";" + labels[key]
+
+        with open(path, "w") as file:
+            for stack, elapsed in enumerate(self.stack_times):
+                file.write(f"{stacks[stack]} {max(elapsed // 1000, 1)}\n")
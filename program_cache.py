@@ -0,0 +1,47 @@
+from collections import OrderedDict
+
+class ProgramCache:
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.programs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        program = self.programs.get(key)
+        if program is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.programs.move_to_end(key)
+        return program
+
+    def put(self, key, program):
+        if self.max_size <= 0:
+            return
+        self.programs[key] = program
+        self.programs.move_to_end(key)
+        self.shrink()
+
+    def resize(self, max_size: int):
+        self.max_size = max_size
+        self.shrink()
+
+    def shrink(self):
+        while len(self.programs) > max(self.max_size, 0):
+            self.programs.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.programs.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.programs),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
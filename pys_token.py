@@ -1,15 +1,15 @@
 class Token:
+    __slots__ = ("type", "value", "pos_start", "pos_end")
+
     def __init__(self, type_, value=None, pos_start=None, pos_end=None):
         self.type = type_
         self.value = value
         
-        if pos_start:
-            self.pos_start = pos_start.copy()
-            self.pos_end = pos_start.copy()
-            self.pos_end.next()
-            
-        if pos_end:
-            self.pos_end = pos_end
+        self.pos_start = pos_start
+        self.pos_end = pos_end
+        
+        if pos_start and not pos_end:
+            self.pos_end = pos_start.copy().next()
         
     def __repr__(self) -> str:
         if self.value:
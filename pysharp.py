@@ -1,40 +1,220 @@
 from lexer import Lexer
 from parser import Parser
 from number import Number
-from  errors import Exception
+from  errors import Exception, RuntimeError
 from pys_token import Token
 from interpreter import Interpreter, SymbolTable
+from resolver import Resolver
+from program_cache import ProgramCache
 from context import Context
+from source import Source, open_source
 import sys
+import builtins
 
-global_symbol_table = SymbolTable()
-global_symbol_table.set("nothing", Number(0))
-global_symbol_table.set("true", Number(1))
-global_symbol_table.set("false", Number(0))
+# the interpreter is mostly started for a single expression, so importing this module does as little as it can:
+# the global table is built on first use, and modules only some entry points need are imported by them.
+# assigning another table to global_symbol_table replaces it
+global_symbol_table = None
 
+def get_global_symbol_table() -> SymbolTable:
+    global global_symbol_table
+    if global_symbol_table is None:
+        global_symbol_table = SymbolTable()
+        global_symbol_table.set("nothing", Number(0))
+        global_symbol_table.set("true", Number(1))
+        global_symbol_table.set("false", Number(0))
+    return global_symbol_table
 
-def main(filename: str, text: str) -> Token | Exception:
-    lexer = Lexer(filename, text)
-    tokens, error = lexer.make_tokens()
-    if error: return "", error
-    
-    parser = Parser(tokens)
+program_cache = ProgramCache()
+
+# script mode writes its output in chunks of roughly this many characters
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+# limits are only needed for the max_bits constant folding must stay under
+def parse(filename: str, text: str, optimize: bool = True, limits=None):
+    key = (text, filename, optimize, limits.max_bits if optimize and limits is not None else None)
+    program = program_cache.get(key)
+    if program is not None: return program
+
+    program = parse_program(filename, text, optimize, limits=limits)
+    program_cache.put(key, program)
+    return program
+
+def parse_program(filename: str, text: str, optimize: bool = True, source: Source = None, limits=None):
+    lexer = Lexer(filename, text, source)
+    parser = Parser(lexer.generate_tokens(), lexer.source)
     ast = parser.parse()
-    if ast.error: return "", ast.error
-    
-    interperter = Interpreter()
-    context = Context("<program>")
-    context.symbol_table = global_symbol_table
-    result = interperter.visit(ast.node, context)
-    
+    if ast.error: return None, ast.error
+
+    node = ast.node
+    if optimize:
+        from optimizer import Optimizer
+        from cse import CommonSubexpressions
+        node = Optimizer(limits.max_bits if limits is not None else None).optimize(node)
+        CommonSubexpressions().share([node])
+    return Resolver(get_global_symbol_table()).resolve(node), None
+
+def execute(node, backend: str = "interpreter", interpreter=None, context: Context = None, limits=None):
+    if context is None:
+        context = Context("<program>")
+        context.symbol_table = get_global_symbol_table()
+    if limits is not None:
+        context.limits = limits
+    if context.limits is not None:
+        context.limits.start(node, context)
+
+    if backend == "vm":
+        from compiler import Compiler
+        from vm import VirtualMachine
+        instructions = Compiler().compile(node)
+        return VirtualMachine().run(instructions, context)
+    elif backend == "fast":
+        return (interpreter or Interpreter()).evaluate(node, context)
+    elif backend == "codegen":
+        from codegen import evaluate
+        return evaluate(node, context)
+    interperter = interpreter or Interpreter()
+    return interperter.visit(node, context)
+
+def main(filename: str, text: str, backend: str = "interpreter", optimize: bool = True, limits=None) -> Token | Exception:
+    node, error = parse(filename, text, optimize, limits)
+    if error: return "", error
+
+    result = execute(node, backend, limits=limits)
     return result.value, result.error
 
-def run():
+# one Source per non-blank line, all sharing the file's buffer so it is never copied into a str
+def split_lines(source: Source):
+    buffer = source.buffer
+    newline, carriage_return = ("\n", "\r") if isinstance(buffer, str) else (b"\n", b"\r")
+    start, line = source.start, source.first_line
+
+    while start < source.end:
+        end = buffer.find(newline, start, source.end)
+        if end < 0:
+            end = source.end
+        next_start = end + 1
+        if end > start and buffer[end - 1:end] == carriage_return:
+            end -= 1
+        if buffer[start:end].strip():
+            yield Source(source.filename, buffer, start, end, line)
+        start = next_start
+        line += 1
+
+def read_lines(filename: str, stream):
+    for line_number, line in enumerate(stream):
+        text = line.rstrip("\r\n")
+        if text.strip():
+            yield Source(filename, text, first_line=line_number)
+
+def parse_statements(statements):
+    for source in statements:
+        # each statement runs exactly once, so constant folding would cost more than it saves
+        yield parse_program(source.filename, None, optimize=False, source=source)
+
+# the trees come from the .pysc file next to the script while it was written for the same content,
+# otherwise the statements are parsed and the file is written as they are
+def load_statements(path: str, source: Source):
+    import precompiled
+    content_digest = precompiled.digest(source)
+    program = precompiled.load(precompiled.cache_path(path), content_digest)
+
+    if program is not None:
+        for statement, node in program.decode(source, get_global_symbol_table()):
+            if node is None:
+                yield parse_program(statement.filename, None, optimize=False, source=statement)
+            else:
+                yield node, None
+        # the statements after the part of a damaged file that could be decoded
+        if program.rest is not None:
+            yield from parse_statements(split_lines(program.rest))
+        return
+
+    encoder = precompiled.Encoder(precompiled.cache_path(path), content_digest)
+    try:
+        for statement in split_lines(source):
+            node, error = parse_program(statement.filename, None, optimize=False, source=statement)
+            encoder.add(statement, node)
+            yield node, error
+        encoder.save()
+    finally:
+        encoder.close()
+
+def run_script(programs, output=sys.stdout, backend: str = "fast", interpreter=None, limits=None) -> int:
+    # statements are streamed: only the current one and its tree are alive at any time,
+    # so the program cache is bypassed and statements never share their positions
+    errors = 0
+    buffer = []
+    buffered = 0
+
+    try:
+        for node, error in programs:
+            text = None
+            if not error:
+                try:
+                    result = execute(node, backend, interpreter, limits=limits)
+                    error = result.error
+                    if not error and result.value:
+                        text = f"{result.value}\n"
+                except builtins.Exception as exception:
+                    # a statement the evaluator, or printing its value, fails on only fails that statement
+                    error = RuntimeError(node.pos_start, node.pos_end, f"{type(exception).__name__}: {exception}", Context("<program>"))
+
+            if error:
+                errors += 1
+                text = error.to_string() + "\n"
+            elif text is None:
+                continue
+
+            buffer.append(text)
+            buffered += len(text)
+            if buffered >= OUTPUT_BUFFER_SIZE:
+                output.write("".join(buffer))
+                buffer.clear()
+                buffered = 0
+    finally:
+        # whatever was printed before the script stopped, however it stopped
+        output.write("".join(buffer))
+        output.flush()
+    return errors
+
+def run_file(path: str, backend: str = "fast", interpreter=None, cache: bool = False, limits=None) -> int:
+    if path == "-":
+        return run_script(parse_statements(read_lines("<stdin>", sys.stdin)), backend=backend, interpreter=interpreter, limits=limits)
+    # the file stays mapped for as long as positions into it are alive, e.g. until a profile is reported
+    source = open_source(path)
+    programs = load_statements(path, source) if cache else parse_statements(split_lines(source))
+    return run_script(programs, backend=backend, interpreter=interpreter, limits=limits)
+
+def profile_file(path: str, collapsed_path: str = None, cache: bool = False, limits=None) -> int:
+    from profiler import ProfilingInterpreter
+    profiler = ProfilingInterpreter()
+    errors = run_file(path, "interpreter", profiler, cache, limits)
+    sys.stderr.write(profiler.report())
+    if collapsed_path:
+        profiler.write_collapsed(collapsed_path)
+    return errors
+
+def main_columns(filename: str, text: str, columns: dict):
+    node, error = parse(filename, text)
+    if error: return None, error
+
+    # numpy is only needed by this entry point
+    from vectorized import evaluate_columns
+    context = Context("<program>")
+    context.symbol_table = get_global_symbol_table()
+    return evaluate_columns(node, columns, context)
+
+def main_batch(texts, workers: int = None, chunk_size: int = None, backend: str = "fast", limits=None) -> list:
+    from batch import evaluate_batch
+    return evaluate_batch(texts, workers, chunk_size, backend=backend, limits=limits)
+
+def run(limits=None):
     while True:
         line = input("psharp > ")
         if line == "exit":
             sys.exit(0)
-        result, error = main("<stdin>", line)
+        result, error = main("<stdin>", line, limits=limits)
         if error:
             print(error.to_string())
         elif result:
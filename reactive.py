@@ -0,0 +1,260 @@
+import heapq
+import itertools
+import pysharp
+from number import Number
+from interpreter import SymbolTable
+from context import Context
+from errors import RuntimeError
+from nodes import VariableAssignmentNode, children
+
+SHEET_FILENAME = "<sheet>"
+# generated code reads every variable it mentions up front, assigned or not, so it cannot tell what a statement read
+TRACKED_BACKENDS = ("interpreter", "fast", "vm")
+
+# every variable the statement has a let for, whether or not its run got to it
+def assigned_names(node) -> set:
+    names, stack = set(), [node]
+    while stack:
+        node = stack.pop()
+        if type(node) is VariableAssignmentNode:
+            names.add(node.var_name_token.value)
+        stack.extend(children(node))
+    return names
+
+class TrackingSymbolTable(SymbolTable):
+    # a statement runs against a table of its own that starts out empty, so every variable it did not
+    # assign itself falls through to get, which records it as read from the sheet
+    def __init__(self, parent):
+        super().__init__()
+        self.parent = parent
+        self.reads = set()
+
+    def get(self, name):
+        slot = self.slots.get(name)
+        value = None if slot is None else self.values[slot]
+        if value is None:
+            self.reads.add(name)
+            return self.parent.get(name)
+        return value
+
+    def reset(self):
+        self.values = [None] * len(self.values)
+        self.reads = set()
+
+    # the variables the statement assigned
+    def writes(self) -> dict:
+        return {name: self.values[slot] for name, slot in self.slots.items() if self.values[slot] is not None}
+
+class Cell:
+    def __init__(self, node, number: int):
+        self.node = node
+        self.number = number
+        self.symbol_table = None
+        # what the last run read from the sheet and assigned
+        self.reads = set()
+        self.writes = {}
+        # the variables the sheet takes from this statement
+        self.names = set()
+        self.value = None
+        self.error = None
+        # above the cells of every variable it reads, so cells recompute in topological order by height
+        self.height = 0
+
+    def __repr__(self) -> str:
+        return f"Cell({self.number}, {self.node.pos_start.source.text()!r})"
+
+class Sheet:
+    # statements whose let bindings are kept up to date: setting a variable, or running a statement that
+    # assigns it, recomputes only the statements that read it, directly or through other statements
+    def __init__(self, backend: str = "fast", symbol_table: SymbolTable = None):
+        if backend not in TRACKED_BACKENDS:
+            raise ValueError(f"a sheet cannot track what the {backend} backend reads")
+        self.backend = backend
+        if symbol_table is None:
+            symbol_table = SymbolTable()
+            symbol_table.parent = pysharp.get_global_symbol_table()
+        self.symbol_table = symbol_table
+        # number -> cell, in the order the statements were run
+        self.cells = {}
+        # variable -> the cell it comes from, variables set from outside have none
+        self.owners = {}
+        # variable -> the cells that read it
+        self.readers = {}
+        self.numbers = itertools.count()
+        # statements evaluated, the first runs included
+        self.runs = 0
+
+    def run(self, text: str) -> Cell:
+        node, error = pysharp.parse_program(SHEET_FILENAME, text)
+        cell = Cell(node, next(self.numbers))
+        if error:
+            cell.error = error
+            return cell
+
+        self.evaluate(cell)
+        # a statement that fails is kept like one that succeeded: the variables it defines stay undefined
+        # until a variable it read changes and it runs again
+        names = assigned_names(node) if cell.error else cell.writes
+        cycle = self.find_cycle(cell, names)
+        if cycle:
+            cell.error = RuntimeError(node.pos_start, node.pos_end, f"Circular dependency: {' -> '.join(cycle)}", self.context(cell))
+            return cell
+
+        self.cells[cell.number] = cell
+        self.link(cell)
+        for name in names:
+            self.own(name, cell)
+        self.propagate(self.commit(cell))
+        return cell
+
+    # sets a variable from outside, which takes it from the statement that assigned it, if any.
+    # returns the cells that were recomputed
+    def set(self, name: str, value) -> list:
+        self.disown(name)
+        number = value if isinstance(value, Number) else Number(value)
+        if self.same(number, self.symbol_table.get(name)):
+            return []
+        self.symbol_table.set(name, number)
+        return self.propagate({name})
+
+    def get(self, name: str):
+        number = self.symbol_table.get(name)
+        return None if number is None else number.value
+
+    # the variables the statement a variable comes from read
+    def dependencies(self, name: str) -> set:
+        owner = self.owners.get(name)
+        return set() if owner is None else set(owner.reads)
+
+    # the cells a change to the variable recomputes, in the order they would be
+    def dependents(self, name: str) -> list:
+        found, stack = set(), [name]
+        while stack:
+            for cell in self.readers.get(stack.pop(), ()):
+                if cell not in found:
+                    found.add(cell)
+                    stack.extend(cell.names)
+        return sorted(found, key=lambda cell: (cell.height, cell.number))
+
+    # variable -> the variables it was computed from, for every variable a statement assigned
+    def graph(self) -> dict:
+        return {name: sorted(owner.reads) for name, owner in self.owners.items()}
+
+    def context(self, cell: Cell) -> Context:
+        context = Context(SHEET_FILENAME)
+        context.symbol_table = cell.symbol_table
+        return context
+
+    def evaluate(self, cell: Cell):
+        if cell.symbol_table is None:
+            cell.symbol_table = TrackingSymbolTable(self.symbol_table)
+        cell.symbol_table.reset()
+        result = pysharp.execute(cell.node, self.backend, None, self.context(cell))
+        self.runs += 1
+        cell.reads = cell.symbol_table.reads
+        # a statement that failed gives the sheet nothing
+        cell.writes = cell.symbol_table.writes() if not result.error else {}
+        cell.value, cell.error = result.value, result.error
+        cell.height = 1 + max((self.owners[name].height for name in cell.reads if name in self.owners), default=0)
+
+    # the variables from one of names back to it through the cells they come from, if there are any
+    def find_cycle(self, cell: Cell, names) -> list:
+        # variable -> the variable that read it on the way there
+        parents = {name: None for name in cell.reads}
+        stack = sorted(cell.reads, reverse=True)
+        while stack:
+            name = stack.pop()
+            if name in names:
+                path = [name]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                return [name] + path[::-1]
+            owner = self.owners.get(name)
+            if owner is None: continue
+            for read in sorted(owner.reads, reverse=True):
+                if read not in parents:
+                    parents[read] = name
+                    stack.append(read)
+        return None
+
+    def own(self, name: str, cell: Cell):
+        self.disown(name)
+        self.owners[name] = cell
+        cell.names.add(name)
+
+    # the statement the variable came from no longer gives it, and is dropped once it gives nothing
+    def disown(self, name: str):
+        owner = self.owners.pop(name, None)
+        if owner is None: return
+        owner.names.discard(name)
+        if not owner.names:
+            self.unlink(owner)
+            del self.cells[owner.number]
+
+    def link(self, cell: Cell):
+        for name in cell.reads:
+            self.readers.setdefault(name, set()).add(cell)
+
+    def unlink(self, cell: Cell):
+        for name in cell.reads:
+            readers = self.readers.get(name)
+            if readers is not None:
+                readers.discard(cell)
+                if not readers: del self.readers[name]
+
+    def same(self, number, other) -> bool:
+        if number is None or other is None:
+            return number is other
+        # 1 and 1.0 are equal but do not print the same
+        return type(number.value) is type(other.value) and number.value == other.value
+
+    # writes the cell's variables to the sheet and returns the ones whose value changed. a variable
+    # no statement gives yet goes to the first that assigns it
+    def commit(self, cell: Cell) -> set:
+        for name in cell.writes:
+            if name not in self.owners:
+                self.own(name, cell)
+        changed = set()
+        for name in cell.names:
+            number = cell.writes.get(name)
+            if not self.same(number, self.symbol_table.get(name)):
+                changed.add(name)
+            self.symbol_table.set(name, number)
+        return changed
+
+    # recomputes the readers of the changed variables lowest first, and their readers in turn as long as
+    # values change. returns the cells that were recomputed
+    def propagate(self, changed: set) -> list:
+        queue, queued, recomputed = [], set(), []
+
+        def enqueue(names):
+            for name in names:
+                for reader in self.readers.get(name, ()):
+                    if reader not in queued:
+                        queued.add(reader)
+                        heapq.heappush(queue, (reader.height, reader.number, reader))
+
+        enqueue(changed)
+        while queue:
+            _, _, cell = heapq.heappop(queue)
+            queued.discard(cell)
+            if cell.number not in self.cells: continue
+
+            self.unlink(cell)
+            self.evaluate(cell)
+            self.link(cell)
+
+            # it now reads a variable whose cell is still waiting to recompute, so it runs again after that one
+            waiting = [self.owners[name] for name in cell.reads if self.owners.get(name) in queued]
+            if waiting and cell.height <= len(self.cells):
+                cell.height = 1 + max(owner.height for owner in waiting)
+                queued.add(cell)
+                heapq.heappush(queue, (cell.height, cell.number, cell))
+                continue
+            if waiting:
+                cell.error = RuntimeError(cell.node.pos_start, cell.node.pos_end, "Circular dependency", self.context(cell))
+                cell.writes = {}
+
+            recomputed.append(cell)
+            enqueue(self.commit(cell))
+        return recomputed
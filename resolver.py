@@ -0,0 +1,16 @@
+from nodes import VariableAccessNode, VariableAssignmentNode, children
+
+class Resolver:
+    def __init__(self, symbol_table):
+        self.symbol_table = symbol_table
+
+    # gives every variable node its slot in the symbol table up front, so reads and writes
+    # become one list index instead of a name lookup through the table chain
+    def resolve(self, node):
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, (VariableAccessNode, VariableAssignmentNode)):
+                self.symbol_table.resolve(item)
+            stack.extend(children(item))
+        return node
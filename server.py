@@ -0,0 +1,241 @@
+import json
+import math
+import asyncio
+import multiprocessing
+import pysharp
+from number import Number
+from interpreter import SymbolTable
+from context import Context
+from batch import BatchError, snapshot, initialize_worker
+from limits import Limits
+
+MAX_REQUEST_SIZE = 1 << 20
+# the largest integer a request may compute by default, a few hundred kilobytes
+MAX_BITS = 1 << 22
+# by default an evaluation stops itself this far into the request's timeout, killing its worker is
+# left for the single operations that overrun it
+TIME_LIMIT_SHARE = 0.8
+SESSION_FILENAME = "<session>"
+# a forked worker would inherit the sockets and the other workers' pipes, and keep them open
+WORKER_START_METHOD = multiprocessing.get_context("spawn")
+
+# JSON has no complex numbers, infinities or NaN, they are sent as the text they print as
+def json_value(value):
+    if value is None or type(value) is int or type(value) is float and math.isfinite(value):
+        return value
+    return str(value)
+
+def reject_constant(name: str):
+    raise ValueError(f"{name} is not valid JSON")
+
+class Session:
+    def __init__(self, name: str):
+        self.name = name
+        # the variables the connection defined, as plain values: they go to a worker with every
+        # request and are replaced by what the request leaves behind
+        self.bindings = {}
+
+def evaluate(name: str, bindings: dict, code: str, backend: str, limits: Limits = None):
+    node, error = pysharp.parse(SESSION_FILENAME, code, limits=limits)
+    if error: return None, BatchError(error), bindings
+
+    # the session's names are its own, the constants come from the global table
+    symbol_table = SymbolTable()
+    symbol_table.parent = pysharp.get_global_symbol_table()
+    for variable, value in bindings.items():
+        symbol_table.set(variable, Number(value))
+    context = Context(name)
+    context.symbol_table = symbol_table
+
+    result = pysharp.execute(node, backend, None, context, limits)
+    if result.error: return None, BatchError(result.error), snapshot(symbol_table)
+    return None if result.value is None else result.value.value, None, snapshot(symbol_table)
+
+def work(connection, symbols: dict, backend: str, limits: Limits):
+    # every worker keeps its own program cache, shared by all the sessions it evaluates for
+    initialize_worker(symbols)
+    try:
+        connection.send(None)
+        while True:
+            name, bindings, code = connection.recv()
+            try:
+                response = evaluate(name, bindings, code, backend, limits) + (None,)
+            except Exception as exception:
+                response = (None, None, None, repr(exception))
+            connection.send(response)
+    except (EOFError, BrokenPipeError):
+        # the server is gone
+        return
+
+class Worker:
+    def __init__(self, symbols: dict, backend: str, limits: Limits):
+        self.connection, child = WORKER_START_METHOD.Pipe()
+        self.process = WORKER_START_METHOD.Process(target=work, args=(child, symbols, backend, limits), daemon=True)
+        self.process.start()
+        child.close()
+
+    def stop(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+class Server:
+    # one request per line: either the program itself, answered with one line of text,
+    # or a JSON object {"id": ..., "code": ...}, answered with a JSON object on one line
+    def __init__(self, timeout: float = 5.0, concurrency: int = 8, backend: str = "fast", max_request_size: int = MAX_REQUEST_SIZE, limits: Limits = None):
+        self.timeout = timeout
+        self.backend = backend
+        self.limits = limits if limits is not None else Limits(max_bits=MAX_BITS, timeout=timeout * TIME_LIMIT_SHARE)
+        self.max_request_size = max_request_size
+        self.concurrency = concurrency
+        self.symbols = snapshot(pysharp.get_global_symbol_table())
+        # evaluations run in worker processes so one that runs too long can be killed;
+        # a request waits for an idle worker, which limits how many run at the same time
+        self.workers = asyncio.Queue()
+        self.starting = set()
+        self.sessions = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: str = None):
+        await asyncio.gather(*(self.start_worker() for _ in range(self.concurrency)))
+        if path:
+            return await asyncio.start_unix_server(self.handle, path, limit=self.max_request_size)
+        return await asyncio.start_server(self.handle, host, port, limit=self.max_request_size)
+
+    # a worker only takes requests once it is ready, so its start-up does not count against a timeout
+    async def start_worker(self):
+        worker = Worker(self.symbols, self.backend, self.limits)
+        try:
+            await self.readable(worker.connection)
+            worker.connection.recv()
+        except BaseException:
+            worker.stop()
+            raise
+        self.workers.put_nowait(worker)
+
+    def close(self):
+        for task in self.starting:
+            task.cancel()
+        while not self.workers.empty():
+            self.workers.get_nowait().stop()
+
+    async def handle(self, reader, writer):
+        self.sessions += 1
+        session = Session(f"<session {self.sessions}>")
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as exception:
+                    line = exception.partial
+                except asyncio.LimitOverrunError:
+                    # nothing of the line was consumed yet, so its first byte still tells how the client frames requests
+                    framed = await reader.read(1) == b"{"
+                    writer.write(self.encode(framed, None, error={"name": "Request too long", "details": f"requests are limited to {self.max_request_size} bytes"}))
+                    await writer.drain()
+                    break
+                if not line: break
+
+                response = await self.respond(session, line.decode("utf-8", "replace").rstrip("\r\n"))
+                writer.write(response)
+                # a client that stops reading its responses stops getting its requests read
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, session, text: str) -> bytes:
+        framed = text.startswith("{")
+        request_id, code = None, text
+        if framed:
+            try:
+                request = json.loads(text, parse_constant=reject_constant)
+                request_id, code = request.get("id"), request.get("code")
+                if not isinstance(code, str): raise TypeError("'code' must be a string")
+            except (ValueError, TypeError, AttributeError) as exception:
+                return self.encode(framed, request_id, error={"name": "Bad request", "details": str(exception)})
+
+        try:
+            value, error, bindings, crash = await self.evaluate(session, code)
+        except asyncio.TimeoutError:
+            return self.encode(framed, request_id, error={"name": "Timeout", "details": f"evaluation took longer than {self.timeout} seconds"})
+        except (EOFError, OSError):
+            return self.encode(framed, request_id, error={"name": "Internal error", "details": "the evaluation worker exited"})
+
+        if crash:
+            return self.encode(framed, request_id, error={"name": "Internal error", "details": crash})
+        session.bindings = bindings
+        if error:
+            return self.encode(framed, request_id, error=self.describe(error.to_error()))
+        return self.encode(framed, request_id, value=value)
+
+    async def evaluate(self, session, code: str):
+        worker = await self.workers.get()
+        try:
+            worker.connection.send((session.name, session.bindings, code))
+            await asyncio.wait_for(self.readable(worker.connection), self.timeout)
+            response = worker.connection.recv()
+        except BaseException:
+            # the worker may still be evaluating, and its answer would be taken for the next request's.
+            # the session keeps the variables it had before the request
+            worker.stop()
+            task = asyncio.ensure_future(self.start_worker())
+            self.starting.add(task)
+            task.add_done_callback(self.starting.discard)
+            raise
+        self.workers.put_nowait(worker)
+        return response
+
+    async def readable(self, connection):
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        loop.add_reader(connection.fileno(), lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_reader(connection.fileno())
+
+    def describe(self, error) -> dict:
+        return {
+            "name": error.error_name,
+            "details": error.details,
+            "line": error.pos_start.line + 1,
+            "column": error.pos_start.col + 1,
+            "text": error.to_string(),
+        }
+
+    def encode(self, framed: bool, request_id, value=None, error: dict = None) -> bytes:
+        try:
+            return self.format(framed, request_id, value, error)
+        except (TypeError, ValueError) as exception:
+            # e.g. an integer of more than 4300 digits, which Python will not write as text. the error
+            # only fails its own request, the connection carries on
+            return self.format(framed, request_id, error={"name": "Unrepresentable result", "details": str(exception)})
+
+    def format(self, framed: bool, request_id, value=None, error: dict = None) -> bytes:
+        if framed:
+            response = {"id": request_id, "error": error} if error else {"id": request_id, "value": json_value(value)}
+            return (json.dumps(response, allow_nan=False) + "\n").encode()
+        if error:
+            location = f" (line {error['line']}, column {error['column']})" if "line" in error else ""
+            return f"{error['name']}: {error['details']}{location}\n".encode()
+        return b"\n" if value is None else f"{value}\n".encode()
+
+async def serve(address: str, timeout: float, concurrency: int, limits: Limits = None):
+    server = Server(timeout, concurrency, limits=limits)
+    try:
+        if address.startswith("unix:"):
+            listener = await server.start(path=address[len("unix:"):])
+        else:
+            host, _, port = address.rpartition(":")
+            listener = await server.start(host or "127.0.0.1", int(port))
+        names = [socket.getsockname() for socket in listener.sockets]
+        print("listening on " + ", ".join(f"{name[0]}:{name[1]}" if isinstance(name, tuple) else name for name in names), flush=True)
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
@@ -0,0 +1,62 @@
+import mmap
+from bisect import bisect_right
+
+class Source:
+    __slots__ = ("filename", "buffer", "start", "end", "first_line", "line_starts")
+
+    # the source is buffer[start:end]; buffer is a str, or bytes / an mmap for files
+    def __init__(self, filename: str, buffer, start: int = 0, end: int = None, first_line: int = 0):
+        self.filename = filename
+        self.buffer = buffer
+        self.start = start
+        self.end = len(buffer) if end is None else end
+        self.first_line = first_line
+        self.line_starts = None
+
+    def text(self, start: int = None, end: int = None) -> str:
+        text = self.buffer[self.start if start is None else start:self.end if end is None else end]
+        return text if isinstance(text, str) else text.decode("utf-8", "replace")
+
+    # offsets of the first character of every line, only built once something needs a line or column
+    def lines(self) -> list:
+        if self.line_starts is None:
+            newline = "\n" if isinstance(self.buffer, str) else b"\n"
+            starts = [self.start]
+            index = self.buffer.find(newline, self.start, self.end)
+            while index >= 0:
+                starts.append(index + 1)
+                index = self.buffer.find(newline, index + 1, self.end)
+            self.line_starts = starts
+        return self.line_starts
+
+    def line(self, index: int) -> int:
+        return self.first_line + bisect_right(self.lines(), index) - 1
+
+    def column(self, index: int) -> int:
+        lines = self.lines()
+        line_start = lines[bisect_right(lines, index) - 1]
+        if isinstance(self.buffer, str):
+            return index - line_start
+        # columns count characters, a file buffer holds their utf-8 bytes
+        return len(self.buffer[line_start:index].decode("utf-8", "replace"))
+
+    # the whole character at index and the index after it
+    def character(self, index: int):
+        if isinstance(self.buffer, str):
+            return self.buffer[index], index + 1
+        lead = self.buffer[index]
+        end = min(index + (1 if lead < 0xC0 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4), self.end)
+        char = self.buffer[index:end].decode("utf-8", "replace")
+        return (char, end) if len(char) == 1 else ("\ufffd", index + 1)
+
+    def line_text(self, line: int) -> str:
+        lines = self.lines()
+        line -= self.first_line
+        end = lines[line + 1] - 1 if line + 1 < len(lines) else self.end
+        return self.text(lines[line], end).rstrip("\r")
+
+def open_source(path: str) -> Source:
+    with open(path, "rb") as file:
+        # an empty file cannot be mapped
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if file.seek(0, 2) else b""
+    return Source(path, buffer)
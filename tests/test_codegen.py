@@ -0,0 +1,106 @@
+import random
+import pytest
+import pysharp
+from number import Number
+from interpreter import SymbolTable
+from codegen import compile_program
+from limits import Limits
+from errors import RuntimeErrorRaised
+
+ATOMS = ["0", "1", "2", "3", "10", "0.0", "2.5", "x", "y", "z", "true", "false", "nothing"]
+OPERATORS = ["+", "-", "*", "/", "^", "==", "!=", "<", ">", "<=", ">=", "and", "or"]
+
+def generate(depth: int) -> str:
+    choice = random.random()
+    if depth <= 0 or choice < 0.25:
+        return random.choice(ATOMS)
+    if choice < 0.6:
+        return f"{generate(depth - 1)} {random.choice(OPERATORS)} {generate(depth - 1)}"
+    if choice < 0.7:
+        return f"({generate(depth - 1)})"
+    if choice < 0.78:
+        return f"{random.choice(['-', '+', 'not '])}{generate(depth - 1)}"
+    if choice < 0.88:
+        return f"(let {random.choice('xyz')} = {generate(depth - 1)})"
+    text = f"(if {generate(depth - 1)} then {generate(depth - 1)}"
+    text += "".join(f" elif {generate(depth - 1)} then {generate(depth - 1)}" for _ in range(random.randint(0, 2)))
+    if random.random() < 0.7:
+        text += f" else {generate(depth - 1)}"
+    return text + ")"
+
+def run(monkeypatch, text: str, backend: str, optimize: bool):
+    table = SymbolTable()
+    for name, value in [("nothing", 0), ("true", 1), ("false", 0), ("x", 3), ("y", 0)]:
+        table.set(name, Number(value))
+    monkeypatch.setattr(pysharp, "global_symbol_table", table)
+    pysharp.program_cache.clear()
+
+    result, error = pysharp.main("<corpus>", text, backend, optimize)
+    symbols = sorted((name, repr(value)) for name, value in table.symbols.items())
+    if error:
+        # the Interpreter takes the call stack of an error from the operands' context, which is its own quirk
+        return ("error", error.details, error.pos_start.index, error.pos_end.index, symbols)
+    if result is None:
+        return (None, symbols)
+    return (type(result.value), result.value, result.pos_start.index, result.pos_end.index, symbols)
+
+@pytest.mark.parametrize("optimize", [False, True])
+def test_matches_the_interpreter_on_a_random_corpus(monkeypatch, optimize):
+    random.seed(20)
+    compared = 0
+    for _ in range(1500):
+        text = generate(4)
+        try:
+            expected = run(monkeypatch, text, "interpreter", False)
+        except Exception:
+            # programs the Interpreter itself fails on, such as an if without a taken branch used as an operand
+            continue
+        assert run(monkeypatch, text, "codegen", optimize) == expected, text
+        compared += 1
+    assert compared > 1200
+
+@pytest.mark.parametrize("text", ["x + " * 1000 + "1", "(" * 1000 + "x" + ")" * 1000, "-" * 1000 + "x", "x + " * 1000 + "missing"],
+                         ids=["sums", "parentheses", "negations", "undefined"])
+def test_too_deep_to_compile_runs_on_the_virtual_machine(monkeypatch, text):
+    assert run(monkeypatch, text, "codegen", False) == run(monkeypatch, text, "vm", False)
+
+def test_too_deep_to_compile_is_still_limited(monkeypatch):
+    monkeypatch.setattr(pysharp, "global_symbol_table", SymbolTable())
+    result, error = pysharp.main("<t>", "2 ^ 64 * " * 1000 + "1", "codegen", False, Limits(max_bits=100))
+    assert error and result is None
+
+def test_comparisons_are_zero_or_one():
+    program = compile_program(pysharp.parse("<t>", "(x < y) + (x == x) * 10 + (x > y) * 100 + (not x) * 1000", False)[0])
+    assert program({"x": 2.5, "y": 4}) == 11
+
+@pytest.mark.parametrize("text, expected", [("x and y", 4), ("y and x", 2), ("0 or x", 2), ("0.0 and x", 0)])
+def test_logic_gives_the_deciding_operand_truncated(text, expected):
+    program = compile_program(pysharp.parse("<t>", text, False)[0])
+    assert program({"x": 2.5, "y": 4}) == expected
+
+def test_if_evaluates_to_its_taken_branch_or_nothing():
+    program = compile_program(pysharp.parse("<t>", "if x > 1 then 10 elif x > 0 then 20", False)[0])
+    assert [program({"x": x}) for x in (2, 1, 0)] == [10, 20, None]
+
+def test_division_by_zero_is_positioned_at_the_taken_branch():
+    text = "1 / (if x then (let y = 0) else 0.0)"
+    program = compile_program(pysharp.parse("<t>", text, False)[0])
+    for x, branch in [(1, "0"), (0, "0.0")]:
+        with pytest.raises(RuntimeErrorRaised) as raised:
+            program({"x": x})
+        error = raised.value.error
+        assert error.details == "Disivion by zero is illegal"
+        assert text[error.pos_start.index:error.pos_end.index] == branch
+
+def test_assignments_are_written_back_to_the_bindings():
+    program = compile_program(pysharp.parse("<t>", "(let a = x + 1) * (let b = a * 2)", False)[0])
+    bindings = {"x": 1}
+    assert program(bindings) == 8
+    assert bindings == {"x": 1, "a": 2, "b": 4}
+
+def test_undefined_variable_fails_at_its_position():
+    text = "1 + missing"
+    program = compile_program(pysharp.parse("<t>", text, False)[0])
+    with pytest.raises(RuntimeErrorRaised) as raised:
+        program({})
+    assert text[raised.value.error.pos_start.index:raised.value.error.pos_end.index] == "missing"
@@ -0,0 +1,120 @@
+import random
+import pytest
+import pysharp
+import batch
+from number import Number
+from nodes import children
+from interpreter import SymbolTable
+from context import Context
+from cse import CommonSubexpressions
+
+ATOMS = ["0", "1", "2", "2.5", "x", "y", "z", "true"]
+OPERATORS = ["+", "-", "*", "/", "^", "==", "<", ">=", "and", "or"]
+
+def generate(depth: int, pool: list) -> str:
+    choice = random.random()
+    if pool and choice < 0.3:
+        # the repeated subexpressions generated formulas are made of
+        return random.choice(pool)
+    if depth <= 0 or choice < 0.4:
+        return random.choice(ATOMS)
+    if choice < 0.75:
+        return f"({generate(depth - 1, pool)} {random.choice(OPERATORS)} {generate(depth - 1, pool)})"
+    if choice < 0.82:
+        return f"({random.choice(['-', 'not '])}{generate(depth - 1, pool)})"
+    if choice < 0.9:
+        return f"(let {random.choice('xyz')} = {generate(depth - 1, pool)})"
+    return f"(if {generate(depth - 1, pool)} then {generate(depth - 1, pool)} else {generate(depth - 1, pool)})"
+
+def corpus(count: int) -> list:
+    pool = [generate(2, []) for _ in range(4)]
+    return [generate(5, pool) for _ in range(count)]
+
+def make_context() -> Context:
+    context = Context("<program>")
+    context.symbol_table = SymbolTable()
+    for name, value in [("true", 1), ("x", 3), ("y", 0.5)]:
+        context.symbol_table.set(name, Number(value))
+    return context
+
+def shared_nodes(node) -> list:
+    nodes, stack = [], [node]
+    while stack:
+        item = stack.pop()
+        if getattr(item, "shared", None) is not None:
+            nodes.append(item)
+        stack.extend(children(item))
+    return nodes
+
+def run(node, backend: str):
+    context = make_context()
+    try:
+        result = pysharp.execute(node, backend, None, context)
+    except Exception:
+        # programs the Interpreter itself fails on, such as an if without a taken branch used as an operand
+        return ("crash",)
+    symbols = sorted((name, repr(value)) for name, value in context.symbol_table.symbols.items())
+    if result.error:
+        error = result.error
+        return ("error", error.details, error.pos_start.index, error.pos_end.index, symbols)
+    if result.value is None:
+        return (None, symbols)
+    return (type(result.value.value), result.value.value, result.value.pos_start.index, result.value.pos_end.index, symbols)
+
+@pytest.mark.parametrize("backend", ["interpreter", "fast"])
+def test_sharing_does_not_change_results(backend):
+    random.seed(21)
+    shared = 0
+    for text in corpus(800):
+        node, error = pysharp.parse_program("<corpus>", text)
+        assert not error
+        with_sharing = run(node, backend)
+        nodes = shared_nodes(node)
+        shared += bool(nodes)
+        for item in nodes:
+            item.shared = None
+        assert with_sharing == run(node, backend), text
+    assert shared > 100
+
+def test_copies_are_hash_consed_and_evaluated_once():
+    text = " + ".join(["(a * b + c)"] * 12)
+    node, _ = pysharp.parse_program("<t>", text, optimize=False)
+    sharer = CommonSubexpressions()
+    sharer.share([node])
+    # 12 copies of 5 nodes, and the 11 + nodes joining them are all different
+    assert sharer.stats() == {"nodes": 71, "deduplicated": 55, "shared": 1}
+
+    context = make_context()
+    for name, value in [("a", 2), ("b", 3), ("c", 1)]:
+        context.symbol_table.set(name, Number(value))
+    interpreter = pysharp.Interpreter()
+    assert pysharp.execute(node, "fast", interpreter, context).value.value == 84
+    assert len(interpreter.memo) == 1
+
+def test_numbers_equal_in_python_are_not_shared():
+    node, _ = pysharp.parse_program("<t>", "(x * 1) + (x * 1.0) + (x * -0.0) + (x * 0.0)")
+    sharer = CommonSubexpressions()
+    sharer.share([node])
+    assert sharer.shared == 0
+
+def test_assignment_forgets_remembered_values():
+    node, _ = pysharp.parse_program("<t>", "(x * x + 1) + (let x = 10) + (x * x + 1)")
+    assert pysharp.execute(node, "fast", None, make_context()).value.value == 10 + 10 + 101
+    assert pysharp.execute(node, "interpreter", None, make_context()).value.value == 10 + 10 + 101
+
+def test_errors_are_positioned_at_the_copy_that_fails():
+    text = "(if x > 5 then 1 / (x - 3) else 0) + 1 / (x - 3)"
+    node, _ = pysharp.parse_program("<t>", text)
+    for backend in ("interpreter", "fast"):
+        error = pysharp.execute(node, backend, None, make_context()).error
+        assert error.pos_start.index == text.rindex("(x - 3)") + 1
+
+def test_batch_shares_across_expressions(monkeypatch):
+    table = SymbolTable()
+    for name, value in [("x", 3), ("y", 4)]:
+        table.set(name, Number(value))
+    monkeypatch.setattr(pysharp, "global_symbol_table", table)
+    pysharp.program_cache.clear()
+
+    texts = ["(x * y + 1) * 2", "(x * y + 1) / 2", "(let y = 0) + (x * y + 1)", "(x * y + 1) - 1", "y"]
+    assert [value for value, _ in batch.evaluate_batch(texts, workers=1)] == [26, 6.5, 1, 12, 4]
@@ -0,0 +1,76 @@
+import pytest
+import pysharp
+import number
+from number import Number, BINARY_OPERATIONS, UNARY_OPERATIONS
+from parser import BINARY_OPERATORS
+from interpreter import Interpreter, SymbolTable
+from context import Context
+from constants import *
+
+# a value type of its own, which only needs entries in the dispatch tables
+class Interval(Number):
+    __slots__ = ("width",)
+
+    def __init__(self, value, width):
+        super().__init__(value)
+        self.width = width
+
+    def copy(self):
+        copy = Interval(self.value, self.width)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+def add_interval(left, right):
+    return Interval(left.value + right.value, left.width).set_context(left.context), None
+
+def run(text: str, x):
+    node, error = pysharp.parse_program("<t>", text, optimize=False)
+    assert not error
+    context = Context("<t>")
+    context.symbol_table = SymbolTable()
+    context.symbol_table.set("x", x)
+    return node, Interpreter().visit(node, context)
+
+def test_every_operator_is_in_the_tables():
+    assert {(operator, Number, Number) for operator in BINARY_OPERATORS} == set(BINARY_OPERATIONS)
+    assert {operator for operator, _ in UNARY_OPERATIONS} == {TOKEN_MINUS, TOKEN_PLUS, (TOKEN_KEYWORD, "not")}
+
+def test_operations_are_cached_on_their_nodes():
+    node, result = run("x * 2 - -x", Number(3))
+    assert result.value.value == 9
+    assert node.cache == (Number, Number, Number.subbed_by)
+    assert node.left_node.cache == (Number, Number, Number.multed_by)
+    assert node.right_node.cache == (Number, Number.negated)
+
+def test_other_value_types_are_dispatched_by_their_entries(monkeypatch):
+    monkeypatch.setitem(number.BINARY_OPERATIONS, (TOKEN_PLUS, Interval, Number), add_interval)
+    node, result = run("x + 1", Interval(2, 0.5))
+    assert (type(result.value), result.value.value, result.value.width) == (Interval, 3, 0.5)
+    assert node.cache == (Interval, Number, add_interval)
+
+    # the same node sees a Number next time and is dispatched again
+    context = Context("<t>")
+    context.symbol_table = SymbolTable()
+    context.symbol_table.set("x", Number(2))
+    assert Interpreter().visit(node, context).value.value == 3
+    assert node.cache == (Number, Number, Number.added_to)
+
+def test_operands_without_an_operation_fail_like_the_other_backends():
+    with pytest.raises(TypeError):
+        run("(if x then 1) + 1", Number(0))
+
+@pytest.mark.parametrize("backend", ["interpreter", "fast", "vm", "codegen"])
+@pytest.mark.parametrize("text", ["(if 0 then 1) + 1", "1 * (if 0 then 1)", "(if 0 then 1) < 1", "1 and (if 0 then 1)", "-(if 0 then 1)"])
+def test_an_if_without_a_taken_branch_is_no_operand_on_any_backend(backend, text):
+    with pytest.raises(TypeError):
+        pysharp.main("<t>", text, backend, False)
+
+@pytest.mark.parametrize("text", ["(if 0 then 1) + 1", "0 or (if 0 then 1)", "+(if 0 then 1)", "not (if 0 then 1)"])
+def test_the_vm_fails_on_it_as_the_interpreter_does(text):
+    messages = []
+    for backend in ("interpreter", "vm"):
+        with pytest.raises(TypeError) as raised:
+            pysharp.main("<t>", text, backend, False)
+        messages.append(str(raised.value))
+    assert messages[0] == messages[1]
@@ -0,0 +1,112 @@
+import random
+import pytest
+from lexer import Lexer
+from parser import Parser
+from nodes import children
+from incremental import IncrementalParser
+
+ATOMS = ["0", "12", "3.5", "x", "y_2", "true"]
+OPERATORS = ["+", "-", "*", "/", "^", "==", "<=", "and", "or"]
+SNIPPETS = ["1", "x", " ", "+", "(", ")", "let z = ", "if ", " then ", " else ", "3.", "=", "!", "ab", "0 * ", "(1 + 2)"]
+
+def dump(node) -> list:
+    result = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        token = getattr(node, "token", None) or getattr(node, "operator_token", None) or getattr(node, "var_name_token", None)
+        result.append((type(node).__name__, token and (token.type, token.value), node.pos_start.index, node.pos_end.index))
+        stack.extend(reversed(children(node)))
+    return result
+
+def full_parse(text: str):
+    lexer = Lexer("<edit>", text)
+    tokens, error = lexer.make_tokens()
+    if error: return None, error
+    ast = Parser(tokens, lexer.source).parse()
+    return ast.node, ast.error
+
+def assert_same_as_full_parse(parser, result):
+    (node, error), (full_node, full_error) = result, full_parse(parser.text)
+    if error or full_error:
+        assert bool(error) == bool(full_error)
+        assert error.to_string() == full_error.to_string()
+    else:
+        assert dump(node) == dump(full_node)
+
+def edit(parser, old: str, new: str, occurrence: int = 0):
+    offset = -1
+    for _ in range(occurrence + 1):
+        offset = parser.text.index(old, offset + 1)
+    result = parser.edit(offset, len(old), new)
+    assert_same_as_full_parse(parser, result)
+    return result
+
+def test_literal_edit_without_parentheses_reparses_one_token():
+    parser = IncrementalParser("<edit>", " + ".join(f"x * {i}" for i in range(2000)))
+    edit(parser, "1000", "10007")
+    assert parser.reparsed == 1
+    edit(parser, "10007", "y")
+    assert parser.reparsed == 1
+
+@pytest.mark.parametrize("text, old, new", [
+    ("1 + 2 * 3 - 4", "*", "/"),
+    ("1 + 2 * 3 - 4", "+", "-"),
+    ("a < b and c", "and", "or"),
+    ("a < b and c", "<", "=="),
+])
+def test_operator_swap_keeps_the_tree_shape(text, old, new):
+    parser = IncrementalParser("<edit>", text)
+    edit(parser, old, new)
+    assert parser.reparsed == 1
+
+@pytest.mark.parametrize("text, old, new", [
+    ("1 + 2 * 3", "*", "+"),
+    ("1 * 2 + 3", "+", "^"),
+    ("a * 5 + b", "5", "(5 + 1)"),
+    ("a * (5 + 1) + b", "(5 + 1)", "7"),
+    ("a * 5 + b", "5", "5 + 1"),
+    ("let x = 5", "x", "y"),
+    ("-x + 1", "-", "+"),
+    ("x+1", "+", "*2+"),
+    ("0", "0", "0 "),
+    ("1 + 2", "2", ""),
+    ("(1 + 2) * 3", "(", ""),
+])
+def test_edit_matches_full_parse(text, old, new):
+    edit(IncrementalParser("<edit>", text), old, new)
+
+def test_whitespace_edit_keeps_the_tree():
+    parser = IncrementalParser("<edit>", "1 + 2")
+    node = parser.node
+    result = edit(parser, "1", "  1")
+    assert result[0] is node
+    assert parser.reparsed == 0
+    edit(parser, " + ", "   +  ")
+    assert parser.reparsed <= 1
+
+def generate_expression(depth: int) -> str:
+    choice = random.random()
+    if depth <= 0 or choice < 0.2:
+        return random.choice(ATOMS)
+    elif choice < 0.6:
+        return f"{generate_expression(depth - 1)} {random.choice(OPERATORS)} {generate_expression(depth - 1)}"
+    elif choice < 0.75:
+        return f"({generate_expression(depth - 1)})"
+    elif choice < 0.82:
+        return f"-{generate_expression(depth - 1)}"
+    elif choice < 0.9:
+        return f"(let v = {generate_expression(depth - 1)})"
+    return f"(if {generate_expression(depth - 1)} then {generate_expression(depth - 1)} else {generate_expression(depth - 1)})"
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_edits_match_full_parse(seed):
+    random.seed(seed)
+    for _ in range(25):
+        parser = IncrementalParser("<edit>", generate_expression(5))
+        for _ in range(20):
+            text = parser.text
+            offset = random.randint(0, len(text))
+            deleted = min(random.choice([0, 1, 1, 2, 4]), len(text) - offset)
+            inserted = random.choice(["", random.choice(SNIPPETS), random.choice(ATOMS), random.choice(OPERATORS)])
+            assert_same_as_full_parse(parser, parser.edit(offset, deleted, inserted))
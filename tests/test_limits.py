@@ -0,0 +1,86 @@
+import pytest
+import pysharp
+import server
+from number import Number
+from interpreter import SymbolTable
+from limits import Limits, CHECK_INTERVAL
+
+BACKENDS = ["interpreter", "fast", "vm", "codegen"]
+
+@pytest.fixture(autouse=True)
+def table(monkeypatch):
+    table = SymbolTable()
+    for name, value in [("x", 3), ("y", 4)]:
+        table.set(name, Number(value))
+    monkeypatch.setattr(pysharp, "global_symbol_table", table)
+    pysharp.program_cache.clear()
+    return table
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_huge_powers_fail_before_they_are_computed(backend):
+    text = "1 + 9^9^9"
+    value, error = pysharp.main("<t>", text, backend, limits=Limits(max_bits=1 << 20))
+    assert error.details == "Result would exceed the limit of 1048576 bits"
+    assert (error.pos_start.index, error.pos_end.index) == (text.index("9"), len(text))
+    assert "Call stack" in error.to_string()
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_huge_products_fail_before_they_are_computed(backend):
+    value, error = pysharp.main("<t>", "(let z = 2 ^ 1000) * z * z", backend, limits=Limits(max_bits=2500))
+    assert error.details == "Result would exceed the limit of 2500 bits"
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("text", ["2^64 * 2^64", "3 * 2^200", "1 + (2^60)^2", "(if 0 then 1 else 2^99) * 2^9"])
+def test_constant_folding_does_not_skip_the_limits(backend, text):
+    errors = []
+    for optimize in (True, False):
+        value, error = pysharp.main("<t>", text, backend, optimize, Limits(max_bits=100))
+        errors.append((error.details, error.pos_start.index, error.pos_end.index))
+    assert errors[0] == errors[1] == ("Result would exceed the limit of 100 bits", *errors[1][1:])
+
+def test_constants_within_the_limits_are_still_folded():
+    text = "2^40 * 2^8 + (if 0 then 2^999 else 1)"
+    node, _ = pysharp.parse("<t>", text, limits=Limits(max_bits=100))
+    assert node.token.value == 2 ** 48 + 1
+    # the same text parsed for other limits is not taken from the program cache
+    node, _ = pysharp.parse("<t>", text, limits=Limits(max_bits=64))
+    assert node.left_node.right_node.token.value == 2 ** 8
+    assert node.left_node.left_node.operator_token.type == "POWER"
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_results_within_the_limits_are_unchanged(backend):
+    text = "(let z = x ^ 20 * y) - 2 ^ 0.5 + (if z > 0 then -1 ^ 99 else 0 ^ 5)"
+    expected, _ = pysharp.main("<t>", text, backend)
+    value, error = pysharp.main("<t>", text, backend, limits=Limits(100, 64, 1.0))
+    assert (value.value, error) == (expected.value, None)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_steps_are_limited(backend):
+    text = " + ".join(["x"] * 200)
+    value, error = pysharp.main("<t>", text, backend, optimize=False, limits=Limits(max_steps=50))
+    assert error.details == "Evaluation exceeded its limit of 50 steps"
+    value, error = pysharp.main("<t>", text, backend, optimize=False, limits=Limits(max_steps=1000))
+    assert (value.value, error) == (600, None)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_time_is_limited(backend):
+    # every squaring doubles the size, so the last few take seconds without a time limit
+    text = "(let z = 3 ^ 100000) " + " ".join(["* (let z = z * z)"] * 12)
+    value, error = pysharp.main("<t>", text, backend, limits=Limits(timeout=0.0))
+    assert error.details == "Evaluation exceeded its time limit of 0.0 seconds"
+
+def test_long_programs_look_at_the_clock():
+    text = " + ".join(["x"] * CHECK_INTERVAL)
+    value, error = pysharp.main("<t>", text, "vm", optimize=False, limits=Limits(timeout=0.0))
+    assert error.details == "Evaluation exceeded its time limit of 0.0 seconds"
+
+def test_server_limits_sessions_by_default():
+    limits = server.Server(timeout=1.0).limits
+    value, error, bindings = server.evaluate("<session>", {"a": 2}, "a + 9^9^9", "fast", limits)
+    assert error.details == f"Result would exceed the limit of {server.MAX_BITS} bits"
+    assert server.evaluate("<session>", {"a": 2}, "a ^ 10", "fast", limits)[:2] == (1024, None)
+
+def test_batch_passes_limits_on():
+    results = pysharp.main_batch(["x * y", "9^9^9", "y ^ 2"], workers=1, limits=Limits(max_bits=1 << 20))
+    assert [value for value, _ in results] == [12, None, 16]
+    assert results[1][1].details == "Result would exceed the limit of 1048576 bits"
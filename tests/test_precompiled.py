@@ -0,0 +1,112 @@
+import io
+import os
+import pytest
+import pysharp
+import precompiled
+from nodes import children
+from source import open_source
+
+SCRIPT = """let x = 3
+let y = x * 2.5 - -1
+if x > 2 and not y then 1 elif y then (let z = 2 ^ 3 ^ 2) else 0.5
+12345678901234567890123 / (x - 3)
+1 +
+  (let é = 1)
+z + y * x
+"""
+
+def dump(node) -> list:
+    result = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        tokens = [getattr(node, name) for name in ("token", "operator_token", "var_name_token") if hasattr(node, name)]
+        result.append((type(node).__name__, [(token.type, token.value, token.pos_start.index, token.pos_end.index) for token in tokens], node.pos_start.index, node.pos_end.index))
+        stack.extend(reversed(children(node)))
+    return result
+
+def write_script(tmp_path, text: str) -> str:
+    path = str(tmp_path / "script.pys")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+    return path
+
+def run(path: str, cache: bool = True) -> str:
+    output = io.StringIO()
+    source = open_source(path)
+    programs = pysharp.load_statements(path, source) if cache else pysharp.parse_statements(pysharp.split_lines(source))
+    pysharp.run_script(programs, output)
+    return output.getvalue()
+
+def test_decoded_trees_are_the_parsed_trees(tmp_path):
+    path = write_script(tmp_path, SCRIPT)
+    source = open_source(path)
+    parsed = [(node, error) for node, error in pysharp.parse_statements(pysharp.split_lines(source))]
+    encoder = precompiled.Encoder(precompiled.cache_path(path), precompiled.digest(source))
+    for statement, (node, _) in zip(pysharp.split_lines(source), parsed):
+        encoder.add(statement, node)
+    encoder.save()
+
+    program = precompiled.load(precompiled.cache_path(path), precompiled.digest(source))
+    decoded = list(program.decode(source))
+    assert len(decoded) == len(parsed)
+    for (statement, node), (parsed_node, error) in zip(decoded, parsed):
+        if error:
+            assert node is None
+        else:
+            assert dump(node) == dump(parsed_node)
+            assert node.pos_start.line == parsed_node.pos_start.line
+
+def test_cached_run_matches_an_uncached_one(tmp_path):
+    path = write_script(tmp_path, SCRIPT)
+    expected = run(path, cache=False)
+    assert run(path) == expected
+    assert os.path.exists(precompiled.cache_path(path))
+    assert run(path) == expected
+
+def test_cache_written_for_other_content_is_not_used(tmp_path):
+    path = write_script(tmp_path, "let a = 1\na + 1\n")
+    assert run(path) == "1\n2\n"
+    with open(path, "w") as file:
+        file.write("let a = 5\na + 1\n")
+    assert run(path) == "5\n6\n"
+    assert precompiled.load(precompiled.cache_path(path), precompiled.digest(open_source(path))) is not None
+
+@pytest.mark.parametrize("data", [b"", b"not a cache", b"\x00" * 64])
+def test_unreadable_cache_is_ignored(tmp_path, data):
+    path = write_script(tmp_path, "2 * 21\n")
+    with open(precompiled.cache_path(path), "wb") as file:
+        file.write(data)
+    assert run(path) == "42\n"
+
+def test_cache_is_smaller_than_the_script(tmp_path):
+    path = write_script(tmp_path, SCRIPT * 50)
+    run(path)
+    assert os.path.getsize(precompiled.cache_path(path)) < os.path.getsize(path)
+
+@pytest.mark.parametrize("keep", [0, 0.3, 0.6, 0.99])
+def test_cut_off_cache_parses_the_rest(tmp_path, keep):
+    path = write_script(tmp_path, SCRIPT * 3)
+    expected = run(path, cache=False)
+    run(path)
+    cache_path = precompiled.cache_path(path)
+    with open(cache_path, "rb") as file:
+        data = file.read()
+    with open(cache_path, "wb") as file:
+        file.write(data[:len(precompiled.header(b"")) + 16 + int((len(data) - 36) * keep)])
+    assert run(path) == expected
+    # it is written again
+    assert not os.path.exists(cache_path)
+    assert run(path) == expected and os.path.getsize(cache_path) == len(data)
+
+def test_cache_is_only_written_when_complete(tmp_path):
+    path = write_script(tmp_path, SCRIPT)
+    programs = pysharp.load_statements(path, open_source(path))
+    next(programs)
+    programs.close()
+    assert os.listdir(tmp_path) == ["script.pys"]
+
+def test_scripts_are_not_cached_unless_asked(tmp_path):
+    path = write_script(tmp_path, "2 * 21\n")
+    assert pysharp.run_file(path) == 0
+    assert not os.path.exists(precompiled.cache_path(path))
@@ -0,0 +1,128 @@
+import random
+import pytest
+import pysharp
+from interpreter import SymbolTable
+from context import Context
+from reactive import Sheet
+
+STATEMENTS = [
+    "let tax = price * rate",
+    "let total = price + tax",
+    "let shipping = if total > 100 then 0 else 5",
+    "let due = total + shipping",
+    "let discount = rate * 10",
+]
+
+def make_sheet(backend: str = "fast") -> Sheet:
+    sheet = Sheet(backend)
+    sheet.set("price", 100)
+    sheet.set("rate", 0.25)
+    for text in STATEMENTS:
+        assert not sheet.run(text).error
+    return sheet
+
+# every statement run again from scratch, as without a sheet
+def rerun(inputs: dict) -> dict:
+    table = SymbolTable()
+    table.parent = pysharp.get_global_symbol_table()
+    for name, value in inputs.items():
+        table.set(name, pysharp.Number(value))
+    context = Context("<program>")
+    context.symbol_table = table
+    for text in STATEMENTS:
+        pysharp.execute(pysharp.parse_program("<program>", text)[0], "fast", None, context)
+    return {name: value.value for name, value in table.symbols.items()}
+
+@pytest.mark.parametrize("backend", ["interpreter", "fast", "vm"])
+def test_reads_are_recorded_as_dependencies(backend):
+    sheet = make_sheet(backend)
+    assert sheet.graph() == {
+        "tax": ["price", "rate"],
+        "total": ["price", "tax"],
+        "shipping": ["total"],
+        "due": ["shipping", "total"],
+        "discount": ["rate"],
+    }
+    assert sheet.dependencies("due") == {"shipping", "total"}
+    assert [cell.node.var_name_token.value for cell in sheet.dependents("price")] == ["tax", "total", "shipping", "due"]
+
+def test_only_dependents_are_recomputed_in_topological_order():
+    sheet = make_sheet()
+    recomputed = sheet.set("price", 40)
+    assert [cell.node.var_name_token.value for cell in recomputed] == ["tax", "total", "shipping", "due"]
+    assert (sheet.get("total"), sheet.get("shipping"), sheet.get("due")) == (50.0, 5, 55.0)
+
+    recomputed = sheet.set("rate", 0.5)
+    assert [cell.node.var_name_token.value for cell in recomputed] == ["tax", "discount", "total", "shipping", "due"]
+
+def test_recomputation_stops_where_values_do_not_change():
+    sheet = make_sheet()
+    sheet.run("let expensive = price > 50")
+    sheet.run("let label = expensive * 100")
+    # expensive stays 1, so label is not recomputed
+    assert "label" not in [cell.node.var_name_token.value for cell in sheet.set("price", 200)]
+    assert sheet.set("price", 200) == []
+    assert "label" in [cell.node.var_name_token.value for cell in sheet.set("price", 20)]
+    assert sheet.get("label") == 0
+
+def test_matches_running_every_statement_again():
+    random.seed(25)
+    sheet = make_sheet()
+    for _ in range(200):
+        inputs = {"price": random.choice([0, 10, 80, 99.5, 150]), "rate": random.choice([0, 0.1, 0.25, 2])}
+        for name, value in inputs.items():
+            sheet.set(name, value)
+        expected = rerun(inputs)
+        assert {name: sheet.get(name) for name in expected} == expected
+
+def test_redefining_a_binding_replaces_its_statement():
+    sheet = make_sheet()
+    sheet.run("let tax = 7")
+    assert sheet.graph()["tax"] == []
+    assert sheet.get("due") == 107
+    assert [cell.node.var_name_token.value for cell in sheet.set("rate", 1)] == ["discount"]
+
+def test_dependencies_follow_the_branch_taken():
+    sheet = Sheet()
+    for name, value in [("switch", 1), ("a", 2), ("b", 3)]:
+        sheet.set(name, value)
+    sheet.run("let picked = if switch then a else b")
+    assert sheet.dependencies("picked") == {"switch", "a"}
+    assert sheet.set("b", 30) == []
+    sheet.set("switch", 0)
+    assert (sheet.dependencies("picked"), sheet.get("picked")) == ({"switch", "b"}, 30)
+
+def test_circular_definitions_are_rejected():
+    sheet = make_sheet()
+    cell = sheet.run("let rate = due / 1000")
+    assert cell.error.details == "Circular dependency: rate -> due -> total -> tax -> rate"
+    assert sheet.get("rate") == 0.25
+
+def test_failing_statements_leave_their_variables_undefined():
+    sheet = make_sheet()
+    sheet.run("let ratio = price / rate")
+    sheet.set("rate", 0)
+    assert sheet.get("ratio") is None
+    assert sheet.set("rate", 4) and sheet.get("ratio") == 25.0
+
+def test_bindings_run_before_their_inputs_are_defined_later():
+    # not the global table, which other tests may have defined a in
+    sheet = Sheet(symbol_table=SymbolTable())
+    cell = sheet.run("let b = a + 1")
+    assert cell.error and sheet.get("b") is None
+    sheet.run("let c = b * 2")
+    assert sheet.graph() == {"b": ["a"], "c": ["b"]}
+    assert [cell.node.var_name_token.value for cell in sheet.set("a", 1)] == ["b", "c"]
+    assert (sheet.get("b"), sheet.get("c")) == (2, 4)
+
+def test_failing_definitions_in_a_cycle_are_rejected():
+    sheet = Sheet()
+    sheet.set("a", 1)
+    sheet.run("let b = a * 2")
+    cell = sheet.run("let a = b / 0")
+    assert cell.error.details == "Circular dependency: a -> b -> a"
+    assert sheet.get("a") == 1
+
+def test_generated_code_cannot_be_tracked():
+    with pytest.raises(ValueError):
+        Sheet("codegen")
@@ -0,0 +1,30 @@
+import io
+import pytest
+import pysharp
+from source import Source
+
+def run(text: str, backend: str = "fast") -> tuple:
+    output = io.StringIO()
+    programs = pysharp.parse_statements(pysharp.split_lines(Source("<script>", text)))
+    errors = pysharp.run_script(programs, output, backend)
+    return errors, output.getvalue()
+
+@pytest.mark.parametrize("backend", ["interpreter", "fast", "vm", "codegen"])
+@pytest.mark.parametrize("failing, exception", [("0 ^ -1", "ZeroDivisionError"), ("2 ^ 20000", "ValueError")])
+def test_a_statement_the_evaluator_fails_on_only_fails_itself(backend, failing, exception):
+    errors, output = run(f"1 + 1\n{failing}\n3 * 2\n", backend)
+    assert errors == 1
+    lines = output.splitlines()
+    assert lines[0] == "2" and lines[-1] == "6"
+    assert f"Runtime Error: {exception}" in output
+    assert "line 2" in output and failing in output
+
+def test_output_is_written_when_the_script_stops():
+    def programs():
+        yield from pysharp.parse_statements(pysharp.split_lines(Source("<script>", "1 + 1\n")))
+        raise KeyboardInterrupt
+
+    output = io.StringIO()
+    with pytest.raises(KeyboardInterrupt):
+        pysharp.run_script(programs(), output)
+    assert output.getvalue() == "2\n"
@@ -0,0 +1,61 @@
+import json
+import asyncio
+import pytest
+import pysharp
+import server
+from nodes import VariableAccessNode, VariableAssignmentNode, children
+
+async def exchange(lines: list) -> list:
+    instance = server.Server(timeout=5.0, concurrency=1)
+    listener = await instance.start()
+    try:
+        host, port = listener.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        responses = []
+        for line in lines:
+            writer.write((line + "\n").encode())
+            await writer.drain()
+            responses.append((await reader.readline()).decode())
+        writer.close()
+        return responses
+    finally:
+        listener.close()
+        instance.close()
+
+def framed(code: str, request_id: int) -> str:
+    return json.dumps({"id": request_id, "code": code})
+
+def test_results_json_cannot_hold_are_answered_on_the_same_connection():
+    codes = ["(0-8)^0.5", "10.0^300 * 10.0^300", "-10.0^300 * 10.0^300", "10.0^300 * 10.0^300 * 0", "10^5000"]
+    lines = [framed(code, i) for i, code in enumerate(codes)] + ['{"id": NaN, "code": "1"}', "10^5000", framed("1 + 1", 9)]
+    responses = asyncio.run(exchange(lines))
+    decoded = [json.loads(response) for response in responses[:6]]
+
+    assert decoded[0] == {"id": 0, "value": str(complex((0 - 8) ** 0.5))}
+    assert [response["value"] for response in decoded[1:4]] == ["inf", "-inf", "nan"]
+    assert decoded[4]["id"] == 4 and decoded[4]["error"]["name"] == "Unrepresentable result"
+    assert decoded[5]["error"]["name"] == "Bad request"
+    assert responses[6].startswith("Unrepresentable result: ")
+    # the connection is still served
+    assert json.loads(responses[7]) == {"id": 9, "value": 2}
+
+@pytest.mark.parametrize("backend", ["interpreter", "fast", "vm"])
+def test_sessions_do_not_rebind_the_cached_program(backend):
+    code = "let total = x * 2 + y"
+    node, error = pysharp.parse(server.SESSION_FILENAME, code)
+    variables = [item for item in walk(node) if isinstance(item, (VariableAccessNode, VariableAssignmentNode))]
+    bound = [item.binding for item in variables]
+
+    for bindings, expected in [({"x": 1, "y": 2}, 4), ({"x": 10, "y": 0}, 20), ({"x": 1, "y": 2}, 4)]:
+        value, error, left = server.evaluate("<session>", bindings, code, backend)
+        assert (value, error, left["total"]) == (expected, None, expected)
+    # the nodes are still bound to the global table they were parsed for, not the last session's
+    assert [item.binding for item in variables] == bound
+    assert all(binding[0] is pysharp.get_global_symbol_table() for binding in bound)
+
+def walk(node):
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        yield item
+        stack.extend(children(item))
@@ -0,0 +1,51 @@
+import pytest
+import numpy as np
+import pysharp
+from interpreter import SymbolTable
+from number import Number
+from vectorized import evaluate_columns
+from context import Context
+
+BACKENDS = [
+    {"backend": "interpreter", "optimize": False},
+    {"backend": "fast", "optimize": False},
+    {"backend": "vm", "optimize": False},
+    {"backend": "interpreter"},
+]
+
+@pytest.fixture
+def symbol_table(monkeypatch):
+    table = SymbolTable()
+    table.set("x", Number(0))
+    monkeypatch.setattr(pysharp, "global_symbol_table", table)
+    pysharp.program_cache.clear()
+    yield table
+    pysharp.program_cache.clear()
+
+@pytest.mark.parametrize("options", BACKENDS)
+@pytest.mark.parametrize("text, expected", [
+    ("x != 0 and (100 / x) > 2", 0),
+    ("x == 0 or (100 / x) > 2", 1),
+    ("x and undefined", 0),
+    ("1 or undefined", 1),
+    ("0.0 or 2.7", 2),
+    ("x + 1 and 2.5", 2),
+])
+def test_right_operand_is_skipped_when_the_left_one_decides(symbol_table, options, text, expected):
+    result, error = pysharp.main("<guard>", text, **options)
+    assert error is None
+    assert result.value == expected
+
+@pytest.mark.parametrize("options", BACKENDS)
+def test_skipped_operand_does_not_assign(symbol_table, options):
+    result, error = pysharp.main("<guard>", "(let y = 0) and (let y = 7)", **options)
+    assert error is None
+    assert symbol_table.get("y").value == 0
+
+def test_vectorized_only_evaluates_the_undecided_rows():
+    context = Context("<guard>")
+    context.symbol_table = SymbolTable()
+    node, error = pysharp.parse("<guard>", "x != 0 and (100 / x) > 2")
+    result, error = evaluate_columns(node, {"x": np.array([0, 10, 100, 0, 20.0])}, context)
+    assert error is None
+    assert result.tolist() == [0, 1, 0, 0, 1]
@@ -0,0 +1,21 @@
+import pytest
+from lexer import Lexer
+from source import Source
+
+@pytest.mark.parametrize("text", [
+    "let é = 3",
+    "  1 + €",
+    "(x + 1) * 2 + y + 😀 + 1",
+    "1 + 2\n3 ! 4",
+    "x\n\t ü",
+])
+def test_lexer_errors_are_the_same_for_bytes_and_str(text):
+    _, str_error = Lexer("<f>", None, Source("<f>", text)).make_tokens()
+    _, bytes_error = Lexer("<f>", None, Source("<f>", text.encode())).make_tokens()
+    assert str_error.to_string() == bytes_error.to_string()
+    assert (bytes_error.pos_end.line, bytes_error.pos_end.col) == (str_error.pos_end.line, str_error.pos_end.col)
+
+def test_columns_count_characters():
+    text = "é + ü + x"
+    source = Source("<f>", text.encode())
+    assert source.column(text.encode().index(b"x")) == text.index("x")
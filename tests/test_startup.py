@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the best of a few runs has to stay within these on a loaded machine. they are far above what start-up
+# costs today, and far below what one stray import like distutils cost, which is what they are meant to catch
+IMPORT_BUDGET = 0.1
+# on top of starting a bare interpreter
+EVALUATE_BUDGET = 0.15
+RUNS = 5
+# modules only some entry points need
+LAZY_MODULES = ["compiler", "vm", "optimizer", "cse", "precompiled", "codegen", "vectorized", "batch", "server", "numpy", "distutils", "calendar"]
+
+def python(*arguments, input: str = None) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *arguments], input=input, capture_output=True, text=True, cwd=ROOT, check=True)
+
+def best_wall_time(*arguments, input: str = None) -> float:
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        python(*arguments, input=input)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def import_time(module: str) -> float:
+    # -X importtime reports "import time: self [us] | cumulative | module" on stderr
+    times = []
+    for _ in range(RUNS):
+        lines = python("-X", "importtime", "-c", f"import {module}").stderr.splitlines()
+        cumulative = [line.split("|") for line in lines if line.rstrip().endswith(f"| {module}")]
+        times.append(int(cumulative[-1][1]) / 1e6)
+    return min(times)
+
+def test_import_is_within_budget():
+    assert import_time("pysharp") < IMPORT_BUDGET
+
+def test_import_does_not_load_modules_only_some_entry_points_need():
+    loaded = python("-c", "import sys, pysharp; print(' '.join(sys.modules))").stdout.split()
+    assert [module for module in LAZY_MODULES if module in loaded] == []
+
+def test_evaluating_one_expression_is_within_budget():
+    assert python("main.py", "-", input="1 + 2\n").stdout == "3\n"
+    overhead = best_wall_time("main.py", "-", input="1 + 2\n") - best_wall_time("-c", "pass")
+    assert overhead < EVALUATE_BUDGET
@@ -0,0 +1,44 @@
+import random
+import inspect
+import pytest
+from lexer import Lexer
+from parser import Parser
+from source import Source
+from test_incremental import SNIPPETS, dump
+
+def listed_parse(text):
+    lexer = Lexer("<f>", text)
+    tokens, error = lexer.make_tokens()
+    if error: return None, error
+    ast = Parser(tokens, lexer.source).parse()
+    return ast.node, ast.error
+
+def streamed_parse(text):
+    lexer = Lexer("<f>", text)
+    ast = Parser(lexer.generate_tokens(), lexer.source).parse()
+    return ast.node, ast.error
+
+def test_streamed_parse_is_the_same_as_listed():
+    random.seed(23)
+    for _ in range(3000):
+        text = "".join(random.choice(SNIPPETS + ["€", "\n"]) for _ in range(random.randint(0, 14)))
+        (node, error), (streamed_node, streamed_error) = listed_parse(text), streamed_parse(text)
+        if error or streamed_error:
+            assert error.to_string() == streamed_error.to_string(), text
+        else:
+            assert dump(node) == dump(streamed_node), text
+
+@pytest.mark.parametrize("text", ["1 + ) + €", "(1 + 2 $", "let = 1 ! 2", "1 2 3\n4 ?"])
+def test_illegal_characters_are_reported_before_syntax_errors(text):
+    _, error = streamed_parse(text)
+    assert error.error_name in ("Illegal character", "Expected character")
+    assert error.to_string() == listed_parse(text)[1].to_string()
+
+def test_tokens_are_pulled_while_parsing():
+    lexer = Lexer("<f>", None, Source("<f>", b"1 + 2 * x"))
+    tokens = lexer.generate_tokens()
+    parser = Parser(tokens, lexer.source)
+    assert inspect.getgeneratorstate(tokens) == inspect.GEN_CREATED
+    assert dump(parser.parse().node) == dump(listed_parse("1 + 2 * x")[0])
+    # stopped at the EOF token, which the parser never reads past
+    assert inspect.getgeneratorstate(tokens) == inspect.GEN_SUSPENDED
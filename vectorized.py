@@ -0,0 +1,299 @@
+import numpy as np
+from errors import RuntimeError
+from interpreter import VALUE_OPERATIONS
+from nodes import NumberNode, BinaryOperatorNode, UnaryOperatorNode, VariableAccessNode, VariableAssignmentNode, IfNode
+from constants import *
+
+# beyond these magnitudes int64/float64 arithmetic stops agreeing with Python ints
+INT64_SAFE = 2 ** 62
+FLOAT_EXACT_INT = 2 ** 53
+
+class RowRuntimeError(RuntimeError):
+    def __init__(self, error, row: int):
+        super().__init__(error.pos_start, error.pos_end, f"{error.details} (row {row})", error.context)
+        self.row = row
+
+class VectorizedEvaluator:
+    def __init__(self, columns: dict, context):
+        self.context = context
+        self.columns = {name: self.normalize(np.asarray(values)) for name, values in columns.items()}
+        self.size = len(next(iter(self.columns.values()))) if self.columns else 1
+        self.defined = {}
+        self.errors = []
+        self.row_errors = np.full(self.size, -1)
+        self.chosen_cases = {}
+        self.evaluators = {
+            NumberNode: self.evaluate_NumberNode,
+            BinaryOperatorNode: self.evaluate_BinaryOperatorNode,
+            UnaryOperatorNode: self.evaluate_UnaryOperatorNode,
+            VariableAccessNode: self.evaluate_VariableAccessNode,
+            VariableAssignmentNode: self.evaluate_VariableAssignmentNode,
+            IfNode: self.evaluate_IfNode,
+        }
+
+        for name, values in self.columns.items():
+            if len(values) != self.size:
+                raise ValueError(f"column {name} has {len(values)} rows, expected {self.size}")
+
+    def evaluate(self, node):
+        rows = np.arange(self.size)
+        with np.errstate(all="ignore"):
+            result = self.evaluate_node(node, rows)
+
+        failed = np.flatnonzero(self.row_errors >= 0)
+        if len(failed):
+            row = int(failed[0])
+            return None, RowRuntimeError(self.errors[self.row_errors[row]](row), row)
+        return result, None
+
+    # every evaluate_* method receives the indices of the rows that reach the node
+    # and returns one value per such row
+    def evaluate_node(self, node, rows):
+        return self.evaluators[type(node)](node, rows)
+
+    def evaluate_NumberNode(self, node, rows):
+        return self.full(len(rows), node.token.value)
+
+    def evaluate_VariableAccessNode(self, node, rows):
+        var_name = node.var_name_token.value
+
+        if var_name in self.columns:
+            values = self.columns[var_name][rows]
+            defined = self.defined.get(var_name)
+            undefined = None if defined is None else ~defined[rows]
+        else:
+            value = self.context.symbol_table.get(var_name)
+            values = self.full(len(rows), 0 if value is None else value.value)
+            undefined = None if value is not None else np.ones(len(rows), dtype=bool)
+
+        if undefined is not None and undefined.any():
+            error = RuntimeError(node.pos_start, node.pos_end, f"Trying to access variable {var_name} which is undefined", self.context)
+            self.fail(rows[undefined], lambda row: error)
+            values = values.copy()
+            values[undefined] = 0
+        return values
+
+    def evaluate_VariableAssignmentNode(self, node, rows):
+        values = self.evaluate_node(node.value_node, rows)
+        var_name = node.var_name_token.value
+
+        if len(rows) == self.size:
+            self.columns[var_name] = values
+            self.defined.pop(var_name, None)
+            return values
+
+        existing = self.columns.get(var_name)
+        if existing is None:
+            value = self.context.symbol_table.get(var_name)
+            existing = self.full(self.size, 0 if value is None else value.value)
+            if value is None:
+                self.defined[var_name] = np.zeros(self.size, dtype=bool)
+        merged = existing.astype(existing.dtype if existing.dtype == values.dtype else object)
+        merged[rows] = values
+        self.columns[var_name] = self.normalize(merged)
+        if var_name in self.defined:
+            self.defined[var_name][rows] = True
+        return values
+
+    def evaluate_UnaryOperatorNode(self, node, rows):
+        values = self.evaluate_node(node.node, rows)
+
+        if node.operator_token.type == TOKEN_MINUS:
+            if values.dtype.kind == "O" or values.dtype.kind == "i" and np.abs(values).max(initial=0) >= INT64_SAFE:
+                return self.python_operation(VALUE_OPERATIONS[TOKEN_MULTIPLY], values, self.full(len(rows), -1), rows)
+            return values * -1
+        elif node.operator_token.matches(TOKEN_KEYWORD, "not"):
+            if values.dtype.kind == "O":
+                return self.python_operation(lambda value, _: 1 if value == 0 else 0, values, values, rows)
+            return (values == 0).astype(np.int64)
+        return values
+
+    def evaluate_BinaryOperatorNode(self, node, rows):
+        left = self.evaluate_node(node.left_node, rows)
+        operator_token = node.operator_token
+        if operator_token.type == TOKEN_KEYWORD:
+            return self.logical(node, left, rows)
+
+        right = self.evaluate_node(node.right_node, rows)
+        operator_type = operator_token.type
+
+        if operator_type == TOKEN_DIVIDE:
+            zero = right == 0
+            if zero.any():
+                self.fail_division(node.right_node, rows[zero])
+                right = right.copy()
+                right[zero] = 1
+            return self.divide(left, right, rows)
+        elif operator_type == TOKEN_POWER:
+            return self.power(left, right, rows)
+
+        operation = VALUE_OPERATIONS[operator_type]
+        if "O" in (left.dtype.kind, right.dtype.kind):
+            return self.python_operation(operation, left, right, rows)
+
+        if operator_type in (TOKEN_PLUS, TOKEN_MINUS, TOKEN_MULTIPLY):
+            if left.dtype.kind == "i" and right.dtype.kind == "i":
+                estimate = operation(left.astype(np.float64), right.astype(np.float64))
+                if np.abs(estimate).max(initial=0) >= INT64_SAFE:
+                    return self.python_operation(operation, left, right, rows)
+            return operation(left, right)
+
+        # comparisons between an int and a float are only exact in numpy while the int fits a double
+        if left.dtype.kind != right.dtype.kind and max(self.int_magnitude(left), self.int_magnitude(right)) >= FLOAT_EXACT_INT:
+            return self.python_operation(operation, left, right, rows)
+        return COMPARISONS[operator_type](left, right).astype(np.int64)
+
+    def evaluate_IfNode(self, node, rows):
+        remaining = rows
+        parts = []
+        chosen = self.chosen_cases.setdefault(node, np.full(self.size, -1))
+
+        for index, (condition, expr) in enumerate(node.cases):
+            if not len(remaining): break
+            taken = self.evaluate_node(condition, remaining) != 0
+            if taken.any():
+                chosen[remaining[taken]] = index
+                parts.append((taken, remaining, self.evaluate_node(expr, remaining[taken])))
+            remaining = remaining[~taken]
+
+        if len(remaining):
+            chosen[remaining] = len(node.cases)
+            if node.else_case:
+                parts.append((None, remaining, self.evaluate_node(node.else_case, remaining)))
+            else:
+                parts.append((None, remaining, np.full(len(remaining), None, dtype=object)))
+
+        dtypes = {values.dtype for _, _, values in parts}
+        result = np.empty(len(rows), dtype=dtypes.pop() if len(dtypes) == 1 else object)
+        for taken, subset, values in parts:
+            selected = subset[taken] if taken is not None else subset
+            result[np.searchsorted(rows, selected)] = values
+        return result
+
+    def divide(self, left, right, rows):
+        if "O" in (left.dtype.kind, right.dtype.kind) or max(self.int_magnitude(left), self.int_magnitude(right)) >= FLOAT_EXACT_INT:
+            return self.python_operation(lambda a, b: a / b, left, right, rows)
+        return np.true_divide(left, right)
+
+    def power(self, left, right, rows):
+        operation = VALUE_OPERATIONS[TOKEN_POWER]
+        if "O" in (left.dtype.kind, right.dtype.kind):
+            return self.python_operation(operation, left, right, rows)
+
+        if left.dtype.kind == "i" and right.dtype.kind == "i":
+            magnitude = np.abs(left.astype(np.float64))
+            if (right < 0).any() or (np.where(magnitude > 1, right * np.log2(np.maximum(magnitude, 1)), 0) >= 62).any():
+                return self.python_operation(operation, left, right, rows)
+            return np.power(left, right)
+
+        # float_power goes through the same libm pow as Python floats, np.power does not
+        base, exponent = left.astype(np.float64), right.astype(np.float64)
+        result = np.float_power(base, exponent)
+        # complex results, 0.0 ** -n and overflow are where Python and numpy disagree
+        unsafe = ((base < 0) & (exponent != np.floor(exponent))) | ((base == 0) & (exponent < 0)) | (np.isinf(result) & np.isfinite(base) & np.isfinite(exponent))
+        if unsafe.any() or max(self.int_magnitude(left), self.int_magnitude(right)) >= FLOAT_EXACT_INT:
+            return self.python_operation(operation, left, right, rows)
+        return result
+
+    def logical(self, node, left, rows):
+        # int(a and b) / int(a or b): the deciding operand is truncated towards zero, and the
+        # right operand is only evaluated for the rows where the left one does not decide
+        pending = left != 0 if node.operator_token.value == "and" else left == 0
+        if not pending.any():
+            return self.truncate(left, rows)
+
+        decided = ~pending
+        left = self.truncate(left[decided], rows[decided])
+        right = self.truncate(self.evaluate_node(node.right_node, rows[pending]), rows[pending])
+        result = np.empty(len(rows), dtype=left.dtype if left.dtype == right.dtype else object)
+        result[decided] = left
+        result[pending] = right
+        return self.normalize(result)
+
+    def truncate(self, values, rows):
+        if values.dtype.kind == "O" or not self.truncatable(values):
+            return self.python_operation(lambda value, _: int(value), values, values, rows)
+        return values.astype(np.int64)
+
+    def python_operation(self, operation, left, right, rows):
+        # row by row with the Interpreter's own semantics, skipping rows that already failed
+        alive = (self.row_errors[rows] < 0).tolist()
+        values = [operation(a, b) if ok else 0 for a, b, ok in zip(left.tolist(), right.tolist(), alive)]
+        return self.normalize(self.object_array(values))
+
+    def fail_division(self, node, rows):
+        def division_error(row):
+            origin = self.origin(node, row)
+            return RuntimeError(origin.pos_start, origin.pos_end, "Disivion by zero is illegal", self.context)
+        self.fail(rows, division_error)
+
+    def origin(self, node, row):
+        # the node whose span the Interpreter would have attached to this row's value
+        while True:
+            if type(node) is VariableAssignmentNode:
+                node = node.value_node
+            elif type(node) is IfNode:
+                case = self.chosen_cases[node][row]
+                if case == len(node.cases):
+                    if not node.else_case: return node
+                    node = node.else_case
+                else:
+                    node = node.cases[case][1]
+            else:
+                return node
+
+    # errors are only built for the row that is finally reported
+    def fail(self, rows, make_error):
+        rows = rows[self.row_errors[rows] < 0]
+        if len(rows):
+            self.row_errors[rows] = len(self.errors)
+            self.errors.append(make_error)
+
+    def full(self, size, value):
+        if type(value) is int and abs(value) >= INT64_SAFE:
+            return np.full(size, value, dtype=object)
+        return np.full(size, value)
+
+    def object_array(self, values):
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    def normalize(self, values):
+        if values.dtype.kind in "iu":
+            return values.astype(np.int64) if values.dtype != np.int64 else values
+        elif values.dtype.kind == "b":
+            return values.astype(np.int64)
+        elif values.dtype.kind == "f":
+            return values.astype(np.float64) if values.dtype != np.float64 else values
+        elif values.dtype.kind != "O":
+            raise TypeError(f"unsupported column dtype {values.dtype}")
+
+        types = {type(value) for value in values.tolist()}
+        if types == {int} and all(abs(value) < INT64_SAFE for value in values.tolist()):
+            return values.astype(np.int64)
+        elif types == {float}:
+            return values.astype(np.float64)
+        return values
+
+    def int_magnitude(self, values):
+        if values.dtype.kind != "i" or not len(values):
+            return 0
+        return int(np.abs(values).max())
+
+    def truncatable(self, values):
+        if values.dtype.kind == "i":
+            return True
+        return bool(np.isfinite(values).all() and np.abs(values).max(initial=0) < INT64_SAFE)
+
+COMPARISONS = {
+    TOKEN_EQUALS_EQUALS: np.equal,
+    TOKEN_NOT_EQUALS: np.not_equal,
+    TOKEN_LESS_THAN: np.less,
+    TOKEN_GREATER_THAN: np.greater,
+    TOKEN_LESS_EQUALS: np.less_equal,
+    TOKEN_GREATER_EQUALS: np.greater_equal,
+}
+
+def evaluate_columns(node, columns: dict, context):
+    return VectorizedEvaluator(columns, context).evaluate(node)
@@ -0,0 +1,85 @@
+from number import Number, unsupported_binary, unsupported_unary
+from errors import RuntimeResult, RuntimeError
+from constants import *
+
+# operations whose result the limits check the size of first
+SIZED_OPERATIONS = (Number.multed_by, Number.powed_by)
+
+class VirtualMachine:
+    def run(self, instructions, context):
+        res = RuntimeResult()
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        symbol_table = context.symbol_table
+        instruction_pointer = 0
+        instruction_count = len(instructions)
+        limits = context.limits
+        counting = context.steps is not None
+
+        while instruction_pointer < instruction_count:
+            opcode, argument, node = instructions[instruction_pointer]
+            instruction_pointer += 1
+
+            if counting:
+                context.steps -= 1
+                if context.steps < 0:
+                    error = limits.check_steps(node, context)
+                    if error: return res.failure(error)
+
+            if opcode == OPCODE_LOAD_CONST:
+                push(Number(argument).set_context(context).set_pos(node.pos_start, node.pos_end))
+            elif opcode == OPCODE_BINARY:
+                right = pop()
+                # the compiler picked the operation for two Numbers, an if without a taken branch gives neither
+                if right is None or stack[-1] is None:
+                    raise unsupported_binary(node.operator_token, stack[-1], right)
+                if limits is not None and argument in SIZED_OPERATIONS:
+                    error = limits.check_size(node, node.operator_token.type, stack[-1].value, right.value, context)
+                    if error: return res.failure(error)
+                result, error = argument(pop(), right)
+                if error: return res.failure(error)
+                push(result.set_pos(node.pos_start, node.pos_end))
+            elif opcode == OPCODE_LOAD_VARIABLE:
+                binding = node.binding
+                value = symbol_table.values[binding[1] if binding[0] is symbol_table else symbol_table.slot(argument)]
+                if value is None:
+                    value = symbol_table.get(argument)
+                if value is None:
+                    return res.failure(RuntimeError(node.pos_start, node.pos_end, f"Trying to access variable {argument} which is undefined", context))
+                push(value.copy().set_pos(node.pos_start, node.pos_end))
+            elif opcode == OPCODE_JUMP_IF_FALSE:
+                if not pop().is_true():
+                    instruction_pointer = argument
+            elif opcode == OPCODE_JUMP_IF_FALSE_OR_KEEP:
+                if not stack[-1].is_true():
+                    push(pop().short_circuited().set_pos(node.pos_start, node.pos_end))
+                    instruction_pointer = argument
+            elif opcode == OPCODE_JUMP_IF_TRUE_OR_KEEP:
+                if stack[-1].is_true():
+                    push(pop().short_circuited().set_pos(node.pos_start, node.pos_end))
+                    instruction_pointer = argument
+            elif opcode == OPCODE_JUMP:
+                instruction_pointer = argument
+            elif opcode == OPCODE_STORE_VARIABLE:
+                binding = node.binding
+                symbol_table.values[binding[1] if binding[0] is symbol_table else symbol_table.slot(argument)] = stack[-1]
+            elif opcode == OPCODE_NEGATE:
+                if stack[-1] is None: raise unsupported_unary(node.operator_token, None)
+                result, error = pop().negated()
+                if error: return res.failure(error)
+                push(result.set_pos(node.pos_start, node.pos_end))
+            elif opcode == OPCODE_NOT:
+                if stack[-1] is None: raise unsupported_unary(node.operator_token, None)
+                result, error = pop().notted()
+                if error: return res.failure(error)
+                push(result.set_pos(node.pos_start, node.pos_end))
+            elif opcode == OPCODE_POSITIVE:
+                if stack[-1] is None: raise unsupported_unary(node.operator_token, None)
+                push(pop().set_pos(node.pos_start, node.pos_end))
+            elif opcode == OPCODE_LOAD_NONE:
+                push(None)
+            else:
+                raise Exception(f"Unknown opcode {opcode}")
+
+        return res.success(pop())